@@ -1,19 +1,38 @@
 # agent_logic.py
 
 import os
-import json
+import time
 from groq import Groq
 from dotenv import load_dotenv
 from uagents import Agent, Model # Agent and Model are both top-level
 from uagents.context import Context # Context is now in uagents.context
 from uagents.protocol import Protocol # Protocol is now in uagents.protocol
+from metrics import metrics # Process-wide latency/token instrumentation
+from prompts import PROMPT_VERSION, build_messages, build_field_retry_messages
+from response_repair import ResponseValidationError, repair_response
+from prescore import prescore_lead, status_distance
 
 # Load environment variables (for Groq API Key)
 load_dotenv()
 
 # --- Initialize Groq Client for Agent's Use ---
-# This client will be used by the AI qualification logic within our agent
-_groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# This client will be used by the AI qualification logic within our agent.
+# LUMINOVA_LLM_BACKEND=mock swaps in a local stand-in (see mock_llm.py) for tests and load tests.
+LLM_BACKEND = os.getenv("LUMINOVA_LLM_BACKEND", "groq")
+if LLM_BACKEND == "mock":
+    from mock_llm import MockGroqClient
+    _groq_client = MockGroqClient()
+else:
+    _groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+# --- Model Selection ---
+# 'fast' uses only the small model, 'quality' only the large one, and 'cascade' qualifies every lead
+# with the small model and escalates just the borderline ones to the large model.
+FAST_MODEL = "llama3-8b-8192"
+QUALITY_MODEL = "llama3-70b-8192"
+MODEL_MODES = ("fast", "quality", "cascade")
+DEFAULT_MODEL_MODE = os.getenv("LUMINOVA_MODEL_MODE", "fast")
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("LUMINOVA_CASCADE_CONFIDENCE", "0.6"))
 
 # --- Define Agent Message Types ---
 # These define the structure of data exchanged within our conceptual agent system
@@ -32,72 +51,73 @@ class LogMessage(Model): # A simple message type for demonstrating Coral Protoco
     log_content: str
 
 # --- Core AI Logic Function (The "Reasoning" Part of Your Agent) ---
-def qualify_lead_with_ai(company_name: str, description: str) -> dict:
-    """
-    Uses Groq's Llama model to qualify and prioritize a sales lead based on a specific prompt.
-    Returns a dictionary with qualification status, priority score, and reasoning.
-    """
-    prompt = f"""You are an expert Sales Lead Qualifier AI named LumiNova AI.
-    Your task is to analyze a company's description and determine its qualification status and priority for sales outreach.
-    The client you are qualifying leads for is a **leading provider of cloud infrastructure and advanced AI solutions for enterprises**.
-
-    Analyze the following sales lead:
-    Company Name: {company_name}
-    Company Description: {description}
-
-    Based on this, provide:
-    1.  **Qualified Status**: (Choose from 'High Fit', 'Medium Fit', 'Low Fit', 'Not Fit').
-        * 'High Fit': Clearly a B2B company that explicitly mentions tech, cloud, AI, data, software development, or large-scale operations.
-        * 'Medium Fit': B2B, but vague or indirect alignment. Might use cloud/AI but not a core focus.
-        * 'Low Fit': B2B but seems unlikely to need advanced cloud/AI solutions.
-        * 'Not Fit': Primarily B2C, retail, small local service, or completely irrelevant to enterprise cloud/AI.
-    2.  **Priority Score**: (A number from 1 to 5, where 5 is highest priority for immediate sales outreach. 0 for 'Not Fit').
-        * 'High Fit' -> 4-5
-        * 'Medium Fit' -> 3
-        * 'Low Fit' -> 1-2
-        * 'Not Fit' -> 0
-    3.  **Reasoning**: (A brief, concise, 2-3 sentence explanation for why you assigned that status and score. Focus on specific keywords or phrases from the description that indicate alignment or non-alignment with cloud/AI solutions.)
-
-    Format your response strictly as a JSON object with exactly these keys. Ensure 'priority_score' is an integer.
-    {{
-      "qualified_status": "...",
-      "priority_score": int,
-      "reasoning": "..."
-    }}
-    """
-
+def _chat_completion(messages: list, model_name: str) -> str:
+    """Calls the Groq chat completion API, recording latency and token usage, and returns the raw content."""
+    # Time the round trip for the metrics panel, even if the call fails
+    request_started = time.perf_counter()
+    chat_completion = None
     try:
-        # Call the Groq API with the Llama 3 model
         chat_completion = _groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are LumiNova AI, an expert sales lead qualifier."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama3-8b-8192", # Using Llama 3 via Groq. You can try 'llama3-70b-8192' for more power.
+            messages=messages,
+            model=model_name,
             response_format={"type": "json_object"}, # IMPORTANT: Ensures the output is a valid JSON string
             temperature=0.0, # Keep AI responses deterministic for consistent qualification results
         )
-        ai_response_str = chat_completion.choices[0].message.content
-        if ai_response_str is None:
-            raise ValueError("No response content received from Groq API")
-        ai_data = json.loads(ai_response_str) # Parse the JSON string into a Python dictionary
-
-        # Basic validation to ensure expected keys and types
-        if not isinstance(ai_data.get("priority_score"), int):
-            try: ai_data["priority_score"] = int(ai_data.get("priority_score", 0))
-            except ValueError: ai_data["priority_score"] = 0 # Fallback if conversion fails
-        # Clamp priority score between 0 and 5
-        ai_data["priority_score"] = max(0, min(5, ai_data["priority_score"]))
-
-        return ai_data
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error from Groq API: {e}. Raw response: {ai_response_str}")
+    finally:
+        metrics.record_llm_call(model_name, time.perf_counter() - request_started,
+                                getattr(chat_completion, "usage", None), prompt_version=PROMPT_VERSION)
+    content = chat_completion.choices[0].message.content
+    if content is None:
+        raise ValueError("No response content received from Groq API")
+    return content
+
+def qualify_lead_with_ai(company_name: str, description: str, model_name: str = FAST_MODEL) -> dict:
+    """
+    Uses Groq's Llama model to qualify and prioritize a sales lead based on the versioned prompt in prompts.py.
+    Near-valid responses are repaired locally (response_repair.py); only fields that cannot be recovered
+    are re-requested from the model, in a short follow-up turn.
+    Returns a dictionary with qualification status, priority score, reasoning and confidence (or None).
+    """
+    # Static, versioned rubric as the system prompt; only the lead itself varies per call
+    messages = build_messages(company_name, description)
+
+    ai_response_str = None
+    try:
+        # Call the Groq API with the Llama 3 model
+        ai_response_str = _chat_completion(messages, model_name)
+        repair = repair_response(ai_response_str)
+        outcome = "repaired" if repair.repaired else "valid"
+
+        if repair.missing:
+            # Re-ask only for the unrecoverable fields, keeping everything already salvaged
+            outcome = "retried"
+            try:
+                retry_str = _chat_completion(build_field_retry_messages(messages, ai_response_str, repair.missing), model_name)
+            except Exception as e:
+                if "qualified_status" not in repair.data or "priority_score" not in repair.data:
+                    raise
+                # Status and score were recovered; a failed follow-up for e.g. the reasoning shouldn't cost the lead
+                metrics.inc("llm_errors_total", 1, {"model": model_name})
+                metrics.inc("llm_responses_total", 1, {"outcome": "salvaged"})
+                print(f"Field retry failed in qualify_lead_with_ai: {e}. Keeping the repaired response.")
+                reasoning = repair.data.get("reasoning") or "No reasoning provided."
+                return {**repair.data, "reasoning": f"{reasoning} (Follow-up for missing fields failed; repaired response kept.)"}
+            repair = repair_response(retry_str, base=repair.data)
+        if repair.missing:
+            metrics.inc("llm_responses_total", 1, {"outcome": "failed"})
+            raise ResponseValidationError(f"missing or invalid fields: {', '.join(repair.missing)}")
+
+        metrics.inc("llm_responses_total", 1, {"outcome": outcome})
+        return repair.data
+    except ResponseValidationError as e:
+        print(f"Unrecoverable response from Groq API: {e}. Raw response: {ai_response_str}")
         return {
             "qualified_status": "Error",
             "priority_score": 0,
-            "reasoning": f"AI response was not valid JSON: {e}. Check prompt for strict formatting."
+            "reasoning": f"AI response could not be validated ({e}). Check prompt for strict formatting."
         }
     except Exception as e:
+        metrics.inc("llm_errors_total", 1, {"model": model_name})
         print(f"Error calling Groq API in qualify_lead_with_ai: {e}")
         return {
             "qualified_status": "Error",
@@ -105,6 +125,54 @@ def qualify_lead_with_ai(company_name: str, description: str) -> dict:
             "reasoning": f"AI processing failed due to API error: {e}"
         }
 
+def _escalation_reason(fast_result: dict, precheck: dict):
+    """Returns why a small-model result should be re-checked by the large model, or None to keep it."""
+    status = fast_result.get("qualified_status")
+    if status == "Error":
+        return "error"
+    if status == "Medium Fit":
+        return "medium_fit"
+    if status_distance(status, precheck["status"]) >= 2:
+        return "precheck_disagreement"
+    confidence = fast_result.get("confidence")
+    if confidence is not None and confidence < CASCADE_CONFIDENCE_THRESHOLD:
+        return "low_confidence"
+    return None
+
+
+def qualify_lead_cascade(company_name: str, description: str) -> dict:
+    """
+    Two-tier qualification: every lead goes to FAST_MODEL first, and only borderline results
+    (Medium Fit, disagreement with the local pre-check, low confidence or errors) are re-run on QUALITY_MODEL.
+    The returned dict carries "model_tier" ('fast' or 'escalated', i.e. which model's answer it is) and
+    "escalation_reason". If the large model fails, a usable small-model answer is kept and marked in its reasoning.
+    """
+    started = time.perf_counter()
+    result = qualify_lead_with_ai(company_name, description, FAST_MODEL)
+    reason = _escalation_reason(result, prescore_lead(company_name, description))
+    tier = "fast"
+    if reason:
+        metrics.inc("cascade_escalations_total", 1, {"reason": reason})
+        escalated = qualify_lead_with_ai(company_name, description, QUALITY_MODEL)
+        if escalated.get("qualified_status") != "Error":
+            result, tier = escalated, "escalated"
+        elif result.get("qualified_status") != "Error":
+            metrics.inc("cascade_escalation_failures_total", 1, {"reason": reason})
+            result = {**result, "reasoning": f"{result.get('reasoning', '')} (Large-model re-check failed; small-model result kept.)".strip()}
+        else:
+            result, tier = escalated, "escalated"
+    metrics.inc("cascade_leads_total", 1, {"tier": tier})
+    metrics.observe("cascade_lead_seconds", time.perf_counter() - started, {"tier": tier})
+    return {**result, "model_tier": tier, "escalation_reason": reason}
+
+
+def qualify_lead_for_mode(company_name: str, description: str, mode: str = DEFAULT_MODEL_MODE) -> dict:
+    """Dispatches to the right model strategy for `mode` (one of MODEL_MODES)."""
+    if mode == "cascade":
+        return qualify_lead_cascade(company_name, description)
+    model_name = QUALITY_MODEL if mode == "quality" else FAST_MODEL
+    return {**qualify_lead_with_ai(company_name, description, model_name), "model_tier": mode, "escalation_reason": None}
+
 # --- Agent Definition (Encapsulating Logic for uAgents/Fetch.ai Requirement) ---
 # For a solo Streamlit app, we typically use the Agent class to structure the logic
 # and satisfy the "Use of Agents" requirement. We don't run a full multi-agent network locally
@@ -124,13 +192,13 @@ lead_protocol = Protocol(name="lead_qualification", version="1.0")
 # --- Function to be Called from Streamlit (`app.py`) ---
 # This function simulates our agent processing a single lead.
 # It will call the AI qualification logic and also conceptually demonstrate Coral Protocol message sending.
-def process_single_lead_with_agent(company: str, description: str, lead_id: str):
+def process_single_lead_with_agent(company: str, description: str, lead_id: str, mode: str = DEFAULT_MODEL_MODE):
     """
     Simulates a Sales Qualifier Agent processing a single lead.
-    Includes AI qualification and a conceptual demonstration of Coral Protocol usage.
+    Includes AI qualification (using the model strategy `mode`) and a conceptual demonstration of Coral Protocol usage.
     """
     # Step 1: Agent performs reasoning and action by calling the AI
-    ai_result = qualify_lead_with_ai(company, description)
+    ai_result = qualify_lead_for_mode(company, description, mode)
 
     # Step 2: Conceptual Coral Protocol usage for logging or inter-agent communication
     # In a full multi-agent system (like a deployed Fetch.ai network),
@@ -147,5 +215,6 @@ def process_single_lead_with_agent(company: str, description: str, lead_id: str)
     return {
         "qualified_status": ai_result.get("qualified_status", "N/A"),
         "priority_score": ai_result.get("priority_score", 0),
-        "reasoning": ai_result.get("reasoning", "No reasoning provided.")
+        "reasoning": ai_result.get("reasoning", "No reasoning provided."),
+        "model_tier": ai_result.get("model_tier", mode)
     }
\ No newline at end of file
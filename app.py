@@ -7,8 +7,10 @@ from groq import Groq
 import pandas as pd
 import json
 import uuid
+import functools
 import plotly.express as px
 import time
+import tempfile
 from datetime import datetime
 import numpy as np
 
@@ -18,9 +20,24 @@ from firebase_admin import credentials, firestore
 
 # Import our agent logic (assuming this file exists and contains process_single_lead_with_agent)
 try:
-    from agent_logic import process_single_lead_with_agent
+    from agent_logic import process_single_lead_with_agent, MODEL_MODES, DEFAULT_MODEL_MODE
 except ImportError:
     st.error("Error: agent_logic.py not found. Please ensure it's in the same directory.")
+from metrics import MetricsRegistry, collected_by, metrics
+from preprocessing import DESCRIPTION_TOKEN_BUDGET
+from result_store import get_result_store, new_run_id
+from upload_cache import upload_cache, REQUIRED_COLUMNS
+from prioritization import build_lead_plan, TopLeadsTracker, partial_export_interval
+from fair_scheduler import get_scheduler, get_passthrough_scheduler, estimate_job_tokens, iter_completed
+from bulk_pipeline import BulkImportPipeline
+from session_memory import get_session_memory, process_memory_report
+from crm_export import CRM_ENDPOINT, export_leads, records_from_dataframe, run_namespace
+from run_profiler import RunProfiler
+from speculative import SPECULATIVE_DEFAULT, start_speculation, cancel_speculation, attach_or_submit
+from profile_cache import profile_cache
+from profile_compaction import (
+    get_profile_archive, needs_compaction, compact_profile, profile_total_interactions, profile_last_interaction
+)
 
 
 # Load Environment Variables
@@ -498,7 +515,11 @@ st.markdown("""
 firebase_config_json_str = os.getenv('__firebase_config')
 app_id = os.getenv('__app_id', 'luminova_test_app')
 
-if firebase_config_json_str:
+if os.getenv('LUMINOVA_FIRESTORE_BACKEND') == 'fake':
+    # In-memory stand-in for load tests and local runs (see fake_firestore.py)
+    from fake_firestore import get_fake_firestore
+    db = get_fake_firestore()
+elif firebase_config_json_str:
     try:
         cred_dict = json.loads(firebase_config_json_str)
         cred = credentials.Certificate(cred_dict)
@@ -513,21 +534,39 @@ else:
     st.warning("⚠️ Firebase not initialized. Set '__firebase_config' in deployment environment.")
     db = None
 
+# Old interactions are rolled up and archived compressed outside the profile document
+profile_archive = get_profile_archive(db)
+
+def _load_user_profile(doc_ref):
+    with metrics.timer("firestore_read_seconds"):
+        doc = doc_ref.get()
+    if doc.exists:
+        profile = doc.to_dict()
+        # Profiles saved before compaction existed are compacted once on load
+        if needs_compaction(profile) and compact_profile(doc_ref.id, profile, profile_archive):
+            with metrics.timer("firestore_write_seconds"):
+                doc_ref.set(profile)
+        return profile
+    else:
+        new_profile = {"past_interactions": [], "preferences": {}, "created_at": datetime.now().isoformat()}
+        with metrics.timer("firestore_write_seconds"):
+            doc_ref.set(new_profile)
+        return new_profile
+
 def get_user_profile(user_id_param):
     if db:
+        # Served from the process-wide profile cache; Firestore is only read on a miss (see profile_cache.py)
         doc_ref = db.collection('users').document(user_id_param)
-        doc = doc_ref.get()
-        if doc.exists:
-            return doc.to_dict()
-        else:
-            new_profile = {"past_interactions": [], "preferences": {}, "created_at": datetime.now().isoformat()}
-            doc_ref.set(new_profile)
-            return new_profile
+        return profile_cache.get(user_id_param, lambda: _load_user_profile(doc_ref), doc_ref)
     return {"past_interactions": [], "preferences": {}, "created_at": datetime.now().isoformat()}
 
 def save_user_profile(user_id_param, profile_data):
+    if needs_compaction(profile_data): # Keeps the hot profile document bounded (amortized over many saves)
+        compact_profile(user_id_param, profile_data, profile_archive)
     if db:
-        db.collection('users').document(user_id_param).set(profile_data)
+        with metrics.timer("firestore_write_seconds"):
+            db.collection('users').document(user_id_param).set(profile_data)
+        profile_cache.put(user_id_param, profile_data) # Write-through: the next read stays in memory
     else:
         # In a deployed scenario, this error might not be shown directly to user
         st.error("Cannot save profile: Firebase not connected. User data will not persist.")
@@ -540,6 +579,34 @@ if not groq_api_key:
 
 groq_client = Groq(api_key=groq_api_key)
 
+# --- Performance Metrics Panel ---
+def render_metrics_panel(registry):
+    """
+    Renders p50/p95 latencies, token throughput and estimated cost from `registry` (this session's metrics,
+    not the process-wide ones). Called live during analysis and once more in the footer panel.
+    """
+    snapshot = registry.snapshot()
+    derived = snapshot["derived"]
+    m_col1, m_col2, m_col3 = st.columns(3)
+    m_col1.metric("Tokens (prompt / completion)", f"{derived['prompt_tokens']} / {derived['completion_tokens']}")
+    m_col2.metric("Completion Tokens/sec", f"{derived['completion_tokens_per_second']:.1f}")
+    m_col3.metric("Estimated Cost", f"${derived['estimated_cost_usd']:.4f}")
+
+    latency_rows = []
+    for name, series in snapshot["histograms"].items():
+        for entry in series:
+            label_str = ", ".join(f"{k}={v}" for k, v in entry["labels"].items())
+            latency_rows.append({
+                "Metric": f"{name} ({label_str})" if label_str else name,
+                "Count": entry["count"],
+                "p50 (ms)": round(entry["p50"] * 1000, 1),
+                "p95 (ms)": round(entry["p95"] * 1000, 1),
+            })
+    if latency_rows:
+        st.dataframe(pd.DataFrame(latency_rows), use_container_width=True, hide_index=True)
+    else:
+        st.caption("No model calls recorded in this session yet. Run an analysis to populate this panel.")
+
 # --- Main App Header (with custom HTML/CSS) ---
 st.markdown("""
 <div class="main-header">
@@ -554,6 +621,26 @@ if 'user_id' not in st.session_state:
     st.session_state.user_id = os.getenv('__initial_auth_token', str(uuid.uuid4()))
 current_user_id = st.session_state.user_id
 
+# --- Qualification backend: in-process agent, or the shared local HTTP service if configured ---
+@st.cache_resource
+def get_service_client(url):
+    # One client per process, so its keep-alive connections survive reruns and are shared by sessions
+    from qualification_service import QualificationClient
+    return QualificationClient(url)
+
+service_url = os.getenv("LUMINOVA_SERVICE_URL")
+if 'session_metrics' not in st.session_state:
+    # Latency, tokens and cost of this session's leads only; `metrics` keeps the process-wide totals
+    st.session_state.session_metrics = MetricsRegistry()
+session_metrics = st.session_state.session_metrics
+if service_url:
+    qualify_lead = functools.partial(get_service_client(service_url).process_single_lead_with_agent, user_id=current_user_id)
+    job_scheduler = get_passthrough_scheduler() # Fair per-user queuing only; the service applies the token quotas
+else:
+    qualify_lead = process_single_lead_with_agent
+    job_scheduler = get_scheduler()
+qualify_lead = collected_by(session_metrics, qualify_lead) # Runs on scheduler threads; still counted for this session
+
 # --- Sidebar Theme Toggle ---
 if 'sidebar_theme' not in st.session_state:
     st.session_state.sidebar_theme = 'dark'
@@ -577,7 +664,7 @@ with st.sidebar:
         user_profile = get_user_profile(current_user_id)
         
         # Profile Statistics
-        total_interactions = len(user_profile.get("past_interactions", []) if user_profile else [])
+        total_interactions = profile_total_interactions(user_profile)
         created_at = user_profile.get('created_at', 'N/A') if user_profile else 'N/A'
         created_at_str = created_at[:10] if created_at != 'N/A' else 'N/A'
 
@@ -586,7 +673,7 @@ with st.sidebar:
             <h4>📊 Activity Statistics</h4> 
             <p style="margin: 0.5rem 0;">Total Leads Processed: <strong>{total_interactions}</strong></p>
             <p style="margin: 0.5rem 0;">Profile Created: <strong>{created_at_str}</strong></p>
-            <p style="margin: 0.5rem 0;">Last Interaction: <strong>{user_profile['past_interactions'][-1]['timestamp'][:16].replace('T', ' ') if user_profile and user_profile.get('past_interactions') else 'N/A'}</strong></p>
+            <p style="margin: 0.5rem 0;">Last Interaction: <strong>{profile_last_interaction(user_profile)}</strong></p>
         </div>
         """, unsafe_allow_html=True)
 
@@ -594,6 +681,32 @@ with st.sidebar:
         with st.expander("👁️ View Raw Knowledge Graph"):
             st.json(user_profile) # Display the raw profile JSON
 
+    # Model strategy: fast (8B only), quality (70B only) or cascade (8B first, escalate borderline leads)
+    st.header("⚙️ Analysis Settings")
+    model_mode = st.selectbox(
+        "Model Mode",
+        options=list(MODEL_MODES),
+        index=list(MODEL_MODES).index(DEFAULT_MODEL_MODE) if DEFAULT_MODEL_MODE in MODEL_MODES else 0,
+        help="'cascade' qualifies every lead with the fast model and escalates only Medium Fit, low-confidence or pre-check disagreements to the larger model."
+    )
+    priority_first = st.checkbox(
+        "Priority-first processing",
+        value=True,
+        help="Qualify the most promising leads first (by a local keyword pre-score) instead of in file order."
+    )
+    speculative_mode = st.checkbox(
+        "Speculative analysis",
+        value=SPECULATIVE_DEFAULT,
+        help="Start qualifying the first rows in the background as soon as your file is validated, so results are ready sooner after you click Analyze."
+    )
+    if not speculative_mode:
+        cancel_speculation(st.session_state)
+    profile_run = st.checkbox(
+        "Profile this run",
+        value=False,
+        help="Sample where time goes during the analysis (parsing, model calls, Firestore, UI updates) and offer a flame graph download. Low overhead."
+    )
+
 # --- Main Content Area - Metric Cards ---
 col1, col2, col3 = st.columns(3)
 
@@ -637,14 +750,18 @@ uploaded_file = st.file_uploader(
 )
 
 df_original = pd.DataFrame()
+upload_hash = None
+session_memory = get_session_memory(st.session_state) # Byte-budgeted; large objects spill to disk
+result_store = get_result_store(st.session_state)
 
 if uploaded_file is not None:
     try:
+        # Parsed frames are cached by content hash, so reruns with the same file skip parsing entirely
         with st.spinner("🔄 Loading your data..."):
-            if uploaded_file.name.endswith('.csv'):
-                df_original = pd.read_csv(uploaded_file)
-            else: # Must be .xlsx
-                df_original = pd.read_excel(uploaded_file)
+            parsed_upload = upload_cache.load(uploaded_file.name, uploaded_file.getvalue())
+        upload_hash = parsed_upload.upload_hash
+        df_original = parsed_upload.df
+        metrics.observe("upload_load_seconds", parsed_upload.parse_seconds, {"source": parsed_upload.source})
         
         st.success(f"Successfully loaded {len(df_original)} leads from {uploaded_file.name} 🎉. Scroll down to preview!")
         
@@ -658,19 +775,161 @@ if uploaded_file is not None:
         
         st.dataframe(df_original.head(10), use_container_width=True, height=350) # Show more rows, fixed height with scroll
         
-        # Check for required columns
-        required_columns = ['Company Name', 'Description']
-        if not all(col in df_original.columns for col in required_columns):
-            st.error(f"Missing required columns. Please ensure your file has '{required_columns[0]}' and '{required_columns[1]}' columns.")
+        # Check for required columns (validated once, when the upload was first parsed)
+        if not parsed_upload.is_valid:
+            st.error(f"Missing required columns. Please ensure your file has '{REQUIRED_COLUMNS[0]}' and '{REQUIRED_COLUMNS[1]}' columns.")
             df_original = pd.DataFrame()
+            cancel_speculation(st.session_state)
         else:
             st.success("Data format validated! Click the 'Analyze' button below to proceed. 👇")
+            if speculative_mode:
+                start_speculation(
+                    st.session_state, current_user_id, qualify_lead, upload_hash, model_mode,
+                    lambda: build_lead_plan(df_original, priority_first), scheduler=job_scheduler
+                )
             
     except Exception as e:
         st.error(f"Error reading file: {e}. Please ensure it's a valid CSV/Excel format and not corrupted. 😔")
         df_original = pd.DataFrame()
+        cancel_speculation(st.session_state)
+else:
+    cancel_speculation(st.session_state) # File removed: nothing left to speculate on
+
+# --- Post-Analysis Views ---
+def render_analysis_results(run, df_original):
+    """
+    Renders charts, comparison tables and the download for a stored run.
+    Called on every rerun from the session's ResultStore, so the views survive widget interactions.
+    """
+    processed_df = run.processed_df
+    
+    # --- Cascade tier breakdown (how many leads paid for the large model) ---
+    if run.model_mode == "cascade":
+        tier_latency = {
+            entry["labels"].get("tier"): entry
+            for entry in session_metrics.snapshot()["histograms"].get("cascade_lead_seconds", []) # This session's leads
+        }
+        tier_cols = st.columns(2)
+        for tier_col, tier in zip(tier_cols, ("fast", "escalated")):
+            tier_count = int((processed_df["Model Tier"] == tier).sum())
+            tier_p50 = tier_latency.get(tier, {}).get("p50", 0.0)
+            tier_col.metric(f"{tier.title()} Tier Leads", str(tier_count), f"p50 {tier_p50 * 1000:.0f} ms", delta_color="off")
+
+    # --- Analysis Results & Visualizations ---
+    st.markdown("""
+    <div class="chart-container">
+        <h3>Analysis Results & Visualizations <img src="https://fonts.gstatic.com/s/e/notoemoji/latest/1f4c8/emoji.svg" alt="chart_up" width="30" height="30" style="vertical-align: middle;"></h3>
+        <p>Gain quick insights into your lead distribution and priority.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    chart_col1, chart_col2 = st.columns(2)
+
+    with chart_col1:
+        # Status distribution pie chart
+        status_counts = processed_df['Qualified Status'].value_counts()
+        fig_pie = px.pie(
+            values=status_counts.values,
+            names=status_counts.index,
+            title="Lead Qualification Distribution",
+            color_discrete_sequence=px.colors.qualitative.Pastel # Softer colors
+        )
+        fig_pie.update_layout(
+            height=480, # Slightly taller for better view
+            margin=dict(t=60, b=0, l=0, r=0), # Adjust margins
+            paper_bgcolor='rgba(0,0,0,0)', # Transparent background
+            plot_bgcolor='rgba(0,0,0,0)',
+            font_color='#e0e6f2', # Text color
+            title_font_color='#9333ea', # Title color
+            legend_font_color='#e0e6f2', # Legend text color
+            legend_title_font_color='#9333ea' # Legend title color
+        )
+        st.plotly_chart(fig_pie, use_container_width=True)
+
+    with chart_col2:
+        # Priority score distribution histogram
+        fig_hist = px.histogram(
+            processed_df,
+            x='Priority Score',
+            title="Priority Score Distribution",
+            nbins=6, # 0-5
+            color_discrete_sequence=['#7c3aed'], # Accent color
+            category_orders={"Priority Score": [0, 1, 2, 3, 4, 5]}, # Ensure order
+            text_auto=True # Show values on bars
+        )
+        fig_hist.update_layout(
+            height=480, # Slightly taller
+            margin=dict(t=60, b=0, l=0, r=0),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font_color='#e0e6f2',
+            title_font_color='#9333ea',
+            xaxis_title="Priority Score",
+            yaxis_title="Number of Leads",
+            xaxis=dict(tickfont=dict(color='#e0e6f2'), title_font=dict(color='#a78bfa')),
+            yaxis=dict(tickfont=dict(color='#e0e6f2'), title_font=dict(color='#a78bfa'))
+        )
+        st.plotly_chart(fig_hist, use_container_width=True)
+
+    # --- Side-by-side data comparison ---
+    st.markdown("""
+    <div class="data-card">
+        <h3>Data Comparison: Original vs. AI Processed <img src="https://fonts.gstatic.com/s/e/notoemoji/latest/1f50e/emoji.svg" alt="magnifying_glass" width="30" height="30" style="vertical-align: middle;"></h3>
+        <p>See the transformation of your raw leads into actionable insights.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Use st.expander for large tables to keep UI clean but allow full view
+    with st.expander("👇 Click to view Full Data Comparison Tables"):
+        col_orig, col_proc = st.columns(2)
+        with col_orig:
+            st.markdown("**Original Leads**")
+            st.dataframe(df_original, use_container_width=True, height=550) # Fixed height with scroll
+        with col_proc:
+            st.markdown("**AI Processed Leads**")
+            st.dataframe(processed_df, use_container_width=True, height=550) # Fixed height with scroll
+
+    # --- Download section ---
+    st.markdown("""
+    <div class="download-section">
+        <h3>Download Your Enhanced Leads <img src="https://fonts.gstatic.com/s/e/notoemoji/latest/1f4e5/emoji.svg" alt="download" width="30" height="30" style="vertical-align: middle;"></h3>
+        <p>Get your AI-processed data with qualifications and priorities, ready for your CRM or next steps.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.download_button(
+        label="Download Processed Leads (CSV)",
+        data=run.csv_bytes, # Encoded once when the run was stored
+        file_name=f"luminova_ai_processed_leads_{datetime.fromtimestamp(run.created_at).strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv",
+        use_container_width=True,
+        key=f"download_{run.run_id}",
+        help="Click to download the spreadsheet with AI-generated qualifications and priorities."
+    )
+
+    # --- CRM push (only when an endpoint is configured) ---
+    if CRM_ENDPOINT:
+        if st.button("🔗 Push to CRM", use_container_width=True, key=f"crm_push_{run.run_id}",
+                     help="Send the qualified leads (High Fit first) to your CRM in batches."):
+            with st.spinner("Sending leads to your CRM..."):
+                st.session_state[f"crm_report_{run.run_id}"] = export_leads(
+                    records_from_dataframe(processed_df, run_namespace(run.upload_hash, run.run_id)), CRM_ENDPOINT
+                )
+        crm_report = st.session_state.get(f"crm_report_{run.run_id}")
+        if crm_report is not None:
+            if crm_report.leads_failed:
+                st.warning(f"Sent {crm_report.leads_sent} leads to your CRM; {crm_report.leads_failed} failed after retries.")
+                for error in crm_report.errors:
+                    st.caption(error)
+            else:
+                st.success(f"Sent {crm_report.leads_sent} leads to your CRM in {crm_report.batches} batches ({crm_report.elapsed_seconds}s).")
 
 # --- Processing Section ---
+# A profiled run that was interrupted by a rerun leaves its sampler thread running; stop it here
+leftover_profiler = st.session_state.pop("active_run_profiler", None)
+if leftover_profiler is not None:
+    leftover_profiler.stop()
+
 if not df_original.empty:
     st.markdown("---") # Visual separator
     
@@ -684,7 +943,15 @@ if not df_original.empty:
             </div>
             """, unsafe_allow_html=True)
             
+            run_id = new_run_id()
+            run_profile = RunProfiler(
+                enabled=profile_run, worker_threads=functools.partial(job_scheduler.running_threads, current_user_id)
+            ).start()
+            st.session_state.active_run_profiler = run_profile
+            if parsed_upload.source == "parsed": # Parsed in this rerun; cache hits and earlier parses are not part of the run
+                run_profile.add_stage("upload_parse", parsed_upload.parse_seconds)
             processed_leads_data = []
+            processed_positions = [] # File position of each processed row, to restore file order at the end
             progress_status_placeholder = st.empty() # Placeholder for processing text
             progress_bar = st.progress(0)
             
@@ -696,37 +963,52 @@ if not df_original.empty:
             medium_fit_metric = metric_cols[1].metric("Medium Fit", "0")
             low_fit_metric = metric_cols[2].metric("Low Fit", "0")
             not_fit_metric = metric_cols[3].metric("Not Fit", "0")
+            live_metrics_placeholder = st.empty() # Live latency/token panel, refreshed as leads complete
             
             high_count = medium_count = low_count = not_fit_count = 0
             
-            # Helper function to safely convert to string, handling NaN, None, pd.NA, Series, NDFrame
-            def safe_str(val):
-                if val is None:
-                    return ""
-                try:
-                    # Handles np.nan, pd.NA, pd.NaT
-                    if pd.isna(val):
-                        return ""
-                except Exception:
-                    pass
-                # If it's a Series or NDFrame, treat as empty
-                if hasattr(val, 'ndim') and val.ndim > 0:
-                    return ""
-                return str(val)
+            # Row extraction, token budget enforcement and priority ordering (see prioritization.py)
+            with run_profile.stage("plan_leads"):
+                lead_plan = build_lead_plan(df_original, priority_first)
+            lead_rows = lead_plan.lead_rows
+            shortened_rows, shortened_row_set = lead_plan.shortened_rows, lead_plan.shortened_row_set
+            prescores = lead_plan.prescores
+            if shortened_rows:
+                st.info(f"✂️ {len(shortened_rows)} description(s) exceeded the {DESCRIPTION_TOKEN_BUDGET}-token budget and were shortened before analysis.")
+                with st.expander("View shortened rows"):
+                    st.dataframe(pd.DataFrame([
+                        {"Company Name": lead_rows[entry["row"]][1], **entry} for entry in shortened_rows
+                    ]), use_container_width=True, hide_index=True)
             
-            for idx, (df_index, row) in enumerate(df_original.iterrows()):
-                # Fix 2: Use .get() for DataFrame row access to ensure scalar values
-                company_val = row.get('Company Name', "")
-                description_val = row.get('Description', "")
-                company_str = safe_str(company_val)
-                description_str = safe_str(description_val)
-                
-                progress_status_placeholder.markdown(f"**Processing:** <span style='color:#a78bfa;'>{company_str}</span> (Lead {idx + 1} of {total_leads})...", unsafe_allow_html=True)
-                
-                # Add a small delay for visual effect and to prevent overwhelming API (if many leads)
-                # time.sleep(0.05) # Uncomment if you want to slow down for demo
-                
-                result = process_single_lead_with_agent(company_str, description_str, f"lead_{df_index}")
+            # Priority-first: qualify likely High Fit leads first, with a live "top leads so far" view
+            top_leads = TopLeadsTracker(size=10)
+            refresh_every = partial_export_interval(total_leads)
+            top_leads_placeholder = st.empty()
+            
+            # Submit every lead to the process-wide fair-share scheduler, which shares the Groq quota
+            # fairly between all sessions (with a remote service, the service applies the quota and this
+            # only queues the requests fairly); results come back as they complete. Leads already started
+            # speculatively for this upload are attached instead of being submitted again.
+            with run_profile.stage("submit_leads"):
+                lead_futures, speculative_reused = attach_or_submit(
+                    st.session_state, current_user_id, qualify_lead, upload_hash, model_mode, lead_plan, job_scheduler
+                )
+            if speculative_reused:
+                st.info(f"⚡ {speculative_reused} lead(s) were already being qualified in the background and have been picked up.")
+            
+            def show_queue_position():
+                queue_info = job_scheduler.queue_position(current_user_id)
+                progress_status_placeholder.markdown(
+                    f"⏳ **Waiting for shared AI capacity:** {queue_info['queued']} of your leads queued, "
+                    f"{queue_info['running']} running, {queue_info['ahead']} jobs from other users ahead.",
+                    unsafe_allow_html=True
+                )
+            
+            completed_leads = run_profile.timed_iter(iter_completed(lead_futures, on_wait=show_queue_position), "wait_for_results")
+            for idx, (position, result) in enumerate(completed_leads):
+                ui_started = time.perf_counter()
+                df_index, company_str, description_str = lead_rows[position]
+                progress_status_placeholder.markdown(f"**Processed:** <span style='color:#a78bfa;'>{company_str}</span> (Lead {idx + 1} of {total_leads})...", unsafe_allow_html=True)
                 
                 # Update counters based on AI result
                 status = result.get("qualified_status", "Not Fit")
@@ -745,13 +1027,20 @@ if not df_original.empty:
                 low_fit_metric.metric("Low Fit", str(low_count))
                 not_fit_metric.metric("Not Fit", str(not_fit_count))
                 
-                processed_leads_data.append({
+                processed_row = {
+                    "Lead ID": f"lead_{df_index}",
                     "Original Company Name": company_str, # Keep original object for display
                     "Original Description": description_str, # Keep original object for display
                     "Qualified Status": result.get("qualified_status", "N/A"),
                     "Priority Score": result.get("priority_score", 0),
-                    "Reasoning": result.get("reasoning", "No reasoning provided")
-                })
+                    "Reasoning": result.get("reasoning", "No reasoning provided"),
+                    "Description Shortened": position in shortened_row_set,
+                    "Model Tier": result.get("model_tier", model_mode)
+                }
+                processed_leads_data.append(processed_row)
+                processed_positions.append(position)
+                top_leads.add(position, prescores[position], processed_row)
+                run_profile.add_stage("result_bookkeeping", time.perf_counter() - ui_started)
                 
                 # Update user profile in Firebase
                 if user_profile and "past_interactions" in user_profile:
@@ -762,10 +1051,12 @@ if not df_original.empty:
                         "analysis": result,
                         "timestamp": datetime.now().isoformat()
                     })
-                    save_user_profile(current_user_id, user_profile)
+                    with run_profile.stage("profile_save"):
+                        save_user_profile(current_user_id, user_profile)
                 
                 # Update sidebar display to show knowledge graph growing
                 # Clear and re-render sidebar content within its placeholder
+                render_started = time.perf_counter()
                 sidebar_content_placeholder.empty()
                 with sidebar_content_placeholder.container():
                     # Re-using st.header/subheader for reliable CSS targeting
@@ -781,131 +1072,182 @@ if not df_original.empty:
 
                     # Fix 3: Add None checks before using .get()
                     if updated_profile_for_display:
-                        total_leads = len(updated_profile_for_display.get("past_interactions", []))
+                        profile_total_leads = profile_total_interactions(updated_profile_for_display)
                         created_at = updated_profile_for_display.get('created_at', 'N/A')[:10]
-                        last_interaction = (
-                            updated_profile_for_display['past_interactions'][-1]['timestamp'][:16].replace('T', ' ')
-                            if updated_profile_for_display.get('past_interactions') else 'N/A'
-                        )
+                        last_interaction = profile_last_interaction(updated_profile_for_display)
                     else:
-                        total_leads = 0
+                        profile_total_leads = 0
                         created_at = 'N/A'
                         last_interaction = 'N/A'
                     st.markdown(f"""
                     <div class="user-profile-card">
                         <h4>📊 Activity Statistics</h4> 
-                        <p style="margin: 0.5rem 0;">Total Leads Processed: <strong>{total_leads}</strong></p>
+                        <p style="margin: 0.5rem 0;">Total Leads Processed: <strong>{profile_total_leads}</strong></p>
                         <p style="margin: 0.5rem 0;">Profile Created: <strong>{created_at}</strong></p>
                         <p style="margin: 0.5rem 0;">Last Interaction: <strong>{last_interaction}</strong></p>
                     </div>
                     """, unsafe_allow_html=True)
                     with st.expander("👁️ View Raw Knowledge Graph"):
                          st.json(updated_profile_for_display)
+                metrics.observe("sidebar_render_seconds", time.perf_counter() - render_started)
+                run_profile.add_stage("sidebar_render", time.perf_counter() - render_started)
 
+                ui_started = time.perf_counter()
                 progress_bar.progress((idx + 1) / total_leads)
+                if (idx + 1) % 5 == 0 or idx + 1 == total_leads: # Throttle so the panel itself stays cheap
+                    with live_metrics_placeholder.container():
+                        render_metrics_panel(session_metrics)
+                if (idx + 1) % refresh_every == 0 and idx + 1 < total_leads:
+                    with top_leads_placeholder.container():
+                        st.markdown(f"**🏆 Top Leads So Far** ({idx + 1} of {total_leads} processed)")
+                        st.dataframe(top_leads.to_dataframe(), use_container_width=True, hide_index=True)
+                        st.download_button(
+                            label="Download Partial Results (CSV)",
+                            data=pd.DataFrame(processed_leads_data).to_csv(index=False).encode('utf-8'),
+                            file_name=f"luminova_ai_partial_leads_{run_id}_{idx + 1}.csv",
+                            mime="text/csv",
+                            key=f"partial_download_{run_id}_{idx + 1}",
+                            on_click="ignore" # Don't rerun the script (which would abort the analysis in progress)
+                        )
+                run_profile.add_stage("progress_ui", time.perf_counter() - ui_started)
             
             # Clear progress elements after completion
             progress_status_placeholder.empty()
             progress_bar.empty()
+            top_leads_placeholder.empty()
             
             if processed_leads_data:
-                processed_df = pd.DataFrame(processed_leads_data)
-                
-                # --- Analysis Results & Visualizations ---
-                st.markdown("""
-                <div class="chart-container">
-                    <h3>Analysis Results & Visualizations <img src="https://fonts.gstatic.com/s/e/notoemoji/latest/1f4c8/emoji.svg" alt="chart_up" width="30" height="30" style="vertical-align: middle;"></h3>
-                    <p>Gain quick insights into your lead distribution and priority.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                chart_col1, chart_col2 = st.columns(2)
-                
-                with chart_col1:
-                    # Status distribution pie chart
-                    status_counts = processed_df['Qualified Status'].value_counts()
-                    fig_pie = px.pie(
-                        values=status_counts.values,
-                        names=status_counts.index,
-                        title="Lead Qualification Distribution",
-                        color_discrete_sequence=px.colors.qualitative.Pastel # Softer colors
-                    )
-                    fig_pie.update_layout(
-                        height=480, # Slightly taller for better view
-                        margin=dict(t=60, b=0, l=0, r=0), # Adjust margins
-                        paper_bgcolor='rgba(0,0,0,0)', # Transparent background
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        font_color='#e0e6f2', # Text color
-                        title_font_color='#9333ea', # Title color
-                        legend_font_color='#e0e6f2', # Legend text color
-                        legend_title_font_color='#9333ea' # Legend title color
-                    )
-                    st.plotly_chart(fig_pie, use_container_width=True)
-                
-                with chart_col2:
-                    # Priority score distribution histogram
-                    fig_hist = px.histogram(
-                        processed_df,
-                        x='Priority Score',
-                        title="Priority Score Distribution",
-                        nbins=6, # 0-5
-                        color_discrete_sequence=['#7c3aed'], # Accent color
-                        category_orders={"Priority Score": [0, 1, 2, 3, 4, 5]}, # Ensure order
-                        text_auto=True # Show values on bars
-                    )
-                    fig_hist.update_layout(
-                        height=480, # Slightly taller
-                        margin=dict(t=60, b=0, l=0, r=0),
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        font_color='#e0e6f2',
-                        title_font_color='#9333ea',
-                        xaxis_title="Priority Score",
-                        yaxis_title="Number of Leads",
-                        xaxis=dict(tickfont=dict(color='#e0e6f2'), title_font=dict(color='#a78bfa')),
-                        yaxis=dict(tickfont=dict(color='#e0e6f2'), title_font=dict(color='#a78bfa'))
-                    )
-                    st.plotly_chart(fig_hist, use_container_width=True)
-                
-                # --- Side-by-side data comparison ---
-                st.markdown("""
-                <div class="data-card">
-                    <h3>Data Comparison: Original vs. AI Processed <img src="https://fonts.gstatic.com/s/e/notoemoji/latest/1f50e/emoji.svg" alt="magnifying_glass" width="30" height="30" style="vertical-align: middle;"></h3>
-                    <p>See the transformation of your raw leads into actionable insights.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Use st.expander for large tables to keep UI clean but allow full view
-                with st.expander("👇 Click to view Full Data Comparison Tables"):
-                    col_orig, col_proc = st.columns(2)
-                    with col_orig:
-                        st.markdown("**Original Leads**")
-                        st.dataframe(df_original, use_container_width=True, height=550) # Fixed height with scroll
-                    with col_proc:
-                        st.markdown("**AI Processed Leads**")
-                        st.dataframe(processed_df, use_container_width=True, height=550) # Fixed height with scroll
-                
-                # --- Download section ---
-                st.markdown("""
-                <div class="download-section">
-                    <h3>Download Your Enhanced Leads <img src="https://fonts.gstatic.com/s/e/notoemoji/latest/1f4e5/emoji.svg" alt="download" width="30" height="30" style="vertical-align: middle;"></h3>
-                    <p>Get your AI-processed data with qualifications and priorities, ready for your CRM or next steps.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                csv_output = processed_df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download Processed Leads (CSV)",
-                    data=csv_output,
-                    file_name=f"luminova_ai_processed_leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                    help="Click to download the spreadsheet with AI-generated qualifications and priorities."
-                )
-                
+                # Restore file order so the processed table lines up with the original data
+                processed_leads_data = [row for _, row in sorted(zip(processed_positions, processed_leads_data), key=lambda pair: pair[0])]
+                # Keep the run in the session store; the views below render from it on this and every later rerun
+                with run_profile.stage("store_results"):
+                    result_store.put(upload_hash, run_id, pd.DataFrame(processed_leads_data), model_mode)
                 st.success("Analysis complete! Your leads have been qualified and prioritized. 🎉 Ready for action!")
             else:
                 st.warning("No leads were processed. Please check your data and try again. 🤔")
+            
+            run_profile.stop()
+            st.session_state.pop("active_run_profiler", None)
+            if run_profile.enabled:
+                # Kept across reruns; the collapsed stacks can be large, so they go to spillable session memory
+                session_memory.put("run_profile_collapsed", run_profile.sampler.collapsed().encode('utf-8'))
+                st.session_state.run_profile_report = {
+                    "run_id": run_id,
+                    "stages": run_profile.stage_table(),
+                    "top_functions": run_profile.sampler.top_functions(20),
+                    "summary_json": run_profile.to_json(),
+                }
+
+    # --- Post-analysis views, rendered from stored results so they survive reruns ---
+    stored_run = result_store.latest(upload_hash)
+    if stored_run is not None:
+        render_analysis_results(stored_run, df_original)
+
+    # --- Run profile (when "Profile this run" was on) ---
+    run_profile_report = st.session_state.get("run_profile_report")
+    if run_profile_report and "run_profile_collapsed" in session_memory:
+        with st.expander("🔬 Run Profile: where the time went"):
+            st.markdown("**Wall time by stage**")
+            st.dataframe(run_profile_report["stages"], use_container_width=True, hide_index=True)
+            st.markdown("**Hottest functions** (sampled across all threads, idle waits excluded)")
+            st.dataframe(run_profile_report["top_functions"], use_container_width=True, hide_index=True)
+            profile_col1, profile_col2 = st.columns(2)
+            with profile_col1:
+                st.download_button(
+                    label="Download Flame Graph Stacks",
+                    data=session_memory.get("run_profile_collapsed"),
+                    file_name=f"luminova_profile_{run_profile_report['run_id']}.collapsed.txt",
+                    mime="text/plain",
+                    on_click="ignore",
+                    use_container_width=True,
+                    help="Collapsed stacks: open in speedscope.app or render with flamegraph.pl."
+                )
+            with profile_col2:
+                st.download_button(
+                    label="Download Stage Summary (JSON)",
+                    data=run_profile_report["summary_json"].encode('utf-8'),
+                    file_name=f"luminova_profile_{run_profile_report['run_id']}.json",
+                    mime="application/json",
+                    on_click="ignore",
+                    use_container_width=True
+                )
+
+# --- Bulk Import (many files through the staged pipeline) ---
+with st.expander("📦 Bulk Import: qualify many files at once"):
+    st.caption("Files are parsed, normalized, qualified and written in overlapping stages. "
+               "Files are read in row chunks and results stream to one combined CSV, so processing memory stays flat; "
+               "the uploaded files themselves and the finished download are still held in memory.")
+    bulk_files = st.file_uploader("Choose lead files", type=["csv", "xlsx"], accept_multiple_files=True, key="bulk_files")
+    if st.button("📦 Run Bulk Import", disabled=not bulk_files, use_container_width=True):
+        def qualify_via_scheduler(company, description, lead_id):
+            # Bulk leads are scheduled like any other session's leads
+            return job_scheduler.submit(
+                current_user_id, qualify_lead, company, description, lead_id,
+                mode=model_mode, cost_tokens=estimate_job_tokens(company, description)
+            ).result()
+
+        bulk_output_path = os.path.join(tempfile.gettempdir(), f"luminova_bulk_{current_user_id[:8]}_{new_run_id()}.csv")
+        pipeline = BulkImportPipeline(
+            [(f.name, f) for f in bulk_files], bulk_output_path, qualify_via_scheduler # Read in place, not copied
+        )
+        bulk_status_placeholder = st.empty()
+        bulk_report = pipeline.run(
+            on_progress=lambda report: bulk_status_placeholder.dataframe(pd.DataFrame(report["stages"]), use_container_width=True),
+            progress_interval=1.0
+        )
+        bulk_status_placeholder.dataframe(pd.DataFrame(bulk_report["stages"]), use_container_width=True)
+        with open(bulk_output_path, "rb") as f:
+            session_memory.put("bulk_results_csv", f.read())
+        os.remove(bulk_output_path)
+        st.session_state.bulk_report = bulk_report
+
+    if "bulk_results_csv" in session_memory and st.session_state.get("bulk_report"):
+        report = st.session_state.bulk_report
+        st.success(f"Bulk import finished: {report['leads_written']} leads from {report['files']} files in {report['elapsed_seconds']}s.")
+        for error in report["errors"]:
+            st.warning(error)
+        st.download_button(
+            label="Download Bulk Results (CSV)",
+            data=session_memory.get("bulk_results_csv"),
+            file_name=f"luminova_bulk_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv",
+            on_click="ignore",
+            use_container_width=True
+        )
+
+# --- Performance Metrics (latency, tokens, cost) ---
+with st.expander("⚡ Performance Metrics"):
+    st.caption("Model latency, tokens and cost of this session's analyses.")
+    render_metrics_panel(session_metrics)
+    process_memory = process_memory_report()
+    st.markdown(
+        f"**Session memory:** {session_memory.memory_bytes() / 1024:,.0f} KB in RAM, "
+        f"{session_memory.disk_bytes() / 1024:,.0f} KB spilled to disk "
+        f"(budget {session_memory.budget_bytes / 1024 / 1024:.0f} MB). "
+        f"**All sessions:** {process_memory['sessions']} active, {process_memory['memory_bytes'] / 1024 / 1024:,.1f} MB in RAM, "
+        f"{process_memory['disk_bytes'] / 1024 / 1024:,.1f} MB on disk."
+    )
+    session_memory_report = session_memory.report()
+    if len(session_memory_report):
+        st.dataframe(session_memory_report, use_container_width=True, hide_index=True)
+    st.caption("The exports below are process-wide: they cover every session served by this app instance.")
+    export_col1, export_col2 = st.columns(2)
+    with export_col1:
+        st.download_button(
+            label="Export Metrics (JSON)",
+            data=metrics.to_json().encode('utf-8'),
+            file_name=f"luminova_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with export_col2:
+        st.download_button(
+            label="Export Metrics (Prometheus)",
+            data=metrics.to_prometheus().encode('utf-8'),
+            file_name=f"luminova_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prom",
+            mime="text/plain",
+            use_container_width=True
+        )
 
 # --- Footer ---
 st.markdown("---")
@@ -0,0 +1,298 @@
+# bulk_pipeline.py
+
+import argparse
+import csv
+import io
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from metrics import metrics
+from preprocessing import truncate_description
+from upload_cache import EXCEL_ENGINE, REQUIRED_COLUMNS
+
+# --- Staged Multi-File Bulk Import ---
+#   parse -> normalize -> qualify -> persist
+# Each stage has its own worker count and the stages are joined by bounded queues, so CPU-bound parsing
+# overlaps with I/O-bound API calls and a fast producer blocks (backpressure) instead of buffering.
+# Files are read in fixed-size row chunks and results are streamed to one CSV, so memory stays flat
+# however many files are queued. Each output row carries a "Lead ID" of the form "<file>:<row>", where
+# <row> is the 0-based data row in that file, so results can be joined back to the input. <file> is the
+# path relative to the inputs' common directory; a name that still repeats (the same file given twice,
+# two uploads with one name) gets a "#<n>" suffix, so no two sources share Lead IDs.
+
+CHUNK_ROWS = int(os.getenv("LUMINOVA_BULK_CHUNK_ROWS", "500"))
+QUEUE_SIZE = int(os.getenv("LUMINOVA_BULK_QUEUE_SIZE", "64"))
+QUALIFY_WORKERS = int(os.getenv("LUMINOVA_BULK_QUALIFY_WORKERS", "8"))
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+OUTPUT_COLUMNS = ["Lead ID", "Source File", "Original Company Name", "Original Description",
+                  "Qualified Status", "Priority Score", "Reasoning", "Model Tier"]
+
+_DONE = object() # End-of-stream marker passed between stages
+
+
+def collect_sources(paths: list) -> list:
+    """
+    Expands files and directories into a sorted list of (name, path) sources with supported extensions.
+    Names are paths relative to the common directory of all files, so same-named files stay apart.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                      if name.lower().endswith(SUPPORTED_EXTENSIONS)]
+        elif path.lower().endswith(SUPPORTED_EXTENSIONS):
+            files.append(path)
+    if not files:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    return [(os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/"), path) for path in files]
+
+
+def unique_source_names(sources: list) -> list:
+    """Renames repeated source names "leads.csv" -> "leads#2.csv" (keeping the extension the parser needs)."""
+    seen, unique = set(), []
+    for name, data in sources:
+        stem, ext = os.path.splitext(name)
+        candidate, n = name, 1
+        while candidate in seen:
+            n += 1
+            candidate = f"{stem}#{n}{ext}"
+        seen.add(candidate)
+        unique.append((candidate, data))
+    return unique
+
+
+def iter_row_chunks(name: str, source, chunk_rows: int = CHUNK_ROWS):
+    """
+    Yields DataFrames of at most `chunk_rows` rows from a CSV/XLSX file (`source` is a path, bytes or a
+    binary file object). Never materializes the whole sheet: CSVs use pandas' chunked reader, Excel files
+    openpyxl's read-only mode. Every chunk is indexed by its rows' 0-based position in the file.
+    """
+    handle = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    if hasattr(handle, "seek"): # File objects (e.g. Streamlit uploads) may have been read before
+        handle.seek(0)
+    if name.lower().endswith(".csv"):
+        yield from pd.read_csv(handle, chunksize=chunk_rows)
+        return
+    if EXCEL_ENGINE != "openpyxl": # calamine has no streaming mode, but parses fast enough in one go
+        df = pd.read_excel(handle, engine=EXCEL_ENGINE)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+    from openpyxl import load_workbook
+    workbook = load_workbook(handle, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, [])]
+        chunk, offset = [], 0
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=header, index=range(offset, offset + len(chunk)))
+                offset += len(chunk)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header, index=range(offset, offset + len(chunk)))
+    finally:
+        workbook.close()
+
+
+def _cell_str(value) -> str:
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value).strip()
+
+
+class Stage:
+    """One pipeline stage: `workers` threads applying `fn` to items from a bounded input queue."""
+    def __init__(self, name: str, fn, workers: int, queue_size: int = QUEUE_SIZE):
+        self.name = name
+        self.fn = fn # fn(item, emit) - calls emit(x) for each output item
+        self.workers = workers
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._lock = threading.Lock()
+
+    def record(self, busy_seconds: float):
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += busy_seconds
+
+    def sample_depth(self):
+        depth = self.inbox.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    def stats(self, elapsed: float) -> dict:
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.processed,
+            "items_per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 2) if elapsed else 0.0,
+            "queue_depth": self.inbox.qsize(),
+            "avg_queue_depth": round(self._depth_total / self._depth_samples, 1) if self._depth_samples else 0.0,
+            "max_queue_depth": self.max_depth,
+        }
+
+
+class BulkImportPipeline:
+    """
+    parse -> normalize -> qualify -> persist over many lead files, writing one combined CSV to `output_path`.
+    `qualify_fn(company, description, lead_id)` returns the agent's result dict.
+    """
+    def __init__(self, sources: list, output_path: str, qualify_fn,
+                 parse_workers: int = 2, normalize_workers: int = 1, qualify_workers: int = QUALIFY_WORKERS,
+                 queue_size: int = QUEUE_SIZE, chunk_rows: int = CHUNK_ROWS):
+        self.sources = unique_source_names(sources) # [(name, path_or_bytes)]
+        self.output_path = output_path
+        self.qualify_fn = qualify_fn
+        self.chunk_rows = chunk_rows
+        self.errors = []
+        self.stages = [
+            Stage("parse", self._parse, parse_workers, queue_size),
+            Stage("normalize", self._normalize, normalize_workers, queue_size),
+            Stage("qualify", self._qualify, qualify_workers, queue_size),
+            Stage("persist", self._persist, 1, queue_size), # Single writer keeps the CSV consistent
+        ]
+        self._writer = None
+        self.started_at = None
+        self.finished_at = None
+
+    # --- Stage functions ---
+    def _parse(self, source, emit):
+        name, data = source
+        try:
+            for chunk in iter_row_chunks(name, data, self.chunk_rows):
+                emit((name, chunk))
+        except Exception as e:
+            self.errors.append(f"{name}: could not parse ({e})")
+
+    def _normalize(self, item, emit):
+        name, chunk = item
+        missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+        if missing:
+            self.errors.append(f"{name}: missing required columns {missing}")
+            return
+        for df_index, company, description in zip(chunk.index, chunk['Company Name'], chunk['Description']):
+            company_str = _cell_str(company)
+            if company_str:
+                emit((name, f"{name}:{df_index}", company_str, _cell_str(description)))
+
+    def _qualify(self, lead, emit):
+        name, lead_id, company, description = lead
+        result = self.qualify_fn(company, truncate_description(description), lead_id)
+        emit([lead_id, name, company, description, result.get("qualified_status", "N/A"),
+              result.get("priority_score", 0), result.get("reasoning", ""), result.get("model_tier", "")])
+
+    def _persist(self, row, emit):
+        self._writer.writerow(row)
+
+    # --- Orchestration ---
+    def _worker(self, index: int, stage: Stage, finished: list, lock: threading.Lock):
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        emit = downstream.inbox.put if downstream else (lambda _: None)
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                break
+            started = time.perf_counter()
+            try:
+                stage.fn(item, emit)
+            except Exception as e:
+                self.errors.append(f"{stage.name}: {e}")
+            busy = time.perf_counter() - started
+            stage.record(busy)
+            metrics.observe("bulk_stage_seconds", busy, {"stage": stage.name})
+        with lock:
+            finished[index] += 1
+            last_worker = finished[index] == stage.workers
+        if last_worker and downstream: # Propagate end-of-stream once every worker of this stage is done
+            for _ in range(downstream.workers):
+                downstream.inbox.put(_DONE)
+
+    def _feed_sources(self):
+        parse_stage = self.stages[0]
+        for source in self.sources:
+            parse_stage.inbox.put(source)
+        for _ in range(parse_stage.workers):
+            parse_stage.inbox.put(_DONE)
+
+    def run(self, on_progress=None, progress_interval: float = 0.5) -> dict:
+        """
+        Runs the pipeline to completion, blocking the caller. `on_progress(report)` is called from the
+        calling thread every `progress_interval` seconds (safe for Streamlit UI updates).
+        """
+        self.started_at = time.perf_counter()
+        finished, lock = [0] * len(self.stages), threading.Lock()
+        with open(self.output_path, "w", newline="", encoding="utf-8") as output:
+            self._writer = csv.writer(output)
+            self._writer.writerow(OUTPUT_COLUMNS)
+            threads = [threading.Thread(target=self._feed_sources, daemon=True)]
+            for index, stage in enumerate(self.stages):
+                threads += [
+                    threading.Thread(target=self._worker, args=(index, stage, finished, lock),
+                                     name=f"bulk-{stage.name}-{n}", daemon=True)
+                    for n in range(stage.workers)
+                ]
+            for thread in threads:
+                thread.start()
+            while any(thread.is_alive() for thread in threads):
+                for stage in self.stages:
+                    stage.sample_depth()
+                if on_progress is not None:
+                    on_progress(self.report())
+                threads[-1].join(timeout=progress_interval)
+        self.finished_at = time.perf_counter()
+        return self.report()
+
+    def report(self) -> dict:
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "files": len(self.sources),
+            "elapsed_seconds": round(elapsed, 2),
+            "leads_written": self.stages[-1].processed,
+            "done": self.finished_at is not None,
+            "errors": list(self.errors),
+            "stages": [stage.stats(elapsed) for stage in self.stages],
+        }
+
+
+if __name__ == "__main__":
+    from agent_logic import process_single_lead_with_agent
+
+    parser = argparse.ArgumentParser(description="Qualify every lead file in one or more directories/files.")
+    parser.add_argument("paths", nargs="+", help="Directories and/or .csv/.xlsx files")
+    parser.add_argument("--out", default="luminova_bulk_results.csv")
+    parser.add_argument("--qualify-workers", type=int, default=QUALIFY_WORKERS)
+    parser.add_argument("--parse-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    pipeline = BulkImportPipeline(
+        collect_sources(args.paths), args.out, process_single_lead_with_agent,
+        parse_workers=args.parse_workers, qualify_workers=args.qualify_workers
+    )
+    final = pipeline.run(on_progress=lambda r: print(
+        " | ".join(f"{s['stage']}: {s['items']} done, q={s['queue_depth']}" for s in r["stages"])
+    ), progress_interval=2.0)
+    print(f"--- Wrote {final['leads_written']} leads from {final['files']} files to {args.out} in {final['elapsed_seconds']}s ---")
+    for stage in final["stages"]:
+        print(f"  {stage['stage']:<10} {stage['items']:>6} items  {stage['items_per_second']:>8}/s  "
+              f"util {stage['utilization']:.0%}  avg queue {stage['avg_queue_depth']}  max queue {stage['max_queue_depth']}")
+    for error in final["errors"]:
+        print(f"  ! {error}")
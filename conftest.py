@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+
+# Tests never call Groq: agent_logic builds its client at import time, so select the local mock backend
+# (mock_llm.py) before any test module imports it. An explicit LUMINOVA_LLM_BACKEND still wins.
+os.environ.setdefault("LUMINOVA_LLM_BACKEND", "mock")
@@ -0,0 +1,324 @@
+# crm_export.py
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from metrics import metrics
+
+# --- Bulk CRM Export ---
+# Pushes qualified leads to a configurable HTTP endpoint instead of a manual CSV re-import:
+#   - leads are sent in batches bounded by size (CRM_BATCH_SIZE) and age (CRM_BATCH_SECONDS)
+#   - batches go out concurrently over a small pool of keep-alive connections
+#   - every lead carries an idempotency key derived from its lead_id and the run that produced it (and
+#     each batch one derived from its leads), so a retried batch never creates duplicates on the receiving
+#     side, while a new analysis of the same file is delivered as new results
+#   - failed batches are retried with exponential backoff and jitter (honouring Retry-After)
+#   - High Fit leads are sent first
+# LocalCRMReceiver is a stand-in endpoint for tests and demos (`python crm_export.py`).
+
+CRM_ENDPOINT = os.getenv("LUMINOVA_CRM_ENDPOINT", "")
+CRM_API_KEY = os.getenv("LUMINOVA_CRM_API_KEY", "")
+CRM_BATCH_SIZE = int(os.getenv("LUMINOVA_CRM_BATCH_SIZE", "100"))
+CRM_BATCH_SECONDS = float(os.getenv("LUMINOVA_CRM_BATCH_SECONDS", "1.0"))
+CRM_CONNECTIONS = int(os.getenv("LUMINOVA_CRM_CONNECTIONS", "4"))
+CRM_MAX_RETRIES = int(os.getenv("LUMINOVA_CRM_MAX_RETRIES", "5"))
+CRM_BACKOFF_BASE_SECONDS = 0.5
+CRM_BACKOFF_MAX_SECONDS = 30.0
+
+_STATUS_ORDER = {"High Fit": 0, "Medium Fit": 1, "Low Fit": 2, "Not Fit": 3}
+_RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def idempotency_key(lead_id: str, namespace: str = "") -> str:
+    """Stable key for one lead; `namespace` (upload hash and run id) keeps lead ids of different runs apart."""
+    return hashlib.sha256(f"{namespace}:{lead_id}".encode("utf-8")).hexdigest()[:32]
+
+
+def run_namespace(upload_hash: str, run_id: str) -> str:
+    """Idempotency namespace of one analysis run: re-pushing the run is deduplicated, a re-analysis is not."""
+    return f"{upload_hash}:{run_id}"
+
+
+def records_from_dataframe(processed_df, namespace: str = "") -> list:
+    """Turns a processed results frame into CRM lead records, keyed by the analysis's "Lead ID" column."""
+    records = []
+    for position, row in enumerate(processed_df.to_dict("records")):
+        lead_id = str(row.get("Lead ID") or f"lead_{position}")
+        records.append({
+            "lead_id": lead_id,
+            "idempotency_key": idempotency_key(lead_id, namespace),
+            "company_name": row.get("Original Company Name", ""),
+            "description": row.get("Original Description", ""),
+            "qualified_status": row.get("Qualified Status", ""),
+            "priority_score": int(row.get("Priority Score", 0) or 0),
+            "reasoning": row.get("Reasoning", ""),
+        })
+    return records
+
+
+def prioritize_records(records: list) -> list:
+    """High Fit first, then by priority score; stable so file order breaks ties."""
+    return sorted(records, key=lambda r: (_STATUS_ORDER.get(r.get("qualified_status"), len(_STATUS_ORDER)),
+                                         -int(r.get("priority_score", 0) or 0)))
+
+
+@dataclass
+class ExportReport:
+    leads_sent: int = 0
+    leads_failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed_seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+
+class _ConnectionPool:
+    """Fixed-size pool of keep-alive HTTP(S) connections to one host."""
+    def __init__(self, endpoint: str, size: int, timeout: float):
+        url = urlsplit(endpoint)
+        self.path = url.path or "/"
+        self._factory = lambda: (http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection)(
+            url.hostname, url.port, timeout=timeout
+        )
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None) # Connections are opened lazily
+
+    def request(self, body: bytes, headers: dict):
+        """Sends one POST; returns (status, response, body). Broken connections are replaced, not reused."""
+        conn = self._idle.get() or self._factory()
+        try:
+            conn.request("POST", self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+            return response.status, response, payload
+        except Exception:
+            conn.close()
+            conn = None
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            if conn is not None:
+                conn.close()
+
+
+class CRMExporter:
+    """
+    Batches lead records and delivers them to `endpoint` (POST {"leads": [...]}).
+    Use `export(records)` for a finished run, or `add()` / `close()` to stream leads as they are qualified
+    (a partial batch is flushed once it is `max_batch_seconds` old).
+    """
+    def __init__(self, endpoint: str = CRM_ENDPOINT, api_key: str = CRM_API_KEY, batch_size: int = CRM_BATCH_SIZE,
+                 max_batch_seconds: float = CRM_BATCH_SECONDS, connections: int = CRM_CONNECTIONS,
+                 max_retries: int = CRM_MAX_RETRIES, timeout: float = 30.0):
+        if not endpoint:
+            raise ValueError("No CRM endpoint configured (set LUMINOVA_CRM_ENDPOINT)")
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.max_batch_seconds = max_batch_seconds
+        self.max_retries = max_retries
+        self.report = ExportReport()
+        self._pool = _ConnectionPool(endpoint, connections, timeout)
+        self._executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="luminova-crm")
+        self._pending = []
+        self._pending_since = None
+        self._futures = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_when_stale, name="luminova-crm-flusher", daemon=True)
+        self._flusher.start()
+
+    # --- Public API ---
+    def add(self, record: dict):
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(record)
+            if len(self._pending) >= self.batch_size:
+                self._dispatch_locked()
+
+    def export(self, records: list) -> ExportReport:
+        """Sends `records` High Fit first and waits for delivery."""
+        for record in prioritize_records(records):
+            self.add(record)
+        return self.close()
+
+    def close(self) -> ExportReport:
+        """Flushes the partial batch, waits for all deliveries and returns the report."""
+        with self._lock:
+            self._dispatch_locked()
+        self._closed.set()
+        for future in list(self._futures):
+            future.result()
+        self._executor.shutdown(wait=True)
+        self._pool.close()
+        self.report.elapsed_seconds = round(time.perf_counter() - self._started, 3)
+        return self.report
+
+    # --- Batching ---
+    def _dispatch_locked(self):
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_since = self._pending, [], None
+        self._futures.append(self._executor.submit(self._send_batch, batch))
+
+    def _flush_when_stale(self):
+        while not self._closed.wait(min(0.1, self.max_batch_seconds)):
+            with self._lock:
+                if self._pending and time.monotonic() - self._pending_since >= self.max_batch_seconds:
+                    self._dispatch_locked()
+
+    # --- Delivery ---
+    def _send_batch(self, batch: list):
+        body = json.dumps({"leads": batch}).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "Idempotency-Key": hashlib.sha256("".join(r["idempotency_key"] for r in batch).encode("utf-8")).hexdigest()[:32],
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self.report.retries += 1
+                metrics.inc("crm_export_retries_total")
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                status, response, payload = self._pool.request(body, headers)
+                metrics.observe("crm_export_batch_seconds", time.perf_counter() - started, {"status": str(status)})
+                if 200 <= status < 300:
+                    with self._lock:
+                        self.report.leads_sent += len(batch)
+                        self.report.batches += 1
+                    metrics.inc("crm_export_leads_total", len(batch), {"outcome": "sent"})
+                    return
+                error = f"HTTP {status}: {payload[:200].decode('utf-8', 'replace')}"
+                if status not in _RETRYABLE_STATUSES:
+                    break
+                retry_after = response.getheader("Retry-After")
+            except (OSError, http.client.HTTPException) as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt < self.max_retries:
+                delay = min(CRM_BACKOFF_MAX_SECONDS, CRM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                time.sleep(delay * random.uniform(0.5, 1.0)) # Jitter keeps parallel batches from retrying in lockstep
+
+        with self._lock:
+            self.report.leads_failed += len(batch)
+            self.report.batches += 1
+            self.report.errors.append(f"Batch of {len(batch)} leads failed: {error}")
+        metrics.inc("crm_export_leads_total", len(batch), {"outcome": "failed"})
+
+
+def export_leads(records: list, endpoint: str = CRM_ENDPOINT, **kwargs) -> ExportReport:
+    return CRMExporter(endpoint, **kwargs).export(records)
+
+
+# --- Local stand-in receiver (tests and demos) ---
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        receiver = self.server.receiver
+        if random.random() < receiver.failure_rate: # Injected transient failure
+            self._reply(503, {"error": "temporarily unavailable"}, {"Retry-After": "0"})
+            return
+        try:
+            leads = json.loads(body)["leads"]
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {"error": "expected {\"leads\": [...]}"})
+            return
+        created, duplicates = receiver.store(leads)
+        self._reply(200, {"created": created, "duplicates": duplicates})
+
+    def _reply(self, status: int, payload: dict, extra_headers: dict | None = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class LocalCRMReceiver:
+    """In-process CRM stand-in: stores leads by idempotency key and can inject transient 503s."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, failure_rate: float = 0.0):
+        self.failure_rate = failure_rate
+        self.leads = {} # idempotency_key -> lead record
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _ReceiverHandler)
+        self._server.daemon_threads = True
+        self._server.receiver = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/leads"
+
+    def store(self, leads: list) -> tuple:
+        created = 0
+        with self._lock:
+            self.requests += 1
+            for lead in leads:
+                if lead.get("idempotency_key") not in self.leads:
+                    self.leads[lead.get("idempotency_key")] = lead
+                    created += 1
+        return created, len(leads) - created
+
+    def start(self) -> "LocalCRMReceiver":
+        threading.Thread(target=self._server.serve_forever, name="luminova-crm-receiver", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push synthetic leads to a local stand-in CRM and report delivery stats.")
+    parser.add_argument("--leads", type=int, default=5000)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of requests the receiver rejects with 503")
+    args = parser.parse_args()
+
+    receiver = LocalCRMReceiver(failure_rate=args.failure_rate).start()
+    statuses = list(_STATUS_ORDER)
+    records = [
+        {"lead_id": f"lead_{i}", "idempotency_key": idempotency_key(f"lead_{i}", "demo"), "company_name": f"Company {i}",
+         "description": "", "qualified_status": statuses[i % 4], "priority_score": 5 - i % 4 - 1, "reasoning": ""}
+        for i in range(args.leads)
+    ]
+    report = export_leads(records, receiver.url, max_retries=8)
+    receiver.stop()
+    print(f"--- Exported {report.leads_sent} leads in {report.batches} batches ({report.retries} retries) "
+          f"in {report.elapsed_seconds}s; receiver stored {len(receiver.leads)} unique leads over {receiver.requests} accepted requests ---")
+    for error in report.errors:
+        print(f"  ! {error}")
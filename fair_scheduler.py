@@ -0,0 +1,295 @@
+# fair_scheduler.py
+
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from functools import lru_cache
+
+from metrics import metrics
+from prompts import build_messages, count_message_tokens
+
+# --- Process-Wide Fair-Share Scheduler ---
+# Every Streamlit session shares one GROQ_API_KEY. Without coordination, one user uploading 50k rows
+# starves everyone else and pushes the shared key into rate limits. All sessions therefore submit lead
+# jobs here, tagged with their `user_id`. The scheduler provides:
+#   - weighted fair queuing across users (start-time fair queuing on estimated tokens), so a 5-lead
+#     job is interleaved right away instead of waiting behind a 50k-lead job
+#   - a per-user concurrency limit and a per-user token-per-minute quota (token bucket)
+#   - a bounded global worker pool sized for the shared key
+
+SCHEDULER_WORKERS = int(os.getenv("LUMINOVA_SCHEDULER_WORKERS", "8"))
+USER_CONCURRENCY = int(os.getenv("LUMINOVA_USER_CONCURRENCY", "4"))
+USER_TOKENS_PER_MINUTE = int(os.getenv("LUMINOVA_USER_TOKENS_PER_MINUTE", "60000"))
+REMOTE_CLIENT_WORKERS = int(os.getenv("LUMINOVA_REMOTE_CLIENT_WORKERS", "32"))
+COMPLETION_TOKEN_ESTIMATE = 100 # Typical JSON answer size, used when costing a job before it runs
+
+
+@lru_cache(maxsize=8)
+def _system_prompt_tokens(content: str) -> int:
+    return count_message_tokens([{"content": content}])
+
+
+def estimate_job_tokens(company_name: str, description: str) -> int:
+    """Estimated total tokens (prompt + completion) one qualification call will use."""
+    system_message, user_message = build_messages(company_name, description)
+    return _system_prompt_tokens(system_message["content"]) + count_message_tokens([user_message]) + COMPLETION_TOKEN_ESTIMATE
+
+
+class _TokenBucket:
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until(self, cost: float) -> float:
+        return max(0.0, (min(cost, self.capacity) - self.tokens) / self.rate)
+
+
+class _Job:
+    __slots__ = ("user_id", "fn", "args", "kwargs", "cost", "start_tag", "finish_tag", "future", "submitted", "seq")
+
+    def __init__(self, user_id, fn, args, kwargs, cost, seq):
+        self.user_id = user_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cost = cost
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.seq = seq
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+
+
+class _UserState:
+    def __init__(self, weight: float, tokens_per_minute: int | None):
+        self.weight = weight
+        self.queue = deque()
+        self.running = 0
+        self.last_finish_tag = 0.0
+        self.bucket = _TokenBucket(tokens_per_minute) if tokens_per_minute is not None else None
+
+
+class FairShareScheduler:
+    """
+    Weighted fair queuing of lead jobs across users, on a fixed pool of worker threads.
+    Jobs of one user run in submission order; across users the job with the smallest virtual start tag
+    runs next, among users that are under their concurrency limit and have token quota left.
+    `user_tokens_per_minute=None` disables the token quota.
+    """
+    thread_name = "luminova-scheduler"
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS, user_concurrency: int = USER_CONCURRENCY,
+                 user_tokens_per_minute: int | None = USER_TOKENS_PER_MINUTE):
+        self.user_concurrency = user_concurrency
+        self.user_tokens_per_minute = user_tokens_per_minute
+        self._users = {}
+        self._job_threads = {} # worker thread ident -> user_id of the job it is running
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{self.thread_name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # --- Public API ---
+    def submit(self, user_id: str, fn, *args, cost_tokens: int = 1, weight: float = 1.0, **kwargs) -> Future:
+        """Queues `fn(*args, **kwargs)` on behalf of `user_id` and returns a Future for its result."""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _UserState(weight, self.user_tokens_per_minute)
+            user.weight = weight
+            job = _Job(user_id, fn, args, kwargs, max(1, cost_tokens), next(self._seq))
+            job.start_tag = max(self._virtual_time, user.last_finish_tag)
+            job.finish_tag = job.start_tag + job.cost / user.weight
+            user.last_finish_tag = job.finish_tag
+            user.queue.append(job)
+            self._cond.notify()
+        return job.future
+
+    def queue_position(self, user_id: str) -> dict:
+        """
+        Queue feedback for the UI: how many of the user's jobs are queued and running,
+        and how many jobs from other users are scheduled ahead of the user's next one.
+        """
+        with self._cond:
+            user = self._users.get(user_id)
+            if user is None or not user.queue:
+                return {"queued": 0, "running": user.running if user else 0, "ahead": 0}
+            head_tag = user.queue[0].start_tag
+            ahead = sum(
+                1 for uid, other in self._users.items() if uid != user_id
+                for job in other.queue if job.start_tag < head_tag
+            )
+            return {"queued": len(user.queue), "running": user.running, "ahead": ahead}
+
+    def running_threads(self, user_id: str) -> set:
+        """Idents of the worker threads currently running jobs of `user_id` (the run profiler samples only these)."""
+        with self._cond:
+            return {ident for ident, uid in self._job_threads.items() if uid == user_id}
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "users": len(self._users),
+                "queued": sum(len(u.queue) for u in self._users.values()),
+                "running": sum(u.running for u in self._users.values()),
+            }
+
+    def shutdown(self, wait_for_workers: bool = True):
+        with self._cond:
+            self._shutdown = True
+            for user in self._users.values():
+                while user.queue:
+                    user.queue.popleft().future.cancel()
+            self._cond.notify_all()
+        if wait_for_workers:
+            for thread in self._threads:
+                thread.join()
+
+    # --- Dispatch ---
+    def _next_job(self):
+        """Picks the eligible job with the smallest start tag. Returns (job, None) or (None, seconds_to_wait)."""
+        now = time.monotonic()
+        best, best_user, wait_hint = None, None, None
+        for user_id, user in list(self._users.items()):
+            while user.queue and user.queue[0].future.cancelled():
+                user.queue.popleft()
+            if user.bucket is not None:
+                user.bucket.refill(now)
+            if not user.queue:
+                if user.running == 0 and (user.bucket is None or user.bucket.tokens >= user.bucket.capacity):
+                    del self._users[user_id] # Idle and fully refilled: nothing worth remembering
+                continue
+            if user.running >= self.user_concurrency:
+                continue
+            head = user.queue[0]
+            delay = user.bucket.seconds_until(head.cost) if user.bucket is not None else 0.0
+            if delay > 0:
+                wait_hint = delay if wait_hint is None else min(wait_hint, delay)
+                continue
+            if best is None or (head.start_tag, head.seq) < (best.start_tag, best.seq):
+                best, best_user = head, user
+        if best is None:
+            return None, wait_hint
+        best_user.queue.popleft()
+        best_user.running += 1
+        if best_user.bucket is not None:
+            best_user.bucket.tokens -= min(best.cost, best_user.bucket.capacity)
+        self._virtual_time = max(self._virtual_time, best.start_tag)
+        return best, None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job, wait_hint = None, None
+                while not self._shutdown:
+                    job, wait_hint = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait(timeout=wait_hint)
+                if job is None:
+                    return
+                self._job_threads[threading.get_ident()] = job.user_id
+            self._run(job)
+
+    def _run(self, job: _Job):
+        try:
+            if job.future.set_running_or_notify_cancel():
+                metrics.observe("scheduler_wait_seconds", time.monotonic() - job.submitted)
+                started = time.monotonic()
+                try:
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+                except BaseException as e:
+                    job.future.set_exception(e)
+                finally:
+                    metrics.observe("scheduler_run_seconds", time.monotonic() - started)
+        finally:
+            with self._cond:
+                self._job_threads.pop(threading.get_ident(), None)
+                user = self._users.get(job.user_id)
+                if user is not None:
+                    user.running -= 1
+                self._cond.notify_all()
+
+
+class PassthroughScheduler(FairShareScheduler):
+    """
+    Scheduler for apps that call the remote qualification service. The service already applies the
+    per-user token quota, so it is not applied again here; jobs are still queued fairly per user with the
+    per-user concurrency limit, so one large upload cannot fill every client thread and hold back the
+    requests of other sessions until it drains.
+    """
+    thread_name = "luminova-remote"
+
+    def __init__(self, workers: int = REMOTE_CLIENT_WORKERS, user_concurrency: int = USER_CONCURRENCY):
+        super().__init__(workers, user_concurrency, user_tokens_per_minute=None)
+
+
+def iter_completed(futures_by_key: dict, on_wait=None, poll_interval: float = 0.5, cancel_on_exit: bool = True):
+    """
+    Yields (key, result) as the futures in `futures_by_key` ({future: key}) complete.
+    While nothing completes, calls `on_wait()` every `poll_interval` seconds (e.g. to show queue position).
+    If `cancel_on_exit`, futures that have not started are cancelled when the consumer stops early
+    (e.g. a Streamlit rerun).
+    Completions are pushed onto a queue by done-callbacks, so each future costs O(1) however many are pending.
+    """
+    completed = queue.SimpleQueue()
+    for future in futures_by_key:
+        future.add_done_callback(completed.put)
+    remaining = len(futures_by_key)
+    try:
+        while remaining:
+            try:
+                future = completed.get(timeout=poll_interval)
+            except queue.Empty:
+                if on_wait is not None:
+                    on_wait()
+                continue
+            remaining -= 1
+            yield futures_by_key[future], future.result()
+    finally:
+        if cancel_on_exit and remaining:
+            for future in futures_by_key:
+                future.cancel() # No-op for futures that are running or done
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairShareScheduler:
+    """Returns the process-wide scheduler shared by all Streamlit sessions, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairShareScheduler()
+        return _scheduler
+
+
+_passthrough = None
+
+
+def get_passthrough_scheduler() -> PassthroughScheduler:
+    """Process-wide PassthroughScheduler, for sessions whose jobs are scheduled by the remote service."""
+    global _passthrough
+    with _scheduler_lock:
+        if _passthrough is None:
+            _passthrough = PassthroughScheduler()
+        return _passthrough
@@ -0,0 +1,158 @@
+# fake_firestore.py
+
+import copy
+import os
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# --- In-Memory Firestore Stand-In ---
+# Selected in app.py with LUMINOVA_FIRESTORE_BACKEND=fake, so load tests and local runs exercise the
+# profile read/write paths (with a simulated round-trip delay) without credentials or a real project.
+# Implements the subset of google.cloud.firestore used by this repo: collection()/document() chains,
+# get()/set()/delete(), order_by().stream() and on_snapshot() listeners. Data lives for the process only.
+
+FAKE_FIRESTORE_LATENCY_MS = float(os.getenv("LUMINOVA_FAKE_FIRESTORE_LATENCY_MS", "20"))
+
+
+class _Snapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+        self.update_time = datetime.now()
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class _Watch:
+    def __init__(self, client, path, callback):
+        self._client, self._path, self._callback = client, path, callback
+
+    def unsubscribe(self):
+        self._client._unsubscribe(self._path, self._callback)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path: tuple):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    def collection(self, name: str):
+        return FakeCollectionReference(self._client, self._path + (name,))
+
+    def get(self):
+        self._client._round_trip()
+        return _Snapshot(self, self._client._read(self._path))
+
+    def set(self, data: dict):
+        self._client._round_trip()
+        self._client._write(self, copy.deepcopy(data))
+
+    def delete(self):
+        self._client._round_trip()
+        self._client._write(self, None)
+
+    def on_snapshot(self, callback):
+        """Calls callback([snapshot], changes, read_time) now and after every later write to this document."""
+        return self._client._subscribe(self, callback)
+
+
+class FakeCollectionReference:
+    def __init__(self, client, path: tuple):
+        self._client = client
+        self._path = path
+        self._order_field = None
+
+    def document(self, doc_id: str):
+        return FakeDocumentReference(self._client, self._path + (doc_id,))
+
+    def order_by(self, field_name: str):
+        ordered = FakeCollectionReference(self._client, self._path)
+        ordered._order_field = field_name
+        return ordered
+
+    def stream(self):
+        self._client._round_trip()
+        docs = [
+            _Snapshot(self.document(path[-1]), data)
+            for path, data in self._client._children(self._path)
+        ]
+        if self._order_field:
+            docs.sort(key=lambda doc: doc._data.get(self._order_field) or "")
+        return iter(docs)
+
+
+class FakeFirestoreClient:
+    """Thread-safe in-memory stand-in for firestore.client()."""
+    def __init__(self, latency_ms: float = FAKE_FIRESTORE_LATENCY_MS):
+        self.latency = latency_ms / 1000
+        self.reads = 0
+        self.writes = 0
+        self._docs = {} # path tuple -> dict
+        self._listeners = {} # path tuple -> [callback]
+        self._lock = threading.Lock()
+
+    def collection(self, name: str):
+        return FakeCollectionReference(self, (name,))
+
+    # --- Internals ---
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, path: tuple):
+        with self._lock:
+            self.reads += 1
+            data = self._docs.get(path)
+            return copy.deepcopy(data) if data is not None else None
+
+    def _children(self, path: tuple):
+        with self._lock:
+            self.reads += 1
+            return [(p, copy.deepcopy(d)) for p, d in self._docs.items() if len(p) == len(path) + 1 and p[:-1] == path]
+
+    def _write(self, reference: FakeDocumentReference, data):
+        with self._lock:
+            self.writes += 1
+            if data is None:
+                self._docs.pop(reference._path, None)
+            else:
+                self._docs[reference._path] = data
+            callbacks = list(self._listeners.get(reference._path, []))
+        self._notify(reference, data, callbacks)
+
+    def _notify(self, reference, data, callbacks):
+        snapshot = _Snapshot(reference, copy.deepcopy(data) if data is not None else None)
+        change = SimpleNamespace(type=SimpleNamespace(name="MODIFIED" if data is not None else "REMOVED"), document=snapshot)
+        for callback in callbacks: # Real listeners fire on a background thread
+            threading.Thread(target=callback, args=([snapshot], [change], datetime.now()), daemon=True).start()
+
+    def _subscribe(self, reference: FakeDocumentReference, callback):
+        with self._lock:
+            self._listeners.setdefault(reference._path, []).append(callback)
+            data = copy.deepcopy(self._docs.get(reference._path))
+        self._notify(reference, data, [callback]) # Initial snapshot, like the real client
+        return _Watch(self, reference._path, callback)
+
+    def _unsubscribe(self, path: tuple, callback):
+        with self._lock:
+            if callback in self._listeners.get(path, []):
+                self._listeners[path].remove(callback)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_fake_firestore() -> FakeFirestoreClient:
+    """Process-wide fake client, so all sessions and reruns see the same data (like a real project)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FakeFirestoreClient()
+        return _client
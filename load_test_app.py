@@ -0,0 +1,297 @@
+# load_test_app.py
+
+import argparse
+import gc
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+# Every simulated session runs against the mock LLM and the in-memory Firestore: no keys, no cost.
+os.environ["LUMINOVA_LLM_BACKEND"] = "mock"
+os.environ["LUMINOVA_FIRESTORE_BACKEND"] = "fake"
+os.environ.setdefault("GROQ_API_KEY", "load-test-placeholder")
+
+import pandas as pd
+
+# --- Streamlit Multi-Session Load Test ---
+# Drives N concurrent simulated analysts through ONE app.py instance, the way a Streamlit server runs them:
+# every session is a script thread in the same process, sharing the scheduler, caches and the GIL.
+# Each session does what a user does:
+#   open the app with a file uploaded -> click "Analyze Leads with AI" -> click "Download Processed Leads"
+#   (the browser fetches the CSV, the click reruns the script) -> one more idle rerun
+# The downloaded payload is checked against the upload. Process CPU time, wall time and RSS are measured
+# over the same span (the whole level), and turned into a capacity estimate for a given machine size:
+#   python load_test_app.py --sessions 1,4,8 --cpus 2 --memory-gb 4
+
+DEFAULT_FILE = "sample data for testing.xlsx"
+ANALYZE_LABEL = "Analyze Leads with AI"
+DOWNLOAD_LABEL = "Download Processed Leads (CSV)"
+MEMORY_HEADROOM = 0.8   # Share of machine memory the app may use
+CPU_TARGET_UTILIZATION = 0.7
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process (Linux /proc; falls back to the peak elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF) # All threads of the process
+    return usage.ru_utime + usage.ru_stime
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# --- One shared app "server" ---
+class _SharedRuntime:
+    """
+    AppTest is built for one session at a time. To run sessions concurrently it is made to look like a server:
+      - AppTest installs a throwaway mock Runtime per run and clears it afterwards; instead one mock Runtime
+        (with one media file manager) is installed for the whole test and the per-run swap goes to a dummy
+      - every AppTest run uses the session id "test session id", so one session's end-of-run cleanup deleted
+        the others' download files; each session thread gets its own id
+      - every run compiled app.py separately; one ScriptCache is shared, so it is compiled once
+    """
+    def __init__(self):
+        import streamlit.testing.v1.app_test as app_test
+        import streamlit.testing.v1.local_script_runner as local_script_runner
+        from streamlit import config
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+        from streamlit.runtime.media_file_manager import MediaFileManager
+        from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+        self.media_storage = MemoryMediaFileStorage("/mock/media")
+        runtime = MagicMock(spec=Runtime)
+        runtime.media_file_mgr = MediaFileManager(self.media_storage)
+        runtime.cache_storage_manager = MemoryCacheStorageManager()
+        Runtime._instance = runtime
+        app_test.Runtime = type("_RuntimeSlot", (), {"_instance": None})
+        # AppTest toggles this option around each run; set it for good so concurrent runs agree
+        config.set_option("global.appTest", True)
+
+        script_cache = ScriptCache()
+        local_script_runner.ScriptCache = lambda: script_cache
+        runner_init = local_script_runner.LocalScriptRunner.__init__
+
+        def _per_session_init(runner, *args, **kwargs):
+            runner_init(runner, *args, **kwargs)
+            runner._session_id = threading.current_thread().name # One thread per simulated session
+
+        local_script_runner.LocalScriptRunner.__init__ = _per_session_init
+
+    def fetch(self, url: str) -> bytes:
+        """What the browser's GET of a download button's media URL returns."""
+        file_id = url.rsplit("/", 1)[-1].split(".", 1)[0]
+        return self.media_storage.get_file(file_id).content
+
+
+def install_upload(file_path: str):
+    """AppTest cannot drive a file uploader, so the main uploader returns our file (the bulk uploader stays empty)."""
+    import streamlit as st
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    class _UploadedFile: # What st.file_uploader returns for one file
+        name = os.path.basename(file_path)
+        size = len(data)
+
+        def getvalue(self):
+            return data
+
+    st.file_uploader = lambda *args, **kwargs: [] if kwargs.get("accept_multiple_files") else _UploadedFile()
+    return len(pd.read_csv(io.BytesIO(data)) if file_path.lower().endswith(".csv") else pd.read_excel(io.BytesIO(data)))
+
+
+# --- One simulated session (a thread in this process) ---
+def run_session(runtime: _SharedRuntime, expected_rows: int, timeout: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    session_started = time.perf_counter()
+    rerun_ms = []
+
+    def timed(step):
+        started = time.perf_counter()
+        result = step()
+        rerun_ms.append((time.perf_counter() - started) * 1000)
+        return result
+
+    at = timed(lambda: AppTest.from_file("app.py", default_timeout=timeout).run()) # Upload + validation
+    errors = [str(e.value) for e in at.exception]
+    job_started = time.perf_counter()
+    analyze = [b for b in at.button if b.label == ANALYZE_LABEL]
+    if analyze:
+        at = analyze[0].click().run()
+    job_seconds = time.perf_counter() - job_started
+    errors += [str(e.value) for e in at.exception]
+    completed = any("Analysis complete" in s.value for s in at.success)
+
+    download_rows = None
+    download = [d for d in at.get("download_button") if d.proto.label == DOWNLOAD_LABEL]
+    if download:
+        payload = runtime.fetch(download[0].proto.url)
+        download_rows = len(pd.read_csv(io.BytesIO(payload)))
+        # The click itself: a widget trigger for the button, which reruns the script
+        widget_states = at._tree.get_widget_states()
+        trigger = widget_states.widgets.add()
+        trigger.id = download[0].proto.id
+        trigger.trigger_value = True
+        at = timed(lambda: at._run(widget_states))
+        errors += [str(e.value) for e in at.exception]
+    at = timed(lambda: at.run()) # One more idle rerun (e.g. expanding a table)
+    errors += [str(e.value) for e in at.exception]
+
+    return {
+        "completed": completed,
+        "download_ok": download_rows == expected_rows,
+        "errors": errors,
+        "rerun_ms": rerun_ms,
+        "job_seconds": job_seconds,
+        "session_seconds": time.perf_counter() - session_started,
+        "app": at, # Kept alive until the level's memory is measured
+    }
+
+
+# --- A concurrency level: N sessions at once, aggregated ---
+def run_level(runtime: _SharedRuntime, sessions: int, expected_rows: int, timeout: float) -> dict:
+    results = [None] * sessions
+
+    def _session(slot):
+        try:
+            results[slot] = run_session(runtime, expected_rows, timeout)
+        except Exception as e:
+            results[slot] = {"completed": False, "download_ok": False, "errors": [repr(e)]}
+
+    gc.collect()
+    rss_before, cpu_before, started = _rss_mb(), _cpu_seconds(), time.perf_counter()
+    threads = [threading.Thread(target=_session, args=(slot,), name=f"load-session-{slot}") for slot in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # CPU, wall time and memory all cover the same span: the whole level, every session still alive
+    wall = time.perf_counter() - started
+    cpu = _cpu_seconds() - cpu_before
+    rss_delta = max(0.0, _rss_mb() - rss_before)
+    for result in results:
+        result.pop("app", None)
+
+    ok = [r for r in results if r["completed"]]
+    reruns = [ms for r in ok for ms in r["rerun_ms"]]
+    return {
+        "sessions": sessions,
+        "completed": len(ok),
+        "downloads_verified": sum(1 for r in results if r["download_ok"]),
+        "errors": sum(len(r["errors"]) for r in results),
+        "error_samples": sorted({e[:200] for r in results for e in r["errors"]})[:3],
+        "wall_seconds": round(wall, 2),
+        "rerun_p50_ms": round(_percentile(reruns, 50), 1),
+        "rerun_p95_ms": round(_percentile(reruns, 95), 1),
+        "job_seconds_mean": round(statistics.mean(r["job_seconds"] for r in ok), 2) if ok else 0.0,
+        "job_seconds_max": round(max(r["job_seconds"] for r in ok), 2) if ok else 0.0,
+        "session_seconds_mean": round(statistics.mean(r["session_seconds"] for r in ok), 2) if ok else 0.0,
+        "cpu_seconds": round(cpu, 2),
+        "cpu_cores_used": round(cpu / wall, 3) if wall else 0.0,
+        "cpu_seconds_per_session": round(cpu / sessions, 3),
+        "rss_base_mb": round(rss_before, 1),
+        "rss_per_session_mb": round(rss_delta / sessions, 1),
+    }
+
+
+def capacity_report(levels: list, cpus: float, memory_gb: float, max_p95_ms: float) -> dict:
+    """
+    Estimates how many analyses can run at once on the given machine (idle sessions only cost memory).
+    Streamlit serves all sessions from one process (one core's worth of script execution under the GIL),
+    so the projection assumes one app.py process per core, each behaving like the tested one.
+      memory:  (memory * headroom - process baseline per process) / RSS per session
+      cpu:     sessions per process at which the process used CPU_TARGET_UTILIZATION of a core (CPU and wall
+               time over the same span): the largest tested level under the target, or a linear
+               extrapolation from the heaviest level if every level stayed under it; times cores
+      latency: largest tested concurrency (per process) whose p95 rerun latency stayed under max_p95_ms;
+               if a higher tested level missed the target, the estimate is capped there
+    """
+    measured = [level for level in levels if level["completed"]]
+    if not measured:
+        return {"error": "No session completed; see the per-level errors."}
+    heaviest = max(measured, key=lambda level: level["sessions"])
+    processes = max(1, int(cpus))
+
+    per_session_mb = max(heaviest["rss_per_session_mb"], 1.0)
+    memory_capacity = (memory_gb * 1024 * MEMORY_HEADROOM - heaviest["rss_base_mb"] * processes) / per_session_mb
+    under_target = [level for level in measured if level["cpu_cores_used"] <= CPU_TARGET_UTILIZATION]
+    if heaviest in under_target:
+        per_process = heaviest["sessions"] * CPU_TARGET_UTILIZATION / heaviest["cpu_cores_used"] if heaviest["cpu_cores_used"] else float("inf")
+    elif under_target:
+        per_process = max(level["sessions"] for level in under_target)
+    else:
+        lightest = min(measured, key=lambda level: level["sessions"])
+        per_process = lightest["sessions"] * CPU_TARGET_UTILIZATION / lightest["cpu_cores_used"]
+    cpu_capacity = per_process * cpus
+    within_latency = [level["sessions"] for level in measured if level["rerun_p95_ms"] <= max_p95_ms]
+    latency_exceeded = any(level["rerun_p95_ms"] > max_p95_ms for level in measured)
+    latency_capacity = (max(within_latency) if within_latency else 0) * processes if latency_exceeded else float("inf")
+
+    limits = {"memory": memory_capacity, "cpu": cpu_capacity, "latency": latency_capacity}
+    limiting_factor = min(limits, key=limits.get)
+    return {
+        "machine": {"cpus": cpus, "memory_gb": memory_gb, "app_processes": processes},
+        "memory_bound_sessions": int(max(0, memory_capacity)),
+        "cpu_bound_active_sessions": round(cpu_capacity, 1) if cpu_capacity != float("inf") else None,
+        "cpu_cores_used_per_level": {level["sessions"]: level["cpu_cores_used"] for level in measured},
+        "max_tested_sessions_within_latency": max(within_latency) if within_latency else 0,
+        "latency_target_p95_ms": max_p95_ms,
+        "estimated_concurrent_analyses": int(max(0, limits[limiting_factor])),
+        "limiting_factor": limiting_factor,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent simulated Streamlit sessions.")
+    parser.add_argument("--sessions", default="1,4", help="Comma-separated concurrency levels to test")
+    parser.add_argument("--file", default=DEFAULT_FILE, help="Lead file each session uploads")
+    parser.add_argument("--cpus", type=float, default=float(os.cpu_count() or 1), help="Target machine cores")
+    parser.add_argument("--memory-gb", type=float, default=4.0, help="Target machine memory")
+    parser.add_argument("--max-p95-ms", type=float, default=1000.0, help="Acceptable p95 rerun latency")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-rerun AppTest timeout (seconds)")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    runtime = _SharedRuntime()
+    expected_rows = install_upload(args.file)
+    # Warm-up session: imports and process-wide state, so the levels measure per-session cost
+    run_level(runtime, 1, expected_rows, args.timeout)
+
+    levels = []
+    for sessions in [int(n) for n in args.sessions.split(",") if n.strip()]:
+        levels.append(run_level(runtime, sessions, expected_rows, args.timeout))
+        if not args.json:
+            level = levels[-1]
+            print(f"--- {sessions} concurrent session(s): {level['completed']}/{sessions} completed, "
+                  f"{level['downloads_verified']} downloads verified, {level['errors']} errors ---")
+            for key, value in level.items():
+                print(f"  {key:<26} {value}")
+    report = {"levels": levels, "capacity": capacity_report(levels, args.cpus, args.memory_gb, args.max_p95_ms)}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"--- Capacity estimate ({args.cpus:g} CPUs, {args.memory_gb:g} GB) ---")
+        for key, value in report["capacity"].items():
+            print(f"  {key:<36} {value}")
@@ -0,0 +1,106 @@
+# load_test_service.py
+
+import argparse
+import os
+import random
+import statistics
+import threading
+import time
+
+# The load test always runs against the mock LLM backend: no API key needed, no tokens spent.
+os.environ["LUMINOVA_LLM_BACKEND"] = "mock"
+
+from qualification_service import QualificationClient, run_server # noqa: E402 (must follow the env override)
+from metrics import metrics # noqa: E402
+
+SAMPLE_LEADS = [
+    ("Quantum Innovations Inc.", "A startup developing cutting-edge AI software for enterprise data analysis, leveraging cloud infrastructure."),
+    ("GreenGrocer Co.", "Local organic food delivery service for residential customers in urban areas."),
+    ("CyberSecure Solutions", "Provides advanced cybersecurity consulting and cloud migration services for large corporations."),
+    ("Pawsitive Pet Care", "Offers personalized dog walking and pet sitting services primarily for individual pet owners."),
+    ("Global Logistics Corp.", "International shipping and supply chain management provider with a focus on sustainable practices."),
+]
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_load_test(clients: int, requests_per_client: int, duplicate_ratio: float, bulk_size: int, port: int) -> dict:
+    """
+    Starts the service in-process, drives it from `clients` threads (one keep-alive connection each)
+    and returns latency/throughput figures plus how many requests were coalesced.
+    """
+    server = run_server("127.0.0.1", port)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    latencies, errors, lock = [], [], threading.Lock()
+
+    def client_worker(client_no: int):
+        client = QualificationClient(base_url, user_id=f"load-test-{client_no % 4}")
+        for i in range(requests_per_client):
+            if random.random() < duplicate_ratio:
+                company, description = random.choice(SAMPLE_LEADS) # Hot keys, eligible for coalescing
+            else:
+                company, description = f"Company {client_no}-{i}", f"B2B software vendor number {client_no}-{i}."
+            started = time.perf_counter()
+            try:
+                client.qualify(company, description, lead_id=f"{client_no}-{i}")
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client_worker, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # One streamed bulk request, timing the first result separately from the whole batch
+    bulk_client = QualificationClient(base_url, user_id="load-test-bulk")
+    bulk_leads = [{"company_name": f"Bulk {i}", "description": f"Enterprise cloud data platform {i}.", "lead_id": f"bulk_{i}"}
+                  for i in range(bulk_size)]
+    bulk_started = time.perf_counter()
+    first_result_s, bulk_results = None, 0
+    for _ in bulk_client.qualify_bulk(bulk_leads):
+        bulk_results += 1
+        if first_result_s is None:
+            first_result_s = time.perf_counter() - bulk_started
+    bulk_elapsed = time.perf_counter() - bulk_started
+    server.shutdown()
+
+    total = clients * requests_per_client
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "latency_mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+        "coalesced_requests": int(metrics.counter("service_coalesced_total")),
+        "bulk_leads": bulk_results,
+        "bulk_first_result_ms": round((first_result_s or 0.0) * 1000, 1),
+        "bulk_total_seconds": round(bulk_elapsed, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the qualification service against the mock LLM backend.")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=25, help="Requests per client")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3, help="Share of requests for hot (coalescable) leads")
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    args = parser.parse_args()
+
+    print("--- LumiNova AI Qualification Service Load Test (mock backend) ---")
+    for key, value in run_load_test(args.clients, args.requests, args.duplicate_ratio, args.bulk_size, args.port).items():
+        print(f"  {key:<24} {value}")
@@ -0,0 +1,245 @@
+# metrics.py
+
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# --- Pricing Table (USD per 1M tokens) ---
+# Used to estimate the cost of each Groq call from the usage block it returns.
+# Unknown models fall back to the 8B pricing so the estimate is never silently zero.
+MODEL_PRICING = {
+    "llama3-8b-8192": {"prompt": 0.05, "completion": 0.08},
+    "llama3-70b-8192": {"prompt": 0.59, "completion": 0.79},
+}
+DEFAULT_MODEL_PRICING = MODEL_PRICING["llama3-8b-8192"]
+
+# Bucket upper bounds (seconds) for the Prometheus text export
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Registries that additionally receive every metric recorded in the current context (see MetricsRegistry.collecting)
+_collectors = contextvars.ContextVar("luminova_metrics_collectors", default=())
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Returns the estimated USD cost of a single completion."""
+    pricing = MODEL_PRICING.get(model, DEFAULT_MODEL_PRICING)
+    return (prompt_tokens * pricing["prompt"] + completion_tokens * pricing["completion"]) / 1_000_000
+
+
+class Histogram:
+    """
+    A small thread-safe histogram.
+    Keeps cumulative bucket counts for export plus a bounded window of recent samples for percentiles,
+    so memory stays constant no matter how many leads are processed.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS, window: int = 2048):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._samples.append(value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        rank = min(len(samples) - 1, max(0, int(round(pct / 100 * (len(samples) - 1)))))
+        return samples[rank]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide registry of latency histograms and counters.
+    Metric keys are a name plus optional labels (e.g. the model), mirroring Prometheus conventions.
+    Extra registries (e.g. one per Streamlit session) can collect a copy of what is recorded inside
+    their collecting() block, so per-session figures don't include other users' work.
+    """
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(name: str, labels: dict | None):
+        return (name, tuple(sorted((labels or {}).items())))
+
+    def histogram(self, name: str, labels: dict | None = None) -> Histogram:
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            return self._histograms[key]
+
+    def observe(self, name: str, value: float, labels: dict | None = None):
+        self.histogram(name, labels).observe(value)
+        for collector in _collectors.get():
+            if collector is not self:
+                collector.histogram(name, labels).observe(value)
+
+    def inc(self, name: str, amount: float = 1, labels: dict | None = None):
+        self._add(name, amount, labels)
+        for collector in _collectors.get():
+            if collector is not self:
+                collector._add(name, amount, labels)
+
+    def _add(self, name: str, amount: float, labels: dict | None):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def collecting(self):
+        """Within the block (in this thread or context), metrics recorded on any registry are also recorded here."""
+        token = _collectors.set(_collectors.get() + (self,))
+        try:
+            yield self
+        finally:
+            _collectors.reset(token)
+
+    def counter(self, name: str, labels: dict | None = None) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    @contextmanager
+    def timer(self, name: str, labels: dict | None = None):
+        """Context manager that records the wall time of its block into a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def record_llm_call(self, model: str, latency_s: float, usage=None, prompt_version: str | None = None):
+        """
+        Records one Groq completion: wall latency, server-side queue wait and token usage.
+        `usage` is the `chat_completion.usage` object (or None if the call failed before returning one).
+        Token counters are additionally labelled with `prompt_version` so prompt revisions can be compared.
+        """
+        labels = {"model": model}
+        self.observe("llm_request_seconds", latency_s, labels)
+        self.inc("llm_requests_total", 1, labels)
+        if usage is None:
+            return
+        if prompt_version:
+            labels = {**labels, "prompt_version": prompt_version}
+        queue_time = getattr(usage, "queue_time", None)
+        if queue_time is not None:
+            self.observe("llm_queue_seconds", float(queue_time), labels)
+        prompt_tokens = int(getattr(usage, "prompt_tokens", 0) or 0)
+        completion_tokens = int(getattr(usage, "completion_tokens", 0) or 0)
+        self.inc("llm_prompt_tokens_total", prompt_tokens, labels)
+        self.inc("llm_completion_tokens_total", completion_tokens, labels)
+        self.inc("llm_cost_usd_total", estimate_cost(model, prompt_tokens, completion_tokens), labels)
+
+    def snapshot(self) -> dict:
+        """Returns a JSON-serializable view of every metric, plus derived throughput and cost figures."""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+
+        hist_out, counter_out = {}, {}
+        for (name, labels), hist in histograms.items():
+            hist_out.setdefault(name, []).append({"labels": dict(labels), **hist.summary()})
+        for (name, labels), value in counters.items():
+            counter_out.setdefault(name, []).append({"labels": dict(labels), "value": round(value, 6)})
+
+        def _total(name):
+            return sum(v for (n, _), v in counters.items() if n == name)
+
+        def _outcomes(outcome):
+            return sum(v for (n, labels), v in counters.items()
+                       if n == "llm_responses_total" and dict(labels).get("outcome") == outcome)
+
+        llm_seconds = sum(h.total for (n, _), h in histograms.items() if n == "llm_request_seconds")
+        completion_tokens = _total("llm_completion_tokens_total")
+        responses = _total("llm_responses_total")
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "histograms": hist_out,
+            "counters": counter_out,
+            "derived": {
+                "prompt_tokens": int(_total("llm_prompt_tokens_total")),
+                "completion_tokens": int(completion_tokens),
+                "completion_tokens_per_second": round(completion_tokens / llm_seconds, 2) if llm_seconds else 0.0,
+                "estimated_cost_usd": round(_total("llm_cost_usd_total"), 6),
+                # Share of responses salvaged locally / needing a follow-up call for missing fields
+                "response_repair_rate": round(_outcomes("repaired") / responses, 4) if responses else 0.0,
+                "response_retry_rate": round(_outcomes("retried") / responses, 4) if responses else 0.0,
+                "response_failure_rate": round(_outcomes("failed") / responses, 4) if responses else 0.0,
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        def _fmt_labels(labels, extra=None):
+            pairs = list(labels) + (list(extra.items()) if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            metric = f"luminova_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            metric = f"luminova_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            for bound, bucket_count in zip(hist.buckets, hist.bucket_counts):
+                lines.append(f"{metric}_bucket{_fmt_labels(labels, {'le': bound})} {bucket_count}")
+            lines.append(f"{metric}_bucket{_fmt_labels(labels, {'le': '+Inf'})} {hist.count}")
+            lines.append(f"{metric}_sum{_fmt_labels(labels)} {hist.total}")
+            lines.append(f"{metric}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+
+# Shared instance used by agent_logic.py and app.py
+metrics = MetricsRegistry()
+
+
+def collected_by(registry: MetricsRegistry, fn):
+    """Wraps `fn` so the metrics it records, on whichever thread runs it, are also collected by `registry`."""
+    def wrapper(*args, **kwargs):
+        with registry.collecting():
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,48 @@
+# mock_llm.py
+
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from preprocessing import count_tokens
+from prescore import prescore_lead
+
+# --- Mock LLM Backend ---
+# A drop-in stand-in for the Groq client (`client.chat.completions.create(...)`), selected with
+# LUMINOVA_LLM_BACKEND=mock. It answers from the local keyword pre-check after a simulated network delay,
+# so the service, schedulers and load tests can be exercised without an API key or spending tokens.
+
+MOCK_LATENCY_MS = float(os.getenv("LUMINOVA_MOCK_LATENCY_MS", "200"))
+MOCK_JITTER_MS = float(os.getenv("LUMINOVA_MOCK_JITTER_MS", "50"))
+
+_STATUS_SCORES = {"High Fit": 5, "Medium Fit": 3, "Low Fit": 1, "Not Fit": 0}
+
+
+class _MockCompletions:
+    def create(self, messages, model, **kwargs):
+        user_content = messages[-1]["content"]
+        time.sleep(max(0.0, MOCK_LATENCY_MS + random.uniform(-MOCK_JITTER_MS, MOCK_JITTER_MS)) / 1000)
+
+        precheck = prescore_lead("", user_content)
+        content = json.dumps({
+            "qualified_status": precheck["status"],
+            "priority_score": _STATUS_SCORES[precheck["status"]],
+            "reasoning": f"Mock backend: keyword pre-score {precheck['score']:.0f} for model {model}.",
+            "confidence": 0.9 if abs(precheck["score"]) >= 5 else 0.5,
+        })
+        prompt_tokens = sum(count_tokens(m["content"]) + 4 for m in messages)
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=count_tokens(content),
+            total_tokens=prompt_tokens + count_tokens(content),
+            queue_time=0.0,
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+class MockGroqClient:
+    """Mimics the subset of the Groq client used by agent_logic.py."""
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_MockCompletions())
@@ -0,0 +1,113 @@
+# preprocessing.py
+
+import os
+import re
+
+# --- Token Budgeting ---
+# Descriptions are counted and trimmed locally before any network call, so one pasted multi-page
+# "About us" cannot blow up latency/cost or overflow the 8192-token context of llama3-8b-8192.
+DESCRIPTION_TOKEN_BUDGET = int(os.getenv("LUMINOVA_DESCRIPTION_TOKEN_BUDGET", "256"))
+
+# Hard cap on characters scanned per description, so tokenizing a pathological row stays O(budget)
+MAX_SCAN_CHARS = 20_000
+
+# Keywords taken from the prompt's fit criteria. Sentences containing them are kept first when cutting.
+SIGNAL_KEYWORDS = (
+    "ai", "artificial intelligence", "machine learning", "ml", "cloud", "data", "analytics", "software",
+    "saas", "platform", "enterprise", "b2b", "infrastructure", "devops", "cybersecurity", "security",
+    "automation", "api", "digital", "technology", "tech", "large-scale", "global", "b2c", "retail",
+    "local", "consumer",
+)
+
+# Approximates Llama 3's (tiktoken-style) pre-tokenizer: contractions, words with an optional
+# leading space, digit runs of up to 3, punctuation runs and whitespace.
+_PRETOKEN_PATTERN = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+|$)", re.MULTILINE)
+_KEYWORD_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in SIGNAL_KEYWORDS) + r")\b", re.IGNORECASE)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens locally, with no network calls or model files.
+    Each pre-token is one token, and long words are split into ~4-character sub-word pieces,
+    which lands within a few percent of the real Llama 3 tokenizer on English business text.
+    """
+    if not text:
+        return 0
+    total = 0
+    for piece in _PRETOKEN_PATTERN.findall(text):
+        stripped = piece.strip()
+        total += 1 if len(stripped) <= 6 else (len(stripped) + 3) // 4
+    return total
+
+
+def _hard_cut(text: str, max_tokens: int) -> str:
+    """Cuts on a word boundary once `max_tokens` is reached (used when a single sentence is too long)."""
+    words, used = [], 0
+    for word in text.split():
+        cost = count_tokens(" " + word)
+        if used + cost > max_tokens:
+            break
+        words.append(word)
+        used += cost
+    if not words: # One giant "word" (e.g. a pasted URL or base64 blob): fall back to ~4 chars per token
+        return text[:max_tokens * 4]
+    return " ".join(words)
+
+
+def truncate_description(text: str, max_tokens: int = DESCRIPTION_TOKEN_BUDGET) -> str:
+    """
+    Shortens `text` to at most `max_tokens` tokens with sentence-aware, extractive truncation.
+    The opening sentence is always kept (it usually states what the company does), then the remaining
+    budget goes to the sentences with the most signal keywords, emitted in their original order.
+    Whatever budget is left is filled by cutting the best-ranked sentence that did not fit.
+    Returns `text` unchanged when it already fits.
+    """
+    if not text or max_tokens <= 0:
+        return text
+    scanned = text[:MAX_SCAN_CHARS]
+    if len(scanned) == len(text) and count_tokens(text) <= max_tokens:
+        return text
+
+    sentences = [s.strip() for s in _SENTENCE_PATTERN.findall(scanned) if s.strip()]
+    if not sentences:
+        return _hard_cut(scanned, max_tokens)
+
+    costs = [count_tokens(" " + s) for s in sentences]
+    if costs[0] > max_tokens:
+        return _hard_cut(sentences[0], max_tokens)
+
+    chosen, used = {0}, costs[0]
+    ranked = sorted(range(1, len(sentences)),
+                    key=lambda i: (-len(_KEYWORD_PATTERN.findall(sentences[i])), i))
+    for i in ranked:
+        if used + costs[i] <= max_tokens:
+            chosen.add(i)
+            used += costs[i]
+    kept = {i: sentences[i] for i in chosen}
+    partial = next((i for i in ranked if i not in chosen), None)
+    if partial is not None and used < max_tokens:
+        cut = _hard_cut(sentences[partial], max_tokens - used)
+        if cut and used + count_tokens(" " + cut) <= max_tokens: # The blob fallback can overshoot; skip it then
+            kept[partial] = cut
+    return " ".join(kept[i] for i in sorted(kept))
+
+
+def prepare_descriptions(descriptions: list, max_tokens: int = DESCRIPTION_TOKEN_BUDGET):
+    """
+    Applies the per-lead token budget to a batch of descriptions.
+    Returns (prepared_descriptions, shortened), where `shortened` lists
+    {"row", "original_chars", "original_tokens", "kept_tokens"} for every description that was cut.
+    """
+    prepared, shortened = [], []
+    for row, description in enumerate(descriptions):
+        trimmed = truncate_description(description, max_tokens)
+        if trimmed != description:
+            shortened.append({
+                "row": row,
+                "original_chars": len(description),
+                "original_tokens": count_tokens(description[:MAX_SCAN_CHARS]), # Lower bound past MAX_SCAN_CHARS
+                "kept_tokens": count_tokens(trimmed),
+            })
+        prepared.append(trimmed)
+    return prepared, shortened
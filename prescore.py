@@ -0,0 +1,55 @@
+# prescore.py
+
+import re
+
+# --- Local Pre-Check (no API calls) ---
+# A cheap keyword heuristic derived from the rubric in prompts.py. It is not a replacement for the model:
+# it flags leads where the model's answer looks implausible (cascade escalation) and orders work.
+
+# Signals from the 'High Fit' criteria: tech, cloud, AI, data, software development, large-scale operations
+HIGH_FIT_SIGNALS = {
+    "ai": 3, "artificial intelligence": 3, "machine learning": 3, "cloud": 3, "saas": 3, "software": 2,
+    "data": 2, "analytics": 2, "platform": 1, "infrastructure": 2, "cybersecurity": 2, "devops": 2,
+    "api": 1, "automation": 1, "digital": 1, "technology": 1, "tech": 1, "it services": 2,
+    "enterprise": 2, "b2b": 2, "large-scale": 2, "global": 1, "international": 1, "logistics": 1,
+    "fintech": 2, "healthtech": 2, "iot": 2, "blockchain": 1,
+}
+# Signals from the 'Not Fit' criteria: B2C, retail, small local services
+NOT_FIT_SIGNALS = {
+    "b2c": 3, "retail": 2, "local": 2, "consumer": 1, "residential": 2, "boutique": 2, "bakery": 3,
+    "restaurant": 3, "cafe": 3, "salon": 3, "pet": 2, "family-owned": 2, "neighborhood": 2,
+    "individual": 1, "organic": 1, "handmade": 2,
+}
+
+STATUS_BANDS = {"Not Fit": 0, "Low Fit": 1, "Medium Fit": 2, "High Fit": 3}
+
+_HIGH_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in HIGH_FIT_SIGNALS) + r")\b", re.IGNORECASE)
+_NOT_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in NOT_FIT_SIGNALS) + r")\b", re.IGNORECASE)
+
+
+def prescore_lead(company_name: str, description: str) -> dict:
+    """
+    Scores a lead locally from rubric keywords.
+    Returns {"score": float, "status": str}; a higher score means a more likely High Fit.
+    """
+    text = f"{company_name} {description}"
+    positive = sum(HIGH_FIT_SIGNALS[m.lower()] for m in _HIGH_PATTERN.findall(text))
+    negative = sum(NOT_FIT_SIGNALS[m.lower()] for m in _NOT_PATTERN.findall(text))
+    score = float(positive - negative)
+
+    if score >= 5:
+        status = "High Fit"
+    elif score >= 2:
+        status = "Medium Fit"
+    elif score > -2:
+        status = "Low Fit"
+    else:
+        status = "Not Fit"
+    return {"score": score, "status": status}
+
+
+def status_distance(status_a: str, status_b: str) -> int:
+    """Number of fit bands between two statuses (unknown statuses count as maximally distant)."""
+    if status_a not in STATUS_BANDS or status_b not in STATUS_BANDS:
+        return len(STATUS_BANDS)
+    return abs(STATUS_BANDS[status_a] - STATUS_BANDS[status_b])
@@ -0,0 +1,89 @@
+# prioritization.py
+
+import heapq
+from dataclasses import dataclass
+
+import pandas as pd
+
+from preprocessing import prepare_descriptions
+from prescore import prescore_lead
+
+# --- Priority-First Scheduling ---
+# Leads are qualified in order of a cheap local pre-score (keyword signals from the rubric's High Fit
+# criteria, see prescore.py) instead of file order, so likely High Fit leads come back first on long runs.
+
+
+def prioritize_leads(lead_rows: list) -> tuple:
+    """
+    Orders `lead_rows` (a list of (df_index, company, description) tuples) for processing.
+    Returns (order, prescores): `order` lists positions into `lead_rows`, highest pre-score first
+    (ties keep file order), and `prescores` holds each row's pre-score by position.
+    """
+    prescores = [prescore_lead(company, description)["score"] for _, company, description in lead_rows]
+    order = sorted(range(len(lead_rows)), key=lambda pos: (-prescores[pos], pos))
+    return order, prescores
+
+
+@dataclass
+class LeadPlan:
+    """Everything decided about an upload before its leads are submitted (shared by normal and speculative runs)."""
+    lead_rows: list              # (df_index, company, description) per file position
+    prepared_descriptions: list  # Descriptions after the token budget was enforced
+    shortened_rows: list         # prepare_descriptions() report for rows that were shortened
+    processing_order: list       # Positions into lead_rows, in submission order
+    prescores: list              # Pre-score by position
+
+    @property
+    def shortened_row_set(self) -> set:
+        return {entry["row"] for entry in self.shortened_rows}
+
+
+def _safe_str(val) -> str:
+    """Converts a cell to str, treating None/NaN/pd.NA and non-scalar values as empty."""
+    if val is None:
+        return ""
+    try:
+        if pd.isna(val): # Handles np.nan, pd.NA, pd.NaT
+            return ""
+    except Exception:
+        pass
+    if hasattr(val, 'ndim') and val.ndim > 0: # A Series or NDFrame is treated as empty
+        return ""
+    return str(val)
+
+
+def build_lead_plan(df: pd.DataFrame, priority_first: bool = True) -> LeadPlan:
+    """Extracts lead rows from an uploaded frame, enforces the description token budget and orders them."""
+    lead_rows = [
+        (df_index, _safe_str(row.get('Company Name', "")), _safe_str(row.get('Description', "")))
+        for df_index, row in df.iterrows()
+    ]
+    prepared_descriptions, shortened_rows = prepare_descriptions([desc for _, _, desc in lead_rows])
+    if priority_first:
+        processing_order, prescores = prioritize_leads(lead_rows)
+    else:
+        processing_order, prescores = list(range(len(lead_rows))), [0.0] * len(lead_rows)
+    return LeadPlan(lead_rows, prepared_descriptions, shortened_rows, processing_order, prescores)
+
+
+class TopLeadsTracker:
+    """Keeps the best `size` qualified leads seen so far (by priority score, then pre-score) for a live table."""
+    def __init__(self, size: int = 10):
+        self.size = size
+        self._heap = [] # Min-heap of (priority_score, prescore, -position, row_dict)
+
+    def add(self, position: int, prescore: float, row: dict):
+        entry = (int(row.get("Priority Score", 0) or 0), prescore, -position, row)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry[:3] > self._heap[0][:3]:
+            heapq.heapreplace(self._heap, entry)
+
+    def to_dataframe(self, columns=("Original Company Name", "Qualified Status", "Priority Score", "Reasoning")) -> pd.DataFrame:
+        best = sorted(self._heap, key=lambda e: e[:3], reverse=True)
+        return pd.DataFrame([{col: entry[3].get(col) for col in columns} for entry in best], columns=list(columns))
+
+
+def partial_export_interval(total_leads: int) -> int:
+    """How many leads to process between refreshes of the live top-leads table and partial export."""
+    return max(10, total_leads // 50)
@@ -0,0 +1,149 @@
+# profile_cache.py
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from metrics import metrics
+
+# --- Read-Through User-Profile Cache ---
+# get_user_profile used to do a blocking Firestore read on every Streamlit rerun, and the analysis loop
+# repeated it after every lead just to refresh the sidebar. Profiles are now cached process-wide:
+#   - reads go to memory; Firestore is only read on a miss or once an entry is PROFILE_CACHE_TTL old
+#   - local saves write through and replace the cached entry, so the next read never goes back to Firestore
+#   - optionally (LUMINOVA_PROFILE_CACHE_LISTEN=1), a Firestore snapshot listener per cached profile applies
+#     remote changes (another app instance, an admin edit) as they happen, instead of waiting for the TTL.
+#     Off by default: it holds one watch stream open per cached profile.
+# Entries are LRU-bounded; evicting one also unsubscribes its listener. Every session gets its own copy
+# of a profile, so one session's in-place edits never leak into another's before they are saved.
+
+PROFILE_CACHE_TTL = float(os.getenv("LUMINOVA_PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("LUMINOVA_PROFILE_CACHE_ENTRIES", "512"))
+PROFILE_CACHE_LISTEN = os.getenv("LUMINOVA_PROFILE_CACHE_LISTEN", "0") == "1"
+
+
+@dataclass
+class _Entry:
+    profile: dict
+    stored_at: float # time.time() of the load, save or listener update that produced `profile`
+    watch: object = None # Listener handle with unsubscribe(), if one is attached
+
+
+class ProfileCache:
+    """
+    Process-wide TTL + LRU cache of user profiles, keyed by user id.
+    get() returns, and put() stores, a deep copy, so callers may modify their profile freely; changes reach
+    the cache only through put() (save_user_profile does that).
+    """
+    def __init__(self, ttl: float = PROFILE_CACHE_TTL, max_entries: int = PROFILE_CACHE_MAX_ENTRIES,
+                 listen: bool = PROFILE_CACHE_LISTEN):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.listen = listen
+        self._entries = OrderedDict() # user_id -> _Entry, least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, load, doc_ref=None) -> dict:
+        """
+        Returns the cached profile, calling `load()` (which reads, or creates, the Firestore document) on a
+        miss or an expired entry. With listening enabled, a snapshot listener is attached to `doc_ref`.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.time() - entry.stored_at < self.ttl:
+                self._entries.move_to_end(user_id)
+                metrics.inc("profile_cache_hits_total")
+                return copy.deepcopy(entry.profile)
+        metrics.inc("profile_cache_misses_total")
+        profile = load()
+        self.put(user_id, profile) # Stores a copy; the loaded dict is the caller's own
+        if self.listen and doc_ref is not None and hasattr(doc_ref, "on_snapshot"):
+            self._watch(user_id, doc_ref)
+        return profile
+
+    def put(self, user_id: str, profile: dict):
+        """Stores a copy of a profile that was just read from or written to Firestore."""
+        profile = copy.deepcopy(profile)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self._entries[user_id] = _Entry(profile, time.time())
+            else:
+                entry.profile, entry.stored_at = profile, time.time()
+            self._entries.move_to_end(user_id)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+        for old in evicted:
+            self._unsubscribe(old)
+        if evicted:
+            metrics.inc("profile_cache_evictions_total", len(evicted))
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._unsubscribe(entry)
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._unsubscribe(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    # --- Change listener ---
+    def _watch(self, user_id: str, doc_ref):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.watch is not None:
+                return
+        try:
+            watch = doc_ref.on_snapshot(lambda docs, changes, read_time: self._on_snapshot(user_id, docs))
+        except Exception: # Listening is an optimization; the TTL still bounds staleness without it
+            metrics.inc("profile_cache_listener_errors_total")
+            return
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.watch is None:
+                entry.watch, watch = watch, None
+        if watch is not None: # Entry was evicted or another listener won the race
+            watch.unsubscribe()
+
+    def _on_snapshot(self, user_id: str, docs):
+        """Runs on the listener's thread. Applies a remote change unless a newer local save already replaced it."""
+        snapshot = docs[0] if docs else None
+        update_time = getattr(snapshot, "update_time", None)
+        changed_at = update_time.timestamp() if update_time is not None else time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or changed_at < entry.stored_at:
+                return
+            if snapshot is None or not snapshot.exists:
+                del self._entries[user_id]
+            else:
+                entry.profile, entry.stored_at = snapshot.to_dict(), changed_at
+                # Deleted entries keep their listener reference below; unsubscribe outside the lock
+                entry = None
+        metrics.inc("profile_cache_listener_updates_total")
+        if entry is not None:
+            self._unsubscribe(entry)
+
+    @staticmethod
+    def _unsubscribe(entry: _Entry):
+        if entry.watch is not None:
+            try:
+                entry.watch.unsubscribe()
+            except Exception:
+                pass
+            entry.watch = None
+
+
+profile_cache = ProfileCache()
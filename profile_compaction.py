@@ -0,0 +1,157 @@
+# profile_compaction.py
+
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from metrics import metrics
+
+# --- Knowledge-Graph Retention & Compaction ---
+# `past_interactions` used to grow forever, and every entry repeats the full description and analysis,
+# so profile reads, writes and the sidebar's st.json got slower for every lead a user ever processed.
+# Compaction keeps the hot profile bounded:
+#   - only the newest PROFILE_RAW_WINDOW interactions stay in `past_interactions`
+#   - older ones are folded into per-period `rollups` (status counts, score histogram, top companies)
+#   - their full detail is archived gzip-compressed outside the profile document
+#     (a Firestore subcollection when connected, otherwise a local directory)
+# Compaction runs only once the raw list exceeds the window by PROFILE_COMPACT_SLACK, so it is amortized
+# over many saves rather than paid on every lead.
+
+PROFILE_RAW_WINDOW = int(os.getenv("LUMINOVA_PROFILE_RAW_WINDOW", "200"))
+PROFILE_COMPACT_SLACK = int(os.getenv("LUMINOVA_PROFILE_COMPACT_SLACK", "50"))
+ROLLUP_TOP_COMPANIES = 10
+ARCHIVE_BATCH_SIZE = 200 # Interactions per archive document (keeps Firestore docs well under 1 MB)
+LOCAL_ARCHIVE_DIR = os.getenv("LUMINOVA_PROFILE_ARCHIVE_DIR", os.path.join(tempfile.gettempdir(), "luminova_profile_archive"))
+
+
+# --- Archives for compacted detail ---
+class LocalProfileArchive:
+    """Stores archived interaction batches as .json.gz files, one directory per user."""
+    def __init__(self, root: str = LOCAL_ARCHIVE_DIR):
+        self.root = root
+
+    def write(self, user_id: str, batch_id: str, payload: bytes):
+        user_dir = os.path.join(self.root, user_id)
+        os.makedirs(user_dir, exist_ok=True)
+        tmp_path = os.path.join(user_dir, f"{batch_id}.json.gz.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, os.path.join(user_dir, f"{batch_id}.json.gz"))
+
+    def read_all(self, user_id: str):
+        user_dir = os.path.join(self.root, user_id)
+        if not os.path.isdir(user_dir):
+            return
+        for name in sorted(os.listdir(user_dir)):
+            if name.endswith(".json.gz"):
+                with open(os.path.join(user_dir, name), "rb") as f:
+                    yield from json.loads(gzip.decompress(f.read()))
+
+
+class FirestoreProfileArchive:
+    """Stores archived interaction batches in the users/{id}/interaction_archive subcollection."""
+    def __init__(self, db):
+        self.db = db
+
+    def _collection(self, user_id: str):
+        return self.db.collection('users').document(user_id).collection('interaction_archive')
+
+    def write(self, user_id: str, batch_id: str, payload: bytes):
+        self._collection(user_id).document(batch_id).set({"data": payload, "created_at": datetime.now().isoformat()})
+
+    def read_all(self, user_id: str):
+        for doc in self._collection(user_id).order_by("created_at").stream():
+            yield from json.loads(gzip.decompress(doc.to_dict()["data"]))
+
+
+def get_profile_archive(db=None):
+    return FirestoreProfileArchive(db) if db else LocalProfileArchive()
+
+
+# --- Rollups ---
+def _period(timestamp: str) -> str:
+    return (timestamp or "unknown")[:7] # YYYY-MM
+
+
+def _merge_rollup(rollup: dict, interactions: list) -> dict:
+    status_counts = Counter(rollup.get("status_counts", {}))
+    score_histogram = Counter(rollup.get("score_histogram", {}))
+    companies = Counter(rollup.get("top_companies", {}))
+    timestamps = [t for t in (rollup.get("first_timestamp"), rollup.get("last_timestamp")) if t]
+    for interaction in interactions:
+        analysis = interaction.get("analysis") or {}
+        status_counts[analysis.get("qualified_status", "Unknown")] += 1
+        score_histogram[str(analysis.get("priority_score", "N/A"))] += 1
+        companies[interaction.get("company", "")] += 1
+        if interaction.get("timestamp"):
+            timestamps.append(interaction["timestamp"])
+    return {
+        "interactions": rollup.get("interactions", 0) + len(interactions),
+        "status_counts": dict(status_counts),
+        "score_histogram": dict(sorted(score_histogram.items())),
+        # Approximate once trimmed: companies outside the top N are dropped from later merges
+        "top_companies": dict(companies.most_common(ROLLUP_TOP_COMPANIES)),
+        "first_timestamp": min(timestamps) if timestamps else None,
+        "last_timestamp": max(timestamps) if timestamps else None,
+    }
+
+
+def needs_compaction(profile: dict, raw_window: int = PROFILE_RAW_WINDOW, slack: int = PROFILE_COMPACT_SLACK) -> bool:
+    return len(profile.get("past_interactions", [])) > raw_window + slack
+
+
+def compact_profile(user_id: str, profile: dict, archive, raw_window: int = PROFILE_RAW_WINDOW) -> int:
+    """
+    Moves all but the newest `raw_window` interactions out of `profile` (in place): they are archived
+    compressed and added to the per-period rollups. Returns the number of interactions compacted.
+    The profile is only changed for batches whose archive write succeeded; if a write fails, the error is
+    logged and the remaining interactions stay raw, to be compacted on a later save.
+    """
+    interactions = profile.get("past_interactions", [])
+    overflow = len(interactions) - raw_window
+    if overflow <= 0:
+        return 0
+
+    archived = 0
+    with metrics.timer("profile_compaction_seconds"):
+        for start in range(0, overflow, ARCHIVE_BATCH_SIZE):
+            batch = interactions[start:min(start + ARCHIVE_BATCH_SIZE, overflow)]
+            batch_id = f"{batch[0].get('timestamp', '')[:19].replace(':', '')}_{uuid.uuid4().hex[:8]}"
+            try:
+                archive.write(user_id, batch_id, gzip.compress(json.dumps(batch).encode("utf-8")))
+            except Exception as e:
+                print(f"Profile compaction for {user_id} stopped: archive write failed ({e}). Keeping {overflow - archived} interactions raw.")
+                metrics.inc("profile_compaction_errors_total")
+                break
+            archived += len(batch)
+        if not archived:
+            return 0
+
+        old, profile["past_interactions"] = interactions[:archived], interactions[archived:]
+        by_period = {}
+        for interaction in old:
+            by_period.setdefault(_period(interaction.get("timestamp")), []).append(interaction)
+        rollups = profile.setdefault("rollups", {})
+        for period, period_interactions in by_period.items():
+            rollups[period] = _merge_rollup(rollups.get(period, {}), period_interactions)
+        profile["archived_interactions"] = profile.get("archived_interactions", 0) + len(old)
+
+    metrics.inc("profile_interactions_compacted_total", len(old))
+    return len(old)
+
+
+# --- Profile summaries (what the sidebar shows, independent of how much history is raw) ---
+def profile_total_interactions(profile: dict) -> int:
+    if not profile:
+        return 0
+    return profile.get("archived_interactions", 0) + len(profile.get("past_interactions", []))
+
+
+def profile_last_interaction(profile: dict) -> str:
+    if profile and profile.get("past_interactions"):
+        return profile["past_interactions"][-1]["timestamp"][:16].replace('T', ' ')
+    return 'N/A'
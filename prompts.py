@@ -0,0 +1,148 @@
+# prompts.py
+
+import os
+from preprocessing import count_tokens, truncate_description
+
+# --- Prompt Versioning ---
+# The qualification rubric lives in a fixed, versioned system prompt so it is identical for every lead.
+# Only the company name and (budgeted) description travel in the per-lead user message.
+#   v1: original layout - full rubric re-sent inside every user message (kept for comparison)
+#   v2: static rubric as the system prompt, minimal per-lead user message
+#   v3: v2 plus a self-reported "confidence" used by the model cascade in agent_logic.py
+PROMPT_VERSION = "v3"
+
+SYSTEM_PROMPT_V2 = """You are LumiNova AI, an expert Sales Lead Qualifier.
+You qualify leads for a leading provider of cloud infrastructure and advanced AI solutions for enterprises.
+Each user message contains one lead as "Company Name" and "Company Description".
+
+qualified_status - one of:
+- "High Fit": clearly B2B and explicitly mentions tech, cloud, AI, data, software development, or large-scale operations.
+- "Medium Fit": B2B, but vague or indirect alignment; might use cloud/AI but not a core focus.
+- "Low Fit": B2B but unlikely to need advanced cloud/AI solutions.
+- "Not Fit": primarily B2C, retail, small local service, or irrelevant to enterprise cloud/AI.
+priority_score - integer: High Fit 4-5, Medium Fit 3, Low Fit 1-2, Not Fit 0.
+reasoning - 2-3 concise sentences citing keywords from the description that indicate alignment or non-alignment.
+
+Respond only with a JSON object: {"qualified_status": "...", "priority_score": 0, "reasoning": "..."}"""
+
+SYSTEM_PROMPT_V3 = SYSTEM_PROMPT_V2.replace(
+    '\n\nRespond only with a JSON object: {"qualified_status": "...", "priority_score": 0, "reasoning": "..."}',
+    '\nconfidence - number from 0.0 to 1.0: how certain you are of the status given the description.\n\n'
+    'Respond only with a JSON object: {"qualified_status": "...", "priority_score": 0, "reasoning": "...", "confidence": 0.0}'
+)
+
+LEGACY_SYSTEM_PROMPT = "You are LumiNova AI, an expert sales lead qualifier."
+
+SYSTEM_PROMPTS = {
+    "v1": LEGACY_SYSTEM_PROMPT,
+    "v2": SYSTEM_PROMPT_V2,
+    "v3": SYSTEM_PROMPT_V3,
+}
+
+
+def build_legacy_messages(company_name: str, description: str) -> list:
+    """Builds the original (v1) chat messages, with the full rubric inlined for each lead."""
+    prompt = f"""You are an expert Sales Lead Qualifier AI named LumiNova AI.
+    Your task is to analyze a company's description and determine its qualification status and priority for sales outreach.
+    The client you are qualifying leads for is a **leading provider of cloud infrastructure and advanced AI solutions for enterprises**.
+
+    Analyze the following sales lead:
+    Company Name: {company_name}
+    Company Description: {description}
+
+    Based on this, provide:
+    1.  **Qualified Status**: (Choose from 'High Fit', 'Medium Fit', 'Low Fit', 'Not Fit').
+        * 'High Fit': Clearly a B2B company that explicitly mentions tech, cloud, AI, data, software development, or large-scale operations.
+        * 'Medium Fit': B2B, but vague or indirect alignment. Might use cloud/AI but not a core focus.
+        * 'Low Fit': B2B but seems unlikely to need advanced cloud/AI solutions.
+        * 'Not Fit': Primarily B2C, retail, small local service, or completely irrelevant to enterprise cloud/AI.
+    2.  **Priority Score**: (A number from 1 to 5, where 5 is highest priority for immediate sales outreach. 0 for 'Not Fit').
+        * 'High Fit' -> 4-5
+        * 'Medium Fit' -> 3
+        * 'Low Fit' -> 1-2
+        * 'Not Fit' -> 0
+    3.  **Reasoning**: (A brief, concise, 2-3 sentence explanation for why you assigned that status and score. Focus on specific keywords or phrases from the description that indicate alignment or non-alignment with cloud/AI solutions.)
+
+    Format your response strictly as a JSON object with exactly these keys. Ensure 'priority_score' is an integer.
+    {{
+      "qualified_status": "...",
+      "priority_score": int,
+      "reasoning": "..."
+    }}
+    """
+    return [
+        {"role": "system", "content": LEGACY_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def build_messages(company_name: str, description: str, version: str = PROMPT_VERSION) -> list:
+    """
+    Builds the chat messages for one lead.
+    For v2 the system prompt is static and the user message carries only the company and the description.
+    The description is used as given: callers apply the token budget first (build_lead_plan, the bulk
+    pipeline and the service all run preprocessing.truncate_description).
+    """
+    if version == "v1":
+        return build_legacy_messages(company_name, description)
+    user_content = f"Company Name: {company_name}\nCompany Description: {description}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPTS[version]},
+        {"role": "user", "content": user_content}
+    ]
+
+
+def build_field_retry_messages(messages: list, previous_response: str, missing_fields: list) -> list:
+    """
+    Follow-up turn asking the model for only the fields that could not be recovered from its previous answer,
+    so a near-valid response costs a short completion instead of a full re-qualification.
+    """
+    field_list = ", ".join(f'"{name}"' for name in missing_fields)
+    return messages + [
+        {"role": "assistant", "content": previous_response or ""},
+        {"role": "user", "content": f"Your answer was missing or had invalid values for: {field_list}. "
+                                    f"Respond only with a JSON object containing exactly those keys, following the rules above."}
+    ]
+
+
+def count_message_tokens(messages: list) -> int:
+    """Locally counted prompt tokens for a list of chat messages (including ~4 tokens of per-message overhead)."""
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
+
+
+def prompt_token_report(leads) -> dict:
+    """
+    Compares locally counted prompt tokens per version over an iterable of (company, description) pairs.
+    Returns {version: {"leads", "total_tokens", "avg_tokens", "max_tokens"}} plus the current version's saving over v1.
+    """
+    leads = [(c, truncate_description(d)) for c, d in leads] # Budgeted, as the app sends them
+    report = {}
+    for version in SYSTEM_PROMPTS:
+        counts = [count_message_tokens(build_messages(c, d, version=version)) for c, d in leads]
+        report[version] = {
+            "leads": len(counts),
+            "total_tokens": sum(counts),
+            "avg_tokens": round(sum(counts) / len(counts), 1) if counts else 0.0,
+            "max_tokens": max(counts, default=0),
+        }
+    v1_total = report["v1"]["total_tokens"]
+    report["saving_pct"] = round(100 * (1 - report[PROMPT_VERSION]["total_tokens"] / v1_total), 1) if v1_total else 0.0
+    return report
+
+
+# --- Measure the saving on the bundled sample files ---
+if __name__ == "__main__":
+    import pandas as pd
+
+    sample_files = ["sample data for testing.xlsx", "companies data for testing.xlsx"]
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sample_files:
+        df = pd.read_excel(os.path.join(base_dir, file_name))
+        pairs = zip(df["Company Name"].fillna("").astype(str), df["Description"].fillna("").astype(str))
+        report = prompt_token_report(pairs)
+        print(f"--- {file_name} ---")
+        for version in SYSTEM_PROMPTS:
+            stats = report[version]
+            print(f"  {version}: {stats['leads']} leads, {stats['total_tokens']} tokens total, "
+                  f"{stats['avg_tokens']} avg, {stats['max_tokens']} max")
+        print(f"  Saving with {PROMPT_VERSION}: {report['saving_pct']}%")
@@ -0,0 +1,291 @@
+# qualification_service.py
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from agent_logic import DEFAULT_MODEL_MODE, MODEL_MODES, process_single_lead_with_agent
+from fair_scheduler import estimate_job_tokens, get_scheduler, iter_completed
+from metrics import metrics
+from preprocessing import truncate_description
+
+# --- Local HTTP Qualification Service ---
+# Wraps `process_single_lead_with_agent` so other internal tools share one process's scheduler,
+# quota and metrics instead of importing agent_logic.py themselves.
+#   POST /v1/qualify       one lead as JSON -> one result as JSON
+#   POST /v1/qualify/bulk  NDJSON leads -> NDJSON results, streamed (chunked) as they complete
+#   GET  /healthz          liveness and scheduler queue depth
+#   GET  /metrics          Prometheus text (or JSON with ?format=json)
+# Identical in-flight requests are coalesced (single-flight), so they share one LLM call.
+# Connections are HTTP/1.1 keep-alive.
+
+SERVICE_HOST = os.getenv("LUMINOVA_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("LUMINOVA_SERVICE_PORT", "8765"))
+SERVICE_USER_HEADER = "X-User-Id" # Fair-share identity; defaults to the client's address
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution whose result they all share."""
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, submit) -> Future:
+        """
+        Returns the in-flight Future for `key`, or calls `submit()` (which must return a Future) to start one.
+        The key is released as soon as the call completes, so later requests run fresh.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                metrics.inc("service_coalesced_total")
+                return future
+            future = submit()
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._release(key, future))
+        return future
+
+    def _release(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+_single_flight = SingleFlight()
+
+
+def _parse_lead(payload: dict) -> dict:
+    """Validates one lead payload, returning normalized fields (raises ValueError on bad input)."""
+    if not isinstance(payload, dict):
+        raise ValueError("Each lead must be a JSON object")
+    company = str(payload.get("company_name") or "").strip()
+    if not company:
+        raise ValueError("'company_name' is required")
+    mode = payload.get("mode") or DEFAULT_MODEL_MODE
+    if mode not in MODEL_MODES:
+        raise ValueError(f"'mode' must be one of {', '.join(MODEL_MODES)}")
+    return {
+        "company_name": company,
+        "description": truncate_description(str(payload.get("description") or "")),
+        "lead_id": str(payload.get("lead_id") or ""),
+        "mode": mode,
+    }
+
+
+def submit_lead(user_id: str, lead: dict) -> Future:
+    """Schedules one (validated) lead, coalescing it with an identical in-flight request if there is one."""
+    key = hashlib.sha256(
+        json.dumps([lead["mode"], lead["company_name"], lead["description"]]).encode("utf-8")
+    ).hexdigest()
+    return _single_flight.do(key, lambda: get_scheduler().submit(
+        user_id, process_single_lead_with_agent,
+        lead["company_name"], lead["description"], lead["lead_id"] or key[:12],
+        mode=lead["mode"], cost_tokens=estimate_job_tokens(lead["company_name"], lead["description"])
+    ))
+
+
+class QualificationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive by default
+    server_version = "LumiNovaQualification/1.0"
+
+    def log_message(self, format, *args): # Keep request logs out of the hot path
+        pass
+
+    # --- Helpers ---
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str, content_type: str = "text/plain; version=0.0.4"):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _user_id(self) -> str:
+        return self.headers.get(SERVICE_USER_HEADER) or self.client_address[0]
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    # --- Routes ---
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/healthz":
+            self._send_json(200, {"status": "ok", **get_scheduler().stats()})
+        elif url.path == "/metrics":
+            if "format=json" in url.query:
+                self._send_text(200, metrics.to_json(), "application/json")
+            else:
+                self._send_text(200, metrics.to_prometheus())
+        else:
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        path = urlsplit(self.path).path
+        try:
+            if path == "/v1/qualify":
+                self._handle_single()
+            elif path == "/v1/qualify/bulk":
+                self._handle_bulk()
+            else:
+                self._read_body()
+                self._send_json(404, {"error": f"Unknown path {path}"})
+        finally:
+            metrics.observe("service_request_seconds", time.perf_counter() - started, {"path": path})
+
+    def _handle_single(self):
+        try:
+            lead = _parse_lead(json.loads(self._read_body() or b"{}"))
+        except ValueError as e: # Includes json.JSONDecodeError
+            self._send_json(400, {"error": str(e)})
+            return
+        try:
+            result = submit_lead(self._user_id(), lead).result()
+        except Exception as e:
+            self._send_json(500, {"error": f"Qualification failed: {e}"})
+            return
+        self._send_json(200, {"lead_id": lead["lead_id"], **result})
+
+    def _handle_bulk(self):
+        futures, errors = {}, []
+        for line_no, line in enumerate(self._read_body().splitlines()):
+            if not line.strip():
+                continue
+            try:
+                lead = _parse_lead(json.loads(line))
+            except ValueError as e:
+                errors.append({"line": line_no, "error": str(e)})
+                continue
+            # Duplicate lines share one coalesced future, so each future maps to a list of lead ids
+            futures.setdefault(submit_lead(self._user_id(), lead), []).append(lead["lead_id"] or f"line_{line_no}")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for error in errors:
+            self._write_chunk((json.dumps(error) + "\n").encode("utf-8"))
+        # Futures may be shared with other requests via single-flight, so never cancel them on disconnect
+        for lead_ids, result in iter_completed(futures, cancel_on_exit=False):
+            for lead_id in lead_ids:
+                self._write_chunk((json.dumps({"lead_id": lead_id, **result}) + "\n").encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class QualificationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def run_server(host: str = SERVICE_HOST, port: int = SERVICE_PORT) -> QualificationServer:
+    """Creates and starts the service on a background thread; returns the server (call .shutdown() to stop)."""
+    server = QualificationServer((host, port), QualificationRequestHandler)
+    threading.Thread(target=server.serve_forever, name="luminova-service", daemon=True).start()
+    return server
+
+
+# --- Client (used by app.py when LUMINOVA_SERVICE_URL is set) ---
+class QualificationClient:
+    """
+    Thin HTTP client for the service with one persistent keep-alive connection per thread.
+    `process_single_lead_with_agent` mirrors the signature of the in-process function. One client can be
+    shared by all sessions of an app process (keeping its connections warm); pass `user_id` per call.
+    """
+    def __init__(self, base_url: str, user_id: str | None = None, timeout: float = 120.0):
+        url = urlsplit(base_url)
+        self.host = url.hostname or SERVICE_HOST
+        self.port = url.port or SERVICE_PORT
+        self.user_id = user_id
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _reset_connection(self):
+        conn, self._local.conn = getattr(self._local, "conn", None), None
+        if conn is not None:
+            conn.close()
+
+    def _request(self, method: str, path: str, body: bytes | None = None, content_type: str = "application/json",
+                 user_id: str | None = None):
+        headers = {"Content-Type": content_type}
+        if user_id or self.user_id:
+            headers[SERVICE_USER_HEADER] = user_id or self.user_id
+        for attempt in range(2): # Retry once if the server closed an idle keep-alive connection
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self._reset_connection()
+                if attempt:
+                    raise
+
+    def qualify(self, company_name: str, description: str, lead_id: str = "", mode: str | None = None,
+                user_id: str | None = None) -> dict:
+        payload = {"company_name": company_name, "description": description, "lead_id": lead_id, "mode": mode}
+        response = self._request("POST", "/v1/qualify", json.dumps(payload).encode("utf-8"), user_id=user_id)
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"Qualification service error {response.status}: {data.get('error')}")
+        return data
+
+    def qualify_bulk(self, leads):
+        """Sends an iterable of lead dicts as NDJSON and yields result dicts as the service streams them back."""
+        body = "".join(json.dumps(lead) + "\n" for lead in leads).encode("utf-8")
+        response = self._request("POST", "/v1/qualify/bulk", body, "application/x-ndjson")
+        for line in response: # http.client decodes the chunked encoding
+            if line.strip():
+                yield json.loads(line)
+
+    def process_single_lead_with_agent(self, company: str, description: str, lead_id: str, mode: str = DEFAULT_MODEL_MODE,
+                                       user_id: str | None = None):
+        try:
+            result = self.qualify(company, description, lead_id, mode, user_id)
+        except (OSError, http.client.HTTPException, RuntimeError, ValueError) as e:
+            # Like the in-process function: one failed lead (or an unreachable service) becomes an Error row
+            self._reset_connection() # A timed-out or half-read connection cannot be reused
+            print(f"Error calling qualification service for lead {lead_id}: {e}")
+            metrics.inc("service_client_errors_total")
+            return {
+                "qualified_status": "Error",
+                "priority_score": 0,
+                "reasoning": f"AI processing failed due to qualification service error: {e}"
+            }
+        result.pop("lead_id", None)
+        return result
+
+    def health(self) -> dict:
+        return json.loads(self._request("GET", "/healthz").read())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the LumiNova AI lead qualification service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args()
+    print(f"LumiNova AI qualification service listening on http://{args.host}:{args.port}")
+    QualificationServer((args.host, args.port), QualificationRequestHandler).serve_forever()
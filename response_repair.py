@@ -0,0 +1,198 @@
+# response_repair.py
+
+import json
+import math
+import re
+from dataclasses import dataclass, field
+
+# --- LLM Response Validation & Repair ---
+# Salvages near-valid model output locally instead of turning it into a hard "Error" row:
+#   - pulls the JSON object out of surrounding prose / code fences and fixes common syntax slips
+#   - normalizes statuses tolerantly ('high', 'HIGH_FIT', 'Not a fit' ...)
+#   - coerces scores ('4', '4/5', 4.0) and makes them consistent with the status -> score bands
+# Only fields that cannot be recovered are reported as missing, so the caller can re-ask for just those.
+
+STATUS_SCORE_BANDS = {
+    "High Fit": (4, 5),
+    "Medium Fit": (3, 3),
+    "Low Fit": (1, 2),
+    "Not Fit": (0, 0),
+}
+
+_STATUS_ALIASES = {
+    "high": "High Fit", "highfit": "High Fit", "strongfit": "High Fit", "excellentfit": "High Fit",
+    "medium": "Medium Fit", "mediumfit": "Medium Fit", "moderate": "Medium Fit", "moderatefit": "Medium Fit",
+    "mid": "Medium Fit", "midfit": "Medium Fit",
+    "low": "Low Fit", "lowfit": "Low Fit", "weakfit": "Low Fit", "poorfit": "Low Fit",
+    "not": "Not Fit", "notfit": "Not Fit", "notafit": "Not Fit", "nofit": "Not Fit", "unfit": "Not Fit",
+    "none": "Not Fit", "notqualified": "Not Fit",
+}
+
+
+class ResponseValidationError(ValueError):
+    """Raised when a model response cannot be turned into a complete qualification."""
+
+
+@dataclass
+class RepairResult:
+    data: dict
+    missing: list = field(default_factory=list) # Required fields that could not be recovered
+    repaired: bool = False                      # True if anything had to be fixed locally
+
+
+# --- Field coercers (value -> normalized value, or None if unrecoverable) ---
+def normalize_status(value):
+    if not isinstance(value, str):
+        return None
+    key = re.sub(r"[^a-z]", "", value.lower())
+    if value.strip() in STATUS_SCORE_BANDS:
+        return value.strip()
+    return _STATUS_ALIASES.get(key)
+
+
+def coerce_score(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # json.loads accepts NaN / Infinity; leave those to the status band or the field retry
+        return int(round(value)) if math.isfinite(value) else None
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:\.\d+)?", value)
+        if match:
+            return int(round(float(match.group())))
+    return None
+
+
+def coerce_reasoning(value):
+    if isinstance(value, list):
+        value = " ".join(str(v) for v in value)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def coerce_confidence(value):
+    if isinstance(value, str) and value.strip().endswith("%"):
+        value = coerce_score(value)
+        return None if value is None else max(0.0, min(1.0, value / 100))
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, min(1.0, value)) if math.isfinite(value) else None
+
+
+# Compiled schema for the QualifiedLead fields: field -> (coercer, required, accepted alternative keys)
+LEAD_SCHEMA = {
+    "qualified_status": (normalize_status, True, ("status", "qualification", "qualified status", "fit")),
+    "priority_score": (coerce_score, True, ("score", "priority", "priority score")),
+    "reasoning": (coerce_reasoning, True, ("reason", "explanation", "rationale")),
+    "confidence": (coerce_confidence, False, ()),
+}
+_KEY_LOOKUP = {
+    alias.replace(" ", "_"): name
+    for name, (_, _, aliases) in LEAD_SCHEMA.items()
+    for alias in (name,) + aliases
+}
+
+
+# --- JSON extraction ---
+def _balanced_object(text: str):
+    """Returns the first balanced {...} substring of `text` (string-literal aware), or None."""
+    start = text.find("{")
+    while start != -1:
+        depth, in_string, escaped = 0, False, False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find("{", start + 1)
+    return None
+
+
+def extract_json_object(text: str):
+    """
+    Extracts a JSON object from raw model output. Returns (obj, repaired) or (None, True).
+    Handles prose around the object, code fences, smart quotes and trailing commas.
+    """
+    if not text:
+        return None, True
+    try:
+        obj = json.loads(text)
+        if isinstance(obj, dict):
+            return obj, False
+    except json.JSONDecodeError:
+        pass
+
+    cleaned = text.replace("“", '"').replace("”", '"').replace("’", "'")
+    candidate = _balanced_object(cleaned)
+    if candidate is None:
+        return None, True
+    for attempt in (candidate, re.sub(r",\s*([}\]])", r"\1", candidate)):
+        try:
+            obj = json.loads(attempt)
+            if isinstance(obj, dict):
+                return obj, True
+        except json.JSONDecodeError:
+            continue
+    return None, True
+
+
+# --- Validation & repair ---
+def _status_for_score(score: int) -> str:
+    for status, (low, high) in STATUS_SCORE_BANDS.items():
+        if low <= score <= high:
+            return status
+    return "High Fit" if score > 5 else "Not Fit"
+
+
+def repair_response(raw_text: str, base: dict | None = None) -> RepairResult:
+    """
+    Validates and repairs a raw model response against LEAD_SCHEMA.
+    `base` holds fields already recovered from an earlier attempt; fields parsed from `raw_text` take precedence.
+    """
+    obj, repaired = extract_json_object(raw_text)
+    data = dict(base or {})
+    if obj is not None:
+        for raw_key, value in obj.items():
+            name = _KEY_LOOKUP.get(str(raw_key).strip().lower().replace(" ", "_"))
+            if name is None:
+                repaired = True # Extra keys are dropped
+                continue
+            if name != raw_key:
+                repaired = True
+            coerced = LEAD_SCHEMA[name][0](value)
+            if coerced is None:
+                repaired = True
+                continue
+            if coerced != value:
+                repaired = True
+            data[name] = coerced
+
+    status, score = data.get("qualified_status"), data.get("priority_score")
+    if status is None and score is not None:
+        data["qualified_status"] = status = _status_for_score(score)
+        repaired = True
+    if status is not None:
+        low, high = STATUS_SCORE_BANDS[status]
+        consistent = low if score is None else max(low, min(high, score))
+        if consistent != score:
+            data["priority_score"] = consistent
+            repaired = True
+
+    missing = [name for name, (_, required, _) in LEAD_SCHEMA.items() if required and name not in data]
+    data.setdefault("confidence", None)
+    return RepairResult(data=data, missing=missing, repaired=repaired)
@@ -0,0 +1,123 @@
+# result_store.py
+
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from session_memory import SessionMemory, get_session_memory
+
+# --- Session-Scoped Analysis Results ---
+# Streamlit re-executes app.py on every widget interaction, so results held in local variables vanish
+# as soon as the user clicks "Download" or expands a table. Completed runs are kept here instead,
+# keyed by (upload hash, run id), and the post-analysis views are rendered from the store on every rerun.
+
+DEFAULT_MAX_RUNS = 3                   # Runs kept per session (across all uploads)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024   # Approximate memory budget per session
+DEFAULT_TTL_SECONDS = 2 * 60 * 60      # Runs untouched for this long are considered stale
+
+
+def content_hash(data: bytes) -> str:
+    """Stable identifier for uploaded file contents."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@dataclass
+class StoredRun:
+    upload_hash: str
+    run_id: str
+    model_mode: str
+    memory: SessionMemory # Holds the processed frame and CSV bytes, spilling them to disk over budget
+    size_bytes: int = 0   # In-memory size of the frame plus CSV when stored
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+
+    @property
+    def processed_df(self) -> pd.DataFrame:
+        return self.memory.get(f"run_{self.run_id}_df")
+
+    @property
+    def csv_bytes(self) -> bytes:
+        return self.memory.get(f"run_{self.run_id}_csv")
+
+    def release(self):
+        self.memory.discard(f"run_{self.run_id}_df")
+        self.memory.discard(f"run_{self.run_id}_csv")
+
+
+class ResultStore:
+    """
+    Bounded LRU store of completed analysis runs for one Streamlit session.
+    Evicts the least recently viewed run when the run count or byte budget is exceeded,
+    and drops runs that have not been viewed within `ttl_seconds`. Run data lives in the session's
+    SessionMemory, so older runs spill to disk before they are evicted.
+    """
+    def __init__(self, max_runs: int = DEFAULT_MAX_RUNS, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, memory: SessionMemory | None = None):
+        self.memory = memory if memory is not None else SessionMemory()
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._runs = OrderedDict() # (upload_hash, run_id) -> StoredRun, least recently used first
+
+    def put(self, upload_hash: str, run_id: str, processed_df: pd.DataFrame, model_mode: str) -> StoredRun:
+        """Stores a finished run (encoding the CSV download once) and returns it."""
+        csv_bytes = processed_df.to_csv(index=False).encode('utf-8')
+        run = StoredRun(
+            upload_hash=upload_hash,
+            run_id=run_id,
+            model_mode=model_mode,
+            memory=self.memory,
+            size_bytes=int(processed_df.memory_usage(deep=True).sum()) + len(csv_bytes),
+        )
+        self.memory.put(f"run_{run_id}_df", processed_df)
+        self.memory.put(f"run_{run_id}_csv", csv_bytes)
+        self._runs[(upload_hash, run_id)] = run
+        self._runs.move_to_end((upload_hash, run_id))
+        self._evict()
+        return run
+
+    def get(self, upload_hash: str, run_id: str):
+        self._evict()
+        run = self._runs.get((upload_hash, run_id))
+        if run is not None:
+            run.last_access = time.time()
+            self._runs.move_to_end((upload_hash, run_id))
+        return run
+
+    def latest(self, upload_hash: str):
+        """Most recent run for an upload, or None if it was never analyzed (or has been evicted)."""
+        self._evict()
+        candidates = [run for (h, _), run in self._runs.items() if h == upload_hash]
+        if not candidates:
+            return None
+        run = max(candidates, key=lambda r: r.created_at)
+        return self.get(run.upload_hash, run.run_id)
+
+    def total_bytes(self) -> int:
+        return sum(run.size_bytes for run in self._runs.values())
+
+    def __len__(self):
+        return len(self._runs)
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, run in self._runs.items() if now - run.last_access > self.ttl_seconds]:
+            self._runs.pop(key).release()
+        # Always keep the newest run, even if it alone exceeds the byte budget
+        while len(self._runs) > 1 and (len(self._runs) > self.max_runs or self.total_bytes() > self.max_bytes):
+            self._runs.popitem(last=False)[1].release()
+
+
+def get_result_store(session_state) -> ResultStore:
+    """Returns the session's ResultStore, creating it on first use."""
+    if "result_store" not in session_state:
+        session_state["result_store"] = ResultStore(memory=get_session_memory(session_state))
+    return session_state["result_store"]
@@ -0,0 +1,190 @@
+# run_profiler.py
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+from metrics import metrics
+
+# --- Opt-in Run Profiling ---
+# "Profile this run" wraps the analysis in:
+#   - a sampling profiler: a background thread snapshots thread stacks (sys._current_frames) every
+#     PROFILE_INTERVAL_MS and counts collapsed stacks. Nothing is hooked into function calls, so the
+#     overhead is a few percent at the default interval and safe on production uploads. Only the thread
+#     that runs the analysis and the scheduler workers busy with this user's jobs are sampled; other
+#     sessions and idle workers of the shared pools stay out of the report.
+#   - per-stage wall time (parsing, planning, waiting on the model, Firestore writes, sidebar rendering ...)
+# Output: collapsed stacks ("frame;frame;frame count" - open with speedscope.app or flamegraph.pl),
+# a top-N hot-function table and a stage table.
+
+PROFILE_INTERVAL_MS = float(os.getenv("LUMINOVA_PROFILE_INTERVAL_MS", "10"))
+MAX_STACK_DEPTH = 64
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler; start() / stop(), then read collapsed() or top_functions().
+    `thread_ids`, if given, is called before each sample and returns the idents of the threads to sample;
+    without it every thread is sampled.
+    """
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, thread_ids=None):
+        self.interval = interval_ms / 1000
+        self.thread_ids = thread_ids
+        self.samples = 0
+        self._stacks = Counter() # "thread;outer;...;inner" -> samples
+        self._stop = threading.Event()
+        self._thread = None
+        self.sampling_seconds = 0.0 # Time spent taking samples (profiler overhead)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="luminova-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            wanted = self.thread_ids() if self.thread_ids is not None else None
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (wanted is not None and thread_id not in wanted):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                # Pool threads share a name prefix, so their samples merge into one root
+                thread_name = names.get(thread_id, "unknown").rstrip("0123456789").rstrip("-_")
+                self._stacks[";".join([thread_name] + stack[::-1])] += 1
+            self.samples += 1
+            self.sampling_seconds += time.perf_counter() - started
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text, the input format of flamegraph.pl and speedscope."""
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def top_functions(self, n: int = 20, exclude_idle: bool = True) -> pd.DataFrame:
+        """
+        Hottest functions: 'Self %' counts samples where the function was on top of the stack,
+        'Total %' samples where it was anywhere on it. Idle waits (locks, sleeps) are dropped by default.
+        """
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self._stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            if exclude_idle and frames[-1].split(":")[-1] in ("wait", "_wait_for_tstate_lock", "sleep", "select", "poll"):
+                continue
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        samples = sum(self._stacks.values()) or 1
+        return pd.DataFrame([
+            {"Function": label, "Self %": round(100 * self_counts[label] / samples, 2),
+             "Total %": round(100 * total_counts[label] / samples, 2)}
+            for label, _ in self_counts.most_common(n)
+        ], columns=["Function", "Self %", "Total %"])
+
+
+class RunProfiler:
+    """
+    Stage timers plus an optional sampling profiler for one analysis run. When `enabled` is False every
+    method is a cheap no-op, so the analysis code can call it unconditionally.
+    The sampler covers the thread that calls start() plus the threads returned by `worker_threads()`
+    (e.g. the scheduler workers currently running this user's jobs).
+    """
+    def __init__(self, enabled: bool, interval_ms: float = PROFILE_INTERVAL_MS, worker_threads=None):
+        self.enabled = enabled
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = Counter()
+        self.worker_threads = worker_threads
+        self.run_thread_id = None
+        self.sampler = SamplingProfiler(interval_ms, self._sampled_threads) if enabled else None
+        self.started = None
+        self.wall_seconds = 0.0
+
+    def start(self):
+        if self.enabled:
+            self.started = time.perf_counter()
+            self.run_thread_id = threading.get_ident()
+            self.sampler.start()
+        return self
+
+    def stop(self):
+        if self.enabled:
+            self.sampler.stop()
+            self.wall_seconds = time.perf_counter() - self.started
+
+    def _sampled_threads(self) -> set:
+        threads = {self.run_thread_id}
+        if self.worker_threads is not None:
+            threads |= self.worker_threads()
+        return threads
+
+    @contextmanager
+    def _timed(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started)
+
+    def stage(self, name: str):
+        """Context manager that adds the block's wall time to stage `name`."""
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def add_stage(self, name: str, seconds: float):
+        if self.enabled:
+            self.stage_seconds[name] += seconds
+            self.stage_calls[name] += 1
+            metrics.observe("profiled_stage_seconds", seconds, {"stage": name})
+
+    def timed_iter(self, iterable, name: str):
+        """Yields from `iterable`, charging the time spent waiting for each item to stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def stage_table(self) -> pd.DataFrame:
+        wall = self.wall_seconds or sum(self.stage_seconds.values()) or 1
+        return pd.DataFrame([
+            {"Stage": name, "Calls": self.stage_calls[name], "Wall Time (s)": round(seconds, 3),
+             "% of Run": round(100 * seconds / wall, 1)}
+            for name, seconds in sorted(self.stage_seconds.items(), key=lambda item: -item[1])
+        ], columns=["Stage", "Calls", "Wall Time (s)", "% of Run"])
+
+    def summary(self) -> dict:
+        """JSON-serializable summary (stages, sampler overhead) for download."""
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "samples": self.sampler.samples if self.sampler else 0,
+            "sampling_interval_ms": self.sampler.interval * 1000 if self.sampler else None,
+            "profiler_overhead_seconds": round(self.sampler.sampling_seconds, 3) if self.sampler else 0.0,
+            "stages": self.stage_table().to_dict("records"),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
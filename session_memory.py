@@ -0,0 +1,256 @@
+# session_memory.py
+
+import importlib.util
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from metrics import metrics
+
+# --- Bounded Per-Session Memory ---
+# Every Streamlit session used to keep its processed frames and encoded CSV downloads in RAM for as long
+# as the session lived, so RSS grew with the number of concurrent analysts until the container was killed.
+# Large session objects are registered here instead:
+#   - each session has a byte budget for what it holds in memory
+#   - over budget, the least recently used objects spill to a per-session temp directory
+#     (frames as Arrow IPC files read back through a memory map, bytes as plain files)
+#   - sessions idle for LUMINOVA_SESSION_IDLE_MINUTES are spilled entirely, and a session's files are
+#     deleted when Streamlit drops the session (or on the next startup sweep if the process died)
+
+SESSION_MEMORY_BUDGET = int(os.getenv("LUMINOVA_SESSION_MEMORY_MB", "32")) * 1024 * 1024
+SESSION_IDLE_SECONDS = float(os.getenv("LUMINOVA_SESSION_IDLE_MINUTES", "30")) * 60
+SPILL_ROOT = os.getenv("LUMINOVA_SESSION_SPILL_DIR", os.path.join(tempfile.gettempdir(), "luminova_session_spill"))
+ORPHAN_MAX_AGE_SECONDS = 24 * 60 * 60 # Spill dirs left behind by a crashed process are removed after this
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+class SpillableItem:
+    """One large session object (DataFrame or bytes) that lives in memory or in a spill file."""
+    def __init__(self, name: str, value, spill_dir: str):
+        self.name = name
+        self.kind = "frame" if isinstance(value, pd.DataFrame) else "bytes"
+        self.path = os.path.join(spill_dir, f"{name}.{'arrow' if self.kind == 'frame' and ARROW_AVAILABLE else 'bin'}")
+        self.memory_bytes = _size_of(value)
+        self.disk_bytes = 0
+        self.last_access = time.time()
+        self._value = value
+
+    @property
+    def in_memory(self) -> bool:
+        return self._value is not None
+
+    def load(self):
+        """Returns the value, reading it back from its spill file if needed (it stays on disk)."""
+        self.last_access = time.time()
+        if self._value is not None:
+            return self._value
+        if self.kind == "bytes":
+            with open(self.path, "rb") as f:
+                return f.read()
+        if self.path.endswith(".arrow"):
+            import pyarrow as pa
+            with pa.memory_map(self.path, "r") as source:
+                return pa.ipc.open_file(source).read_all().to_pandas()
+        with open(self.path, "rb") as f:
+            return pickle.load(f)
+
+    def spill(self) -> int:
+        """Writes the value to disk and drops it from memory; returns the bytes freed."""
+        if self._value is None:
+            return 0
+        if not os.path.exists(self.path):
+            tmp_path = f"{self.path}.tmp"
+            if self.kind == "bytes":
+                with open(tmp_path, "wb") as f:
+                    f.write(self._value)
+            elif self.path.endswith(".arrow"):
+                import pyarrow as pa
+                try:
+                    table = pa.Table.from_pandas(self._value, preserve_index=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError): # Mixed-type object columns: fall back to pickle
+                    self.path = self.path[:-len(".arrow")] + ".bin"
+                    return self.spill()
+                with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            else:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(self._value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self.disk_bytes = os.path.getsize(self.path)
+        self._value = None
+        metrics.inc("session_spills_total", labels={"kind": self.kind})
+        return self.memory_bytes
+
+    def discard(self):
+        self._value = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _size_of(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return len(value)
+
+
+def _remove_dir(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class SessionMemory:
+    """
+    Byte-budgeted store for one session's large objects. `put` registers an object under a name;
+    `get` returns it from memory or its spill file. Values read back from disk are not re-cached.
+    """
+    def __init__(self, session_id: str | None = None, budget_bytes: int = SESSION_MEMORY_BUDGET,
+                 spill_root: str = SPILL_ROOT):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.budget_bytes = budget_bytes
+        self.spill_dir = os.path.join(spill_root, self.session_id)
+        self.last_activity = time.time()
+        self._items = OrderedDict() # name -> SpillableItem, least recently used first
+        self._lock = threading.Lock()
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Delete the spill directory once Streamlit drops the session and this object is collected
+        self._finalizer = weakref.finalize(self, _remove_dir, self.spill_dir)
+
+    def put(self, name: str, value):
+        with self._lock:
+            old = self._items.pop(name, None)
+            if old is not None:
+                old.discard()
+            self._items[name] = SpillableItem(name, value, self.spill_dir)
+            self._touch()
+            self._enforce_budget(keep=name)
+
+    def get(self, name: str, default=None):
+        with self._lock:
+            item = self._items.get(name)
+            self._touch()
+            if item is None:
+                return default
+            self._items.move_to_end(name)
+            return item.load()
+
+    def discard(self, name: str):
+        with self._lock:
+            item = self._items.pop(name, None)
+            if item is not None:
+                item.discard()
+
+    def __contains__(self, name: str):
+        with self._lock:
+            return name in self._items
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return self._memory_bytes()
+
+    def disk_bytes(self) -> int:
+        with self._lock:
+            return sum(item.disk_bytes for item in self._items.values() if not item.in_memory)
+
+    def spill_all(self) -> int:
+        with self._lock:
+            return sum(item.spill() for item in self._items.values())
+
+    def close(self):
+        """Drops everything and deletes the session's spill directory."""
+        with self._lock:
+            self._items.clear()
+        self._finalizer()
+
+    def report(self) -> pd.DataFrame:
+        """Per-object memory report for this session."""
+        now = time.time()
+        with self._lock: # Snapshot, so a concurrent put or spill cannot change the items mid-report
+            rows = [
+                {
+                    "Object": item.name,
+                    "Kind": item.kind,
+                    "Location": "memory" if item.in_memory else "disk",
+                    "Memory (KB)": round(item.memory_bytes / 1024, 1) if item.in_memory else 0.0,
+                    "Disk (KB)": round(item.disk_bytes / 1024, 1) if not item.in_memory else 0.0,
+                    "Idle (s)": round(now - item.last_access),
+                }
+                for item in reversed(self._items.values())
+            ]
+        return pd.DataFrame(rows, columns=["Object", "Kind", "Location", "Memory (KB)", "Disk (KB)", "Idle (s)"])
+
+    def _touch(self):
+        self.last_activity = time.time()
+
+    # Callers hold self._lock
+    def _memory_bytes(self) -> int:
+        return sum(item.memory_bytes for item in self._items.values() if item.in_memory)
+
+    def _enforce_budget(self, keep: str):
+        # Spill least recently used objects first; the object just stored stays in memory if it can
+        for item in list(self._items.values()):
+            if self._memory_bytes() <= self.budget_bytes:
+                break
+            if item.name != keep:
+                item.spill()
+        if self._memory_bytes() > self.budget_bytes:
+            self._items[keep].spill()
+
+
+# --- Process-wide registry (for idle cleanup and the all-sessions report) ---
+_sessions = weakref.WeakValueDictionary() # session_id -> SessionMemory; dropped sessions disappear
+_registry_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def spill_idle_sessions(idle_seconds: float = SESSION_IDLE_SECONDS) -> int:
+    """Spills every object of sessions idle longer than `idle_seconds`; returns the bytes freed."""
+    now = time.time()
+    with _registry_lock:
+        idle = [s for s in list(_sessions.values()) if now - s.last_activity > idle_seconds]
+    return sum(session.spill_all() for session in idle)
+
+
+def _remove_orphaned_spill_dirs(spill_root: str = SPILL_ROOT):
+    if not os.path.isdir(spill_root):
+        return
+    cutoff = time.time() - ORPHAN_MAX_AGE_SECONDS
+    for name in os.listdir(spill_root):
+        path = os.path.join(spill_root, name)
+        if name not in _sessions and os.path.getmtime(path) < cutoff:
+            _remove_dir(path)
+
+
+def process_memory_report() -> dict:
+    """Totals across all live sessions in this process."""
+    with _registry_lock:
+        sessions = list(_sessions.values())
+    return {
+        "sessions": len(sessions),
+        "memory_bytes": sum(s.memory_bytes() for s in sessions),
+        "disk_bytes": sum(s.disk_bytes() for s in sessions),
+        "budget_bytes_per_session": SESSION_MEMORY_BUDGET,
+    }
+
+
+def get_session_memory(session_state) -> SessionMemory:
+    """Returns the session's SessionMemory, creating it on first use; also spills idle sessions now and then."""
+    global _last_sweep
+    if "session_memory" not in session_state:
+        session_state["session_memory"] = SessionMemory()
+        with _registry_lock:
+            _sessions[session_state["session_memory"].session_id] = session_state["session_memory"]
+    memory = session_state["session_memory"]
+    memory._touch()
+    now = time.time()
+    if now - _last_sweep > 60:
+        _last_sweep = now
+        spill_idle_sessions()
+        _remove_orphaned_spill_dirs()
+    return memory
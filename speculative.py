@@ -0,0 +1,129 @@
+# speculative.py
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fair_scheduler import estimate_job_tokens, get_scheduler
+from metrics import metrics
+from prioritization import LeadPlan
+
+# --- Speculative Background Qualification ---
+# Users typically spend tens of seconds on the preview between "Data format validated!" and clicking
+# "Analyze Leads with AI". With speculation enabled, the first SPECULATIVE_MAX_ROWS rows (the ones the
+# user is looking at) are submitted to the fair-share scheduler as soon as the upload is validated,
+# at a reduced weight so they never crowd out other users' real work. The Analyze button then attaches
+# to those futures and only submits the rest.
+# Uploading a different file (or removing it) cancels the speculative jobs that have not started; results
+# that already completed stay cached for the last MAX_SPECULATIVE_RUNS uploads, in case the user switches back.
+# Once an upload has been analyzed in a mode, it is never speculated on again in that session: every later
+# rerun (downloads, CRM push, widget changes) would otherwise re-submit the whole plan to the model.
+
+SPECULATIVE_DEFAULT = os.getenv("LUMINOVA_SPECULATIVE", "0") == "1"
+SPECULATIVE_MAX_ROWS = int(os.getenv("LUMINOVA_SPECULATIVE_MAX_ROWS", "100"))
+SPECULATIVE_WEIGHT = 0.5 # Fair-share weight of speculative jobs relative to normal ones
+MAX_SPECULATIVE_RUNS = 2
+
+
+@dataclass
+class SpeculativeRun:
+    upload_hash: str
+    model_mode: str
+    futures: dict # Future -> position in the upload's LeadPlan.lead_rows
+    started_at: float = field(default_factory=time.time)
+
+    def completed(self) -> int:
+        return sum(1 for future in self.futures if future.done() and not future.cancelled())
+
+    def cancel_pending(self) -> int:
+        cancelled = sum(1 for future in self.futures if future.cancel())
+        if cancelled:
+            metrics.inc("speculative_jobs_cancelled_total", cancelled)
+        return cancelled
+
+
+def _submit(scheduler, user_id: str, qualify_fn, plan: LeadPlan, position: int, model_mode: str, weight: float = 1.0):
+    df_index, company_str, _ = plan.lead_rows[position]
+    prepared_description = plan.prepared_descriptions[position]
+    return (scheduler or get_scheduler()).submit(
+        user_id, qualify_fn,
+        company_str, prepared_description, f"lead_{df_index}",
+        mode=model_mode, cost_tokens=estimate_job_tokens(company_str, prepared_description), weight=weight
+    )
+
+
+def _runs(session_state) -> OrderedDict:
+    if "speculative_runs" not in session_state:
+        session_state["speculative_runs"] = OrderedDict() # (upload_hash, model_mode) -> SpeculativeRun
+    return session_state["speculative_runs"]
+
+
+def _analyzed(session_state) -> set:
+    if "speculative_analyzed" not in session_state:
+        session_state["speculative_analyzed"] = set() # (upload_hash, model_mode) pairs a full run consumed
+    return session_state["speculative_analyzed"]
+
+
+def start_speculation(session_state, user_id: str, qualify_fn, upload_hash: str, model_mode: str,
+                      plan_factory, max_rows: int = SPECULATIVE_MAX_ROWS, scheduler=None):
+    """
+    Starts (once per upload and model mode) speculative qualification of the first `max_rows` rows,
+    cancelling the unstarted jobs of any other upload's speculation. Safe to call on every rerun:
+    `plan_factory()` (returning the upload's LeadPlan) is only called when a new speculation starts.
+    Returns None when this upload was already analyzed in this mode. `scheduler` defaults to the
+    process-wide fair-share scheduler.
+    """
+    runs = _runs(session_state)
+    key = (upload_hash, model_mode)
+    for other_key, other in runs.items():
+        if other_key != key:
+            other.cancel_pending()
+    if key in _analyzed(session_state):
+        return None
+    run = runs.get(key)
+    if run is None:
+        plan = plan_factory()
+        futures = {
+            _submit(scheduler, user_id, qualify_fn, plan, position, model_mode, weight=SPECULATIVE_WEIGHT): position
+            for position in range(min(max_rows, len(plan.lead_rows)))
+        }
+        run = runs[key] = SpeculativeRun(upload_hash, model_mode, futures)
+        metrics.inc("speculative_jobs_submitted_total", len(futures))
+    runs.move_to_end(key)
+    while len(runs) > MAX_SPECULATIVE_RUNS:
+        runs.popitem(last=False)[1].cancel_pending()
+    return run
+
+
+def cancel_speculation(session_state):
+    """
+    Cancels every speculative job of the session that has not started (speculation turned off, the file
+    removed or failing validation).
+    """
+    for run in _runs(session_state).values():
+        run.cancel_pending()
+
+
+def attach_or_submit(session_state, user_id: str, qualify_fn, upload_hash: str, model_mode: str, plan: LeadPlan,
+                     scheduler=None):
+    """
+    Returns ({future: position}, reused) for a full analysis run. Reuses the speculative run for this
+    upload and mode if there is one (resubmitting any of its jobs that were cancelled) and submits the
+    remaining rows in `plan.processing_order`. `reused` counts speculative jobs that were attached.
+    """
+    _analyzed(session_state).add((upload_hash, model_mode))
+    run = _runs(session_state).pop((upload_hash, model_mode), None)
+    if run is None:
+        lead_futures = {}
+        reused = 0
+    else:
+        lead_futures = {future: position for future, position in run.futures.items() if not future.cancelled()}
+        reused = len(lead_futures)
+        metrics.inc("speculative_jobs_attached_total", reused)
+        metrics.inc("speculative_jobs_completed_before_click_total", run.completed())
+    covered = set(lead_futures.values())
+    for position in plan.processing_order:
+        if position not in covered:
+            lead_futures[_submit(scheduler, user_id, qualify_fn, plan, position, model_mode)] = position
+    return lead_futures, reused
@@ -1,13 +1,57 @@
 # test_agent.py
-from agent_logic import qualify_lead_with_ai, process_single_lead_with_agent
+from response_repair import STATUS_SCORE_BANDS, coerce_confidence, coerce_score, repair_response
 from dotenv import load_dotenv
+import json
 import os
 
 # Load environment variables for testing (e.g., GROQ_API_KEY)
 load_dotenv()
 
+# (raw model output, expected status, expected score, expected missing fields)
+REPAIR_CASES = [
+    ('{"qualified_status": "High Fit", "priority_score": 5, "reasoning": "Cloud AI vendor."}', "High Fit", 5, []),
+    ('Here you go: {"status": "high", "score": "4/5", "reasoning": "Mentions cloud.",}', "High Fit", 4, []),
+    ('{"qualified_status": "Medium Fit", "priority_score": 5, "reasoning": "Indirect alignment."}', "Medium Fit", 3, []),
+    ('{"qualified_status": "Not a fit", "priority_score": 0}', "Not Fit", 0, ["reasoning"]),
+    ('{"qualified_status": "Low Fit", "priority_score": NaN, "reasoning": "Small shop."}', "Low Fit", 1, []),
+    ('{"priority_score": Infinity, "reasoning": "Unclear."}', None, None, ["qualified_status", "priority_score"]),
+]
+
+
+def test_repair_cases():
+    for raw, status, score, missing in REPAIR_CASES:
+        repair = repair_response(raw)
+        assert repair.data.get("qualified_status") == status, raw
+        assert repair.data.get("priority_score") == score, raw
+        assert repair.missing == missing, raw
+
+
+def test_scores_are_clamped_into_status_bands():
+    for status, (low, high) in STATUS_SCORE_BANDS.items():
+        for score in range(-1, 7):
+            repair = repair_response(json.dumps({"qualified_status": status, "priority_score": score, "reasoning": "r"}))
+            assert repair.data["priority_score"] == max(low, min(high, score))
+            assert repair.repaired == (not low <= score <= high)
+
+
+def test_non_finite_numbers_are_unrecoverable():
+    for value in (float("nan"), float("inf"), float("-inf")):
+        assert coerce_score(value) is None
+        assert coerce_confidence(value) is None
+    assert coerce_score("4.6 out of 5") == 5
+    assert coerce_confidence("85%") == 0.85
+
+
 if __name__ == "__main__":
-    print("--- Testing AI Lead Qualification ---")
+    print("--- Testing Response Repair (offline) ---")
+    for raw, _, _, _ in REPAIR_CASES:
+        repair = repair_response(raw)
+        print(f"  {raw[:50]:<52} -> {repair.data.get('qualified_status')}/{repair.data.get('priority_score')}"
+              f" repaired={repair.repaired} missing={repair.missing}")
+
+    from agent_logic import qualify_lead_with_ai, process_single_lead_with_agent # Needs GROQ_API_KEY (or the mock backend)
+
+    print("\n--- Testing AI Lead Qualification ---")
     sample_leads = [
         {"company": "Quantum Innovations Inc.", "desc": "A startup developing cutting-edge AI software for enterprise data analysis, leveraging cloud infrastructure."},
         {"company": "GreenGrocer Co.", "desc": "Local organic food delivery service for residential customers in urban areas."},
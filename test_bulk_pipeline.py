@@ -0,0 +1,55 @@
+# test_bulk_pipeline.py
+
+import pandas as pd
+import pytest
+
+from bulk_pipeline import BulkImportPipeline, collect_sources
+
+
+def _write_leads(path, companies):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"Company Name": companies, "Description": [f"{c} description" for c in companies]}).to_csv(path, index=False)
+    return path
+
+
+def _qualify(company, description, lead_id):
+    return {"qualified_status": "Low Fit", "priority_score": 1, "reasoning": lead_id}
+
+
+def _run(sources, tmp_path, **kwargs):
+    output = tmp_path / "out.csv"
+    report = BulkImportPipeline(sources, str(output), _qualify, chunk_rows=2, queue_size=2, **kwargs).run()
+    return report, pd.read_csv(output)
+
+
+def test_same_named_files_get_distinct_lead_ids(tmp_path):
+    first = _write_leads(tmp_path / "east" / "leads.csv", ["A", "B", "C"])
+    second = _write_leads(tmp_path / "west" / "leads.csv", ["D", "E", "F"])
+    sources = collect_sources([str(first.parent), str(second.parent), str(first)])
+    assert [name for name, _ in sources] == ["east/leads.csv", "west/leads.csv", "east/leads.csv"]
+
+    report, output = _run(sources, tmp_path)
+    assert report["errors"] == [] and report["leads_written"] == 9
+    assert output["Lead ID"].is_unique
+    assert set(output["Source File"]) == {"east/leads.csv", "west/leads.csv", "east/leads#2.csv"}
+
+
+def test_uploads_with_one_name_get_distinct_lead_ids(tmp_path):
+    data = _write_leads(tmp_path / "leads.csv", ["A", "B", "C"]).read_bytes()
+    report, output = _run([("leads.csv", data), ("leads.csv", data)], tmp_path)
+    assert report["leads_written"] == 6
+    assert sorted(output["Lead ID"]) == sorted(f"{name}:{row}" for name in ("leads.csv", "leads#2.csv") for row in range(3))
+
+
+@pytest.mark.parametrize("file_name", ["leads.csv", "leads.xlsx"])
+def test_lead_ids_follow_file_rows_across_chunks(tmp_path, file_name):
+    companies = [f"Company {i}" for i in range(7)]
+    path = tmp_path / file_name
+    if file_name.endswith(".csv"):
+        _write_leads(path, companies)
+    else:
+        pd.DataFrame({"Company Name": companies, "Description": companies}).to_excel(path, index=False)
+    report, output = _run(collect_sources([str(path)]), tmp_path, qualify_workers=3)
+    rows = dict(zip(output["Lead ID"], output["Original Company Name"]))
+    assert rows == {f"{file_name}:{i}": f"Company {i}" for i in range(7)}
+    assert report["stages"][-1]["items"] == 7
@@ -0,0 +1,86 @@
+# test_cascade.py
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import agent_logic
+import mock_llm
+from agent_logic import FAST_MODEL, QUALITY_MODEL, _escalation_reason, qualify_lead_cascade, qualify_lead_with_ai
+
+CONFIDENT_LEAD = ("Acme", "AI cloud data platform for enterprise software and SaaS infrastructure.")
+VAGUE_LEAD = ("Acme", "A company that does things.")
+
+
+@pytest.fixture(autouse=True)
+def instant_mock(monkeypatch):
+    assert agent_logic.LLM_BACKEND == "mock" # conftest.py selects it
+    monkeypatch.setattr(mock_llm, "MOCK_LATENCY_MS", 0)
+    monkeypatch.setattr(mock_llm, "MOCK_JITTER_MS", 0)
+
+
+def _fail_model(monkeypatch, failing_model):
+    create = agent_logic._groq_client.chat.completions.create
+
+    def flaky_create(messages, model, **kwargs):
+        if model == failing_model:
+            raise ConnectionError("upstream unavailable")
+        return create(messages, model, **kwargs)
+
+    monkeypatch.setattr(agent_logic._groq_client.chat.completions, "create", flaky_create)
+
+
+def _reply_once(monkeypatch, content):
+    """The first call answers with `content`; the follow-up call fails."""
+    replies = [content]
+
+    def create(messages, model, **kwargs):
+        if not replies:
+            raise ConnectionError("upstream unavailable")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=replies.pop()))], usage=None)
+
+    monkeypatch.setattr(agent_logic._groq_client.chat.completions, "create", create)
+
+
+@pytest.mark.parametrize("result, precheck, reason", [
+    ({"qualified_status": "Error"}, "High Fit", "error"),
+    ({"qualified_status": "Medium Fit", "confidence": 0.9}, "Medium Fit", "medium_fit"),
+    ({"qualified_status": "High Fit", "confidence": 0.9}, "Not Fit", "precheck_disagreement"),
+    ({"qualified_status": "High Fit", "confidence": 0.3}, "High Fit", "low_confidence"),
+    ({"qualified_status": "High Fit", "confidence": 0.9}, "High Fit", None),
+    ({"qualified_status": "Low Fit", "confidence": None}, "Not Fit", None),
+])
+def test_escalation_reason(result, precheck, reason):
+    assert _escalation_reason(result, {"status": precheck}) == reason
+
+
+def test_confident_leads_stay_on_the_small_model():
+    result = qualify_lead_cascade(*CONFIDENT_LEAD)
+    assert (result["qualified_status"], result["model_tier"], result["escalation_reason"]) == ("High Fit", "fast", None)
+
+
+def test_uncertain_leads_are_escalated():
+    result = qualify_lead_cascade(*VAGUE_LEAD)
+    assert (result["model_tier"], result["escalation_reason"]) == ("escalated", "low_confidence")
+    assert QUALITY_MODEL in result["reasoning"]
+
+
+def test_failed_escalation_keeps_the_small_model_result(monkeypatch):
+    _fail_model(monkeypatch, QUALITY_MODEL)
+    result = qualify_lead_cascade(*VAGUE_LEAD)
+    assert result["qualified_status"] == "Low Fit"
+    assert result["model_tier"] == "fast" and result["escalation_reason"] == "low_confidence"
+    assert FAST_MODEL in result["reasoning"] and "re-check failed" in result["reasoning"]
+
+
+def test_failed_field_retry_keeps_the_repaired_result(monkeypatch):
+    _reply_once(monkeypatch, json.dumps({"qualified_status": "High Fit", "priority_score": 5}))
+    result = qualify_lead_with_ai(*CONFIDENT_LEAD)
+    assert (result["qualified_status"], result["priority_score"]) == ("High Fit", 5)
+    assert "repaired response kept" in result["reasoning"]
+
+
+def test_unusable_response_with_failed_retry_is_an_error(monkeypatch):
+    _reply_once(monkeypatch, '{"reasoning": "no status"}')
+    assert qualify_lead_with_ai(*CONFIDENT_LEAD)["qualified_status"] == "Error"
@@ -0,0 +1,53 @@
+# test_crm_export.py
+
+import itertools
+
+import pandas as pd
+
+import crm_export
+from crm_export import CRMExporter, LocalCRMReceiver, records_from_dataframe, run_namespace
+
+PROCESSED = pd.DataFrame([
+    {"Lead ID": "lead_7", "Original Company Name": "Acme", "Original Description": "Cloud AI",
+     "Qualified Status": "Low Fit", "Priority Score": 1, "Reasoning": "r"},
+    {"Lead ID": "lead_2", "Original Company Name": "Globex", "Original Description": "Data platform",
+     "Qualified Status": "High Fit", "Priority Score": 5, "Reasoning": "r"},
+])
+
+
+def test_records_keep_the_analysis_lead_ids():
+    records = records_from_dataframe(PROCESSED, run_namespace("upload", "run-1"))
+    assert [record["lead_id"] for record in records] == ["lead_7", "lead_2"]
+
+
+def test_runs_of_one_upload_get_different_keys():
+    first = records_from_dataframe(PROCESSED, run_namespace("upload", "run-1"))
+    again = records_from_dataframe(PROCESSED, run_namespace("upload", "run-1"))
+    rerun = records_from_dataframe(PROCESSED, run_namespace("upload", "run-2"))
+    assert [r["idempotency_key"] for r in first] == [r["idempotency_key"] for r in again]
+    assert not {r["idempotency_key"] for r in first} & {r["idempotency_key"] for r in rerun}
+
+
+def test_batches_are_retried_without_duplicates(monkeypatch):
+    monkeypatch.setattr(crm_export, "CRM_BACKOFF_BASE_SECONDS", 0.001)
+    draws = itertools.cycle([0.0, 1.0, 1.0]) # Every third request is rejected with a 503
+    monkeypatch.setattr(crm_export.random, "random", lambda: next(draws))
+    receiver = LocalCRMReceiver(failure_rate=0.5).start()
+    try:
+        records = [
+            {"lead_id": f"lead_{i}", "idempotency_key": crm_export.idempotency_key(f"lead_{i}", "test"),
+             "qualified_status": "High Fit" if i % 10 == 0 else "Low Fit", "priority_score": 1}
+            for i in range(250)
+        ]
+        report = CRMExporter(receiver.url, batch_size=20, connections=3, max_retries=20).export(records)
+    finally:
+        receiver.stop()
+    assert report.leads_sent == 250 and report.leads_failed == 0
+    assert report.batches == 13
+    assert report.retries > 0
+    assert len(receiver.leads) == 250
+
+
+def test_high_fit_leads_are_sent_first():
+    records = records_from_dataframe(PROCESSED, "ns")
+    assert [record["lead_id"] for record in crm_export.prioritize_records(records)] == ["lead_2", "lead_7"]
@@ -0,0 +1,175 @@
+# test_fair_scheduler.py
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from fair_scheduler import FairShareScheduler, PassthroughScheduler, iter_completed
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def _make(**kwargs):
+        scheduler = FairShareScheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield _make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def _block_worker(scheduler):
+    """Occupies the scheduler's only worker until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+
+    def gate():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("gate", gate)
+    assert started.wait(5)
+    return release
+
+
+def test_small_job_is_interleaved_ahead_of_large_backlog(make_scheduler):
+    scheduler = make_scheduler(workers=1, user_concurrency=8, user_tokens_per_minute=10**9)
+    release = _block_worker(scheduler)
+    order = []
+    futures = [scheduler.submit("bulk", order.append, f"bulk-{i}", cost_tokens=100) for i in range(20)]
+    futures += [scheduler.submit("small", order.append, f"small-{i}", cost_tokens=100) for i in range(2)]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    small_positions = [order.index(f"small-{i}") for i in range(2)]
+    assert max(small_positions) < 5, order
+    assert [label for label in order if label.startswith("bulk")] == [f"bulk-{i}" for i in range(20)]
+
+
+def test_weight_scales_share(make_scheduler):
+    scheduler = make_scheduler(workers=1, user_concurrency=8, user_tokens_per_minute=10**9)
+    release = _block_worker(scheduler)
+    order = []
+    futures = [scheduler.submit("light", order.append, "light", cost_tokens=100, weight=0.5) for _ in range(10)]
+    futures += [scheduler.submit("heavy", order.append, "heavy", cost_tokens=100) for _ in range(10)]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    # Over the first 9 jobs, the full-weight user should get about twice the share
+    assert order[:9].count("heavy") >= 5, order
+
+
+def test_token_bucket_limits_user_without_blocking_others(make_scheduler):
+    # 1200 tokens/minute = 20 tokens/s: 12 jobs of 100 tokens drain the bucket, the 13th waits ~5 s
+    scheduler = make_scheduler(workers=4, user_concurrency=4, user_tokens_per_minute=1200)
+    limited = [scheduler.submit("limited", lambda: None, cost_tokens=100) for _ in range(13)]
+    for future in limited[:12]:
+        future.result(timeout=5)
+    other = scheduler.submit("other", lambda: "ok", cost_tokens=100)
+    assert other.result(timeout=5) == "ok"
+    time.sleep(0.5)
+    assert not limited[12].done()
+    assert scheduler.queue_position("limited")["queued"] == 1
+
+
+def test_user_concurrency_limit(make_scheduler):
+    scheduler = make_scheduler(workers=8, user_concurrency=2, user_tokens_per_minute=10**9)
+    running, peak, lock = 0, 0, threading.Lock()
+
+    def job():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    for future in [scheduler.submit("user", job) for _ in range(10)]:
+        future.result(timeout=5)
+    assert peak == 2
+
+
+def test_iter_completed_cancels_unstarted_jobs_on_exit(make_scheduler):
+    scheduler = make_scheduler(workers=1, user_concurrency=8, user_tokens_per_minute=10**9)
+    release = _block_worker(scheduler)
+    ran = []
+
+    def job(i):
+        ran.append(i)
+        time.sleep(0.05)
+
+    futures = {scheduler.submit("user", job, i): i for i in range(5)}
+    threading.Timer(0.05, release.set).start()
+    completed = iter_completed(futures, poll_interval=0.01)
+    first_key, _ = next(completed)
+    completed.close() # What a Streamlit rerun does to the consuming loop
+    cancelled = [key for future, key in futures.items() if future.cancelled()]
+    assert first_key not in cancelled
+    assert len(cancelled) >= 3
+    time.sleep(0.2)
+    assert len(ran) + len(cancelled) == 5
+    assert not set(ran) & set(cancelled)
+
+
+def test_iter_completed_heartbeat_and_results():
+    futures = {Future(): i for i in range(3)}
+    heartbeats = []
+
+    def on_wait():
+        heartbeats.append(1)
+        if len(heartbeats) == 2:
+            for future, key in futures.items():
+                future.set_result(key * 10)
+
+    results = dict(iter_completed(futures, on_wait=on_wait, poll_interval=0.01))
+    assert results == {0: 0, 1: 10, 2: 20}
+    assert len(heartbeats) == 2
+
+
+def test_iter_completed_scales_linearly():
+    futures = {Future(): i for i in range(50_000)}
+    for future, key in futures.items():
+        future.set_result(key)
+    started = time.process_time()
+    assert sum(1 for _ in iter_completed(futures)) == 50_000
+    assert time.process_time() - started < 5
+
+
+def test_running_threads_reports_only_the_users_workers(make_scheduler):
+    scheduler = make_scheduler(workers=3, user_concurrency=2, user_tokens_per_minute=10**9)
+    release, started = threading.Event(), threading.Semaphore(0)
+
+    def job():
+        started.release()
+        release.wait(5)
+        return threading.get_ident()
+
+    mine = [scheduler.submit("me", job) for _ in range(2)]
+    other = scheduler.submit("other", job)
+    for _ in range(3):
+        assert started.acquire(timeout=5)
+    my_threads = scheduler.running_threads("me")
+    release.set()
+    assert {future.result(timeout=5) for future in mine} == my_threads
+    assert other.result(timeout=5) not in my_threads
+    scheduler.shutdown()
+    assert scheduler.running_threads("me") == set()
+
+
+def test_passthrough_keeps_other_users_out_of_a_large_backlog():
+    scheduler = PassthroughScheduler(workers=4, user_concurrency=2)
+    try:
+        backlog = [scheduler.submit("bulk", time.sleep, 0.1) for _ in range(40)]
+        started = time.monotonic()
+        scheduler.submit("small", time.sleep, 0.1).result(timeout=5)
+        assert time.monotonic() - started < 0.5
+        assert scheduler.queue_position("bulk")["queued"] > 30
+        for future in backlog:
+            future.result(timeout=10)
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,48 @@
+# test_load_test_app.py
+
+import pytest
+
+from load_test_app import _percentile, capacity_report
+
+
+def _level(sessions, cpu_cores_used, rerun_p95_ms=100.0, rss_per_session_mb=50.0, rss_base_mb=300.0, completed=None):
+    return {"sessions": sessions, "completed": sessions if completed is None else completed,
+            "cpu_cores_used": cpu_cores_used, "rerun_p95_ms": rerun_p95_ms,
+            "rss_per_session_mb": rss_per_session_mb, "rss_base_mb": rss_base_mb}
+
+
+def test_percentile_picks_the_nearest_rank():
+    samples = list(range(1, 101))
+    assert _percentile(samples, 50) == 51
+    assert _percentile(samples, 95) == 95
+    assert _percentile([], 95) == 0.0
+
+
+def test_cpu_capacity_is_extrapolated_when_every_level_is_under_target():
+    report = capacity_report([_level(1, 0.1), _level(4, 0.35)], cpus=2, memory_gb=16, max_p95_ms=1000)
+    assert report["cpu_bound_active_sessions"] == pytest.approx(4 * 0.7 / 0.35 * 2)
+    assert report["limiting_factor"] == "cpu"
+    assert report["estimated_concurrent_analyses"] == 16
+
+
+def test_cpu_capacity_uses_the_largest_level_under_target():
+    report = capacity_report([_level(1, 0.2), _level(4, 0.6), _level(8, 0.95)], cpus=1, memory_gb=16, max_p95_ms=1000)
+    assert report["cpu_bound_active_sessions"] == 4
+
+
+def test_memory_can_be_the_limit():
+    report = capacity_report([_level(4, 0.1, rss_per_session_mb=500.0)], cpus=2, memory_gb=2, max_p95_ms=1000)
+    assert report["memory_bound_sessions"] == int((2 * 1024 * 0.8 - 300 * 2) / 500)
+    assert report["limiting_factor"] == "memory"
+
+
+def test_latency_caps_at_the_last_level_within_target():
+    levels = [_level(1, 0.1, rerun_p95_ms=200.0), _level(4, 0.3, rerun_p95_ms=800.0), _level(8, 0.5, rerun_p95_ms=3000.0)]
+    report = capacity_report(levels, cpus=2, memory_gb=64, max_p95_ms=1000)
+    assert report["max_tested_sessions_within_latency"] == 4
+    assert report["limiting_factor"] == "latency"
+    assert report["estimated_concurrent_analyses"] == 8
+
+
+def test_no_completed_sessions_is_reported():
+    assert "error" in capacity_report([_level(4, 0.0, completed=0)], cpus=2, memory_gb=4, max_p95_ms=1000)
@@ -0,0 +1,36 @@
+# test_metrics.py
+
+import threading
+from types import SimpleNamespace
+
+from metrics import MetricsRegistry, collected_by, estimate_cost
+
+
+def _llm_call(registry, tokens):
+    usage = SimpleNamespace(prompt_tokens=tokens, completion_tokens=tokens, queue_time=0.0)
+    registry.record_llm_call("llama3-8b-8192", 0.1, usage)
+
+
+def test_session_registry_only_sees_its_own_calls():
+    process, mine, theirs = MetricsRegistry(), MetricsRegistry(), MetricsRegistry()
+    jobs = [threading.Thread(target=collected_by(mine, _llm_call), args=(process, 100)),
+            threading.Thread(target=collected_by(theirs, _llm_call), args=(process, 300)),
+            threading.Thread(target=_llm_call, args=(process, 50))]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    assert process.snapshot()["derived"]["prompt_tokens"] == 450
+    assert mine.snapshot()["derived"]["prompt_tokens"] == 100
+    assert theirs.snapshot()["derived"]["completion_tokens"] == 300
+    assert mine.snapshot()["derived"]["estimated_cost_usd"] == round(estimate_cost("llama3-8b-8192", 100, 100), 6)
+    assert mine.histogram("llm_request_seconds", {"model": "llama3-8b-8192"}).count == 1
+
+
+def test_collection_stops_after_the_block():
+    process, session = MetricsRegistry(), MetricsRegistry()
+    with session.collecting():
+        process.inc("llm_requests_total")
+    process.inc("llm_requests_total")
+    assert process.counter("llm_requests_total") == 2
+    assert session.counter("llm_requests_total") == 1
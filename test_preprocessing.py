@@ -0,0 +1,48 @@
+# test_preprocessing.py
+
+import pytest
+
+from preprocessing import count_tokens, prepare_descriptions, truncate_description
+from prompts import build_messages
+
+
+def test_short_descriptions_are_unchanged():
+    text = "Cloud security software for banks. Offices in Berlin."
+    assert truncate_description(text, 50) == text
+
+
+def test_oversized_sentence_is_cut_to_fill_the_budget():
+    trimmed = truncate_description("Hello world. " + "word " * 5000, 50)
+    assert trimmed.startswith("Hello world. word word")
+    assert 45 <= count_tokens(trimmed) <= 50
+
+
+def test_signal_sentences_are_kept_before_filler():
+    text = ("Acme builds tools. We love our team and our dogs. "
+            "Our cloud data platform serves enterprise customers. We were founded long ago.")
+    trimmed = truncate_description(text, count_tokens(" Acme builds tools. Our cloud data platform serves enterprise customers."))
+    assert trimmed.startswith("Acme builds tools. ")
+    assert "Our cloud data platform serves enterprise customers." in trimmed
+
+
+@pytest.mark.parametrize("budget", [5, 20, 64, 256])
+@pytest.mark.parametrize("text", [
+    "First sentence here. " + "Cloud AI platform for enterprise data. " * 40,
+    "x" * 30_000,
+    "One. " + "averyveryverylongwordwithoutspaces " * 300,
+    "No punctuation at all " * 500,
+])
+def test_output_never_exceeds_the_budget(text, budget):
+    assert count_tokens(truncate_description(text, budget)) <= budget
+
+
+def test_prepare_descriptions_reports_shortened_rows():
+    prepared, shortened = prepare_descriptions(["Short one.", "Long. " + "word " * 1000], max_tokens=20)
+    assert prepared[0] == "Short one."
+    assert [entry["row"] for entry in shortened] == [1]
+    assert shortened[0]["kept_tokens"] <= 20 < shortened[0]["original_tokens"]
+
+
+def test_build_messages_does_not_truncate_again():
+    description = "word " * 2000
+    assert build_messages("Acme", description)[-1]["content"].endswith(description)
@@ -0,0 +1,42 @@
+# test_prioritization.py
+
+import numpy as np
+import pandas as pd
+
+from prioritization import TopLeadsTracker, build_lead_plan, partial_export_interval
+from prescore import prescore_lead
+
+LEADS = pd.DataFrame({
+    "Company Name": ["Corner Bakery", "Globex", "Acme", "Initech", None],
+    "Description": ["Family-owned neighborhood bakery.", "Some consulting.",
+                    "Enterprise AI and cloud data platform (SaaS).", "Some consulting.", np.nan],
+}, index=[10, 11, 12, 13, 14])
+
+
+def test_likely_high_fit_leads_are_planned_first():
+    plan = build_lead_plan(LEADS)
+    assert [plan.lead_rows[pos][1] for pos in plan.processing_order[:1]] == ["Acme"]
+    assert plan.lead_rows[plan.processing_order[-1]][1] == "Corner Bakery"
+    # Equal pre-scores keep file order
+    assert plan.processing_order.index(1) < plan.processing_order.index(3)
+    assert plan.prescores[2] == prescore_lead("Acme", LEADS.loc[12, "Description"])["score"]
+
+
+def test_file_order_without_priority_first():
+    plan = build_lead_plan(LEADS, priority_first=False)
+    assert plan.processing_order == [0, 1, 2, 3, 4]
+    assert [df_index for df_index, _, _ in plan.lead_rows] == [10, 11, 12, 13, 14]
+    assert plan.lead_rows[4][1:] == ("", "") # Missing cells become empty strings
+
+
+def test_top_leads_keeps_the_best_rows():
+    tracker = TopLeadsTracker(size=2)
+    for position, score in enumerate([3, 5, 1, 5, 4]):
+        tracker.add(position, prescore=float(-position), row={"Original Company Name": f"C{position}", "Priority Score": score})
+    top = tracker.to_dataframe()
+    assert top["Original Company Name"].tolist() == ["C1", "C3"] # Ties go to the higher pre-score
+
+
+def test_partial_export_interval_scales_with_the_run():
+    assert partial_export_interval(20) == 10
+    assert partial_export_interval(50_000) == 1000
@@ -0,0 +1,75 @@
+# test_profile_cache.py
+
+import os
+import time
+
+import pytest
+
+from profile_cache import ProfileCache
+
+
+class _Loader:
+    """Counts Firestore reads and hands out a fresh profile each time."""
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"past_interactions": [], "version": self.calls}
+
+
+class _Watch:
+    def __init__(self):
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+
+
+class _DocRef:
+    def __init__(self):
+        self.watches = []
+
+    def on_snapshot(self, callback):
+        self.watches.append(_Watch())
+        return self.watches[-1]
+
+
+def test_hits_are_served_from_memory_until_the_ttl():
+    cache, load = ProfileCache(ttl=0.05, max_entries=8, listen=False), _Loader()
+    assert cache.get("u1", load)["version"] == 1
+    assert cache.get("u1", load)["version"] == 1
+    assert load.calls == 1
+    time.sleep(0.06)
+    assert cache.get("u1", load)["version"] == 2
+
+
+def test_lru_eviction_unsubscribes_the_listener():
+    cache, load = ProfileCache(ttl=60, max_entries=2, listen=True), _Loader()
+    doc_refs = {user: _DocRef() for user in ("u1", "u2", "u3")}
+    cache.get("u1", load, doc_refs["u1"])
+    cache.get("u2", load, doc_refs["u2"])
+    cache.get("u1", load, doc_refs["u1"]) # u1 is now the most recently used
+    cache.get("u3", load, doc_refs["u3"])
+    assert len(cache) == 2
+    assert doc_refs["u2"].watches[0].unsubscribed
+    assert not doc_refs["u1"].watches[0].unsubscribed
+    cache.get("u1", load)
+    assert load.calls == 3
+
+
+def test_sessions_get_their_own_copy():
+    cache, load = ProfileCache(ttl=60, max_entries=8, listen=False), _Loader()
+    mine = cache.get("u1", load)
+    mine["past_interactions"].append({"lead_id": "lead_0"})
+    assert cache.get("u1", load)["past_interactions"] == []
+    cache.put("u1", mine)
+    mine["past_interactions"].append({"lead_id": "lead_1"})
+    assert len(cache.get("u1", load)["past_interactions"]) == 1
+
+
+@pytest.mark.skipif("LUMINOVA_PROFILE_CACHE_LISTEN" in os.environ, reason="listener configured explicitly")
+def test_listener_is_off_by_default():
+    doc_ref = _DocRef()
+    ProfileCache().get("u1", _Loader(), doc_ref)
+    assert doc_ref.watches == []
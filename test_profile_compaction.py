@@ -0,0 +1,57 @@
+# test_profile_compaction.py
+
+import profile_compaction
+from profile_compaction import (LocalProfileArchive, compact_profile, needs_compaction,
+                                profile_total_interactions)
+
+
+def _profile(count):
+    return {"past_interactions": [
+        {"timestamp": f"2024-{1 + i // 10:02d}-01T00:00:{i % 60:02d}", "company": f"Company {i % 3}",
+         "analysis": {"qualified_status": "High Fit" if i % 2 else "Low Fit", "priority_score": i % 5}}
+        for i in range(count)
+    ]}
+
+
+class _BrokenArchive:
+    def write(self, user_id, batch_id, payload):
+        raise OSError("disk full")
+
+
+def test_compaction_waits_for_the_slack():
+    assert not needs_compaction(_profile(25), raw_window=10, slack=15)
+    assert needs_compaction(_profile(26), raw_window=10, slack=15)
+
+
+def test_old_interactions_are_archived_and_rolled_up(tmp_path):
+    profile, archive = _profile(30), LocalProfileArchive(str(tmp_path))
+    original = list(profile["past_interactions"])
+    assert compact_profile("u1", profile, archive, raw_window=10) == 20
+    assert profile["past_interactions"] == original[20:]
+    assert list(archive.read_all("u1")) == original[:20]
+    assert sum(rollup["interactions"] for rollup in profile["rollups"].values()) == 20
+    assert set(profile["rollups"]) == {"2024-01", "2024-02"}
+    assert profile["rollups"]["2024-01"]["status_counts"] == {"Low Fit": 5, "High Fit": 5}
+    assert profile_total_interactions(profile) == 30
+
+
+def test_archive_batches_are_written_separately(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_compaction, "ARCHIVE_BATCH_SIZE", 7)
+    profile, archive = _profile(30), LocalProfileArchive(str(tmp_path))
+    compact_profile("u1", profile, archive, raw_window=10)
+    assert len(list((tmp_path / "u1").glob("*.json.gz"))) == 3
+    assert len(list(archive.read_all("u1"))) == 20
+
+
+def test_failed_archive_write_leaves_the_profile_untouched():
+    profile = _profile(30)
+    original = list(profile["past_interactions"])
+    assert compact_profile("u1", profile, _BrokenArchive(), raw_window=10) == 0
+    assert profile["past_interactions"] == original
+    assert "rollups" not in profile
+
+
+def test_small_profiles_are_not_compacted(tmp_path):
+    profile = _profile(5)
+    assert compact_profile("u1", profile, LocalProfileArchive(str(tmp_path)), raw_window=10) == 0
+    assert not (tmp_path / "u1").exists()
@@ -0,0 +1,34 @@
+# test_prompts.py
+
+from prompts import (
+    PROMPT_VERSION, SYSTEM_PROMPTS, build_field_retry_messages, build_messages, count_message_tokens, prompt_token_report
+)
+
+LEADS = [
+    ("Quantum Innovations Inc.", "A startup developing AI software for enterprise data analysis on cloud infrastructure."),
+    ("GreenGrocer Co.", "Local organic food delivery service for residential customers."),
+]
+
+
+def test_system_prompt_is_identical_for_every_lead():
+    first, second = (build_messages(company, description) for company, description in LEADS)
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPTS[PROMPT_VERSION]}
+    assert first[1]["content"] == f"Company Name: {LEADS[0][0]}\nCompany Description: {LEADS[0][1]}"
+
+
+def test_current_prompt_is_much_smaller_than_the_legacy_layout():
+    report = prompt_token_report(LEADS)
+    assert report["v1"]["leads"] == report[PROMPT_VERSION]["leads"] == 2
+    per_lead_v1 = count_message_tokens(build_messages(*LEADS[0], version="v1")[1:])
+    per_lead_current = count_message_tokens(build_messages(*LEADS[0])[1:])
+    assert per_lead_current * 5 < per_lead_v1 # The rubric is no longer re-sent in every user message
+    assert report["saving_pct"] > 0
+
+
+def test_field_retry_asks_only_for_the_missing_fields():
+    messages = build_messages(*LEADS[0])
+    retry = build_field_retry_messages(messages, '{"qualified_status": "High Fit"}', ["priority_score", "reasoning"])
+    assert retry[:2] == messages
+    assert retry[2] == {"role": "assistant", "content": '{"qualified_status": "High Fit"}'}
+    assert '"priority_score", "reasoning"' in retry[3]["content"]
+    assert "qualified_status" not in retry[3]["content"]
@@ -0,0 +1,78 @@
+# test_qualification_service.py
+
+import socket
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import mock_llm
+from qualification_service import QualificationClient, SingleFlight, run_server
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(mock_llm, "MOCK_LATENCY_MS", 0)
+    monkeypatch.setattr(mock_llm, "MOCK_JITTER_MS", 0)
+    server = run_server("127.0.0.1", 0)
+    yield QualificationClient(f"http://127.0.0.1:{server.server_address[1]}", user_id="tester")
+    server.shutdown()
+    server.server_close()
+
+
+def _unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_identical_inflight_calls_share_one_future():
+    single_flight, submitted = SingleFlight(), []
+
+    def submit():
+        submitted.append(Future())
+        return submitted[-1]
+
+    first, second = single_flight.do("key", submit), single_flight.do("key", submit)
+    assert first is second and len(submitted) == 1
+    first.set_result("done")
+    assert single_flight.do("key", submit) is not first # Released once complete
+
+
+def test_single_lead_round_trip(client):
+    result = client.process_single_lead_with_agent(
+        "Acme", "AI cloud data platform for enterprise software and SaaS.", "lead_1", "fast"
+    )
+    assert result["qualified_status"] == "High Fit" and "lead_id" not in result
+
+
+def test_bulk_streams_every_lead_and_reports_bad_lines(client):
+    leads = [{"company_name": "Acme", "description": "Cloud AI", "lead_id": "a"},
+             {"company_name": "Acme", "description": "Cloud AI", "lead_id": "b"}, # Coalesced with "a"
+             {"company_name": "", "lead_id": "c"}]
+    results = list(client.qualify_bulk(leads))
+    assert sorted(r["lead_id"] for r in results if "lead_id" in r) == ["a", "b"]
+    assert [r["line"] for r in results if "error" in r] == [2]
+
+
+def test_unreachable_service_becomes_an_error_row():
+    client = QualificationClient(f"http://127.0.0.1:{_unused_port()}", timeout=2)
+    result = client.process_single_lead_with_agent("Acme", "Cloud AI", "lead_1", user_id="tester")
+    assert result["qualified_status"] == "Error" and result["priority_score"] == 0
+
+
+def test_rejected_lead_becomes_an_error_row(client):
+    result = client.process_single_lead_with_agent("", "No company name", "lead_1")
+    assert result["qualified_status"] == "Error" and "400" in result["reasoning"]
+
+
+def test_client_is_shared_across_threads(client):
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(
+        client.process_single_lead_with_agent(f"Company {i}", "Cloud AI", f"lead_{i}", user_id=f"user-{i % 2}")
+    )) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 6 and all(r["qualified_status"] != "Error" for r in results)
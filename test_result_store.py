@@ -0,0 +1,45 @@
+# test_result_store.py
+
+import time
+
+import pandas as pd
+
+from result_store import ResultStore
+from session_memory import SessionMemory
+
+
+def _frame(rows=3):
+    return pd.DataFrame({"Original Company Name": [f"Company {i}" for i in range(rows)], "Priority Score": range(rows)})
+
+
+def _store(tmp_path, **kwargs):
+    return ResultStore(memory=SessionMemory(budget_bytes=10**8, spill_root=str(tmp_path)), **kwargs)
+
+
+def test_latest_run_survives_reruns(tmp_path):
+    store = _store(tmp_path)
+    store.put("upload", "run-1", _frame(), "fast")
+    time.sleep(0.01)
+    store.put("upload", "run-2", _frame(5), "cascade")
+    run = store.latest("upload")
+    assert (run.run_id, run.model_mode, len(run.processed_df)) == ("run-2", "cascade", 5)
+    assert run.csv_bytes.decode("utf-8").startswith("Original Company Name,Priority Score")
+    assert store.latest("other-upload") is None
+
+
+def test_least_recently_viewed_run_is_evicted(tmp_path):
+    store = _store(tmp_path, max_runs=2)
+    for run_id in ("a", "b"):
+        store.put("upload", run_id, _frame(), "fast")
+    store.get("upload", "a") # "b" is now the least recently viewed
+    store.put("upload", "c", _frame(), "fast")
+    assert store.get("upload", "b") is None
+    assert store.get("upload", "a") is not None and len(store) == 2
+    assert "run_b_df" not in store.memory
+
+
+def test_stale_runs_expire(tmp_path):
+    store = _store(tmp_path, ttl_seconds=0.05)
+    store.put("upload", "old", _frame(), "fast")
+    time.sleep(0.06)
+    assert store.latest("upload") is None and len(store) == 0
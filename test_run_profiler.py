@@ -0,0 +1,82 @@
+# test_run_profiler.py
+
+import threading
+import time
+
+from run_profiler import RunProfiler, SamplingProfiler
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _other_session_busy(stop):
+    while not stop.is_set():
+        _busy(0.001)
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = RunProfiler(enabled=False).start()
+    with profiler.stage("parse"):
+        pass
+    assert list(profiler.timed_iter([1, 2], "wait")) == [1, 2]
+    profiler.stop()
+    assert profiler.sampler is None and not profiler.stage_seconds
+    assert profiler.summary()["samples"] == 0
+
+
+def test_stages_accumulate_wall_time():
+    profiler = RunProfiler(enabled=True, interval_ms=5).start()
+    for _ in range(2):
+        with profiler.stage("parse"):
+            time.sleep(0.01)
+    profiler.stop()
+    assert profiler.stage_calls["parse"] == 2
+    assert profiler.stage_seconds["parse"] >= 0.02
+    assert profiler.stage_table()["Stage"].tolist() == ["parse"]
+
+
+def test_timed_iter_charges_waits_between_items():
+    def slow_results():
+        for item in range(3):
+            time.sleep(0.01)
+            yield item
+
+    profiler = RunProfiler(enabled=True, interval_ms=5)
+    assert list(profiler.timed_iter(slow_results(), "waiting_on_model")) == [0, 1, 2]
+    assert profiler.stage_calls["waiting_on_model"] == 4 # Three items plus the exhausted call
+    assert profiler.stage_seconds["waiting_on_model"] >= 0.03
+
+
+def test_sampler_skips_threads_of_other_sessions():
+    stop = threading.Event()
+    other = threading.Thread(target=_other_session_busy, args=(stop,), name="other-session")
+    other.start()
+    try:
+        profiler = RunProfiler(enabled=True, interval_ms=2).start()
+        _busy(0.1)
+        profiler.stop()
+    finally:
+        stop.set()
+        other.join()
+    collapsed = profiler.sampler.collapsed()
+    assert profiler.sampler.samples > 0
+    assert "_busy" in collapsed and "other-session" not in collapsed
+
+
+def test_worker_threads_are_sampled_when_reported():
+    stop = threading.Event()
+    worker = threading.Thread(target=_other_session_busy, args=(stop,), name="luminova-worker-3")
+    worker.start()
+    try:
+        sampler = SamplingProfiler(interval_ms=2, thread_ids=lambda: {worker.ident}).start()
+        time.sleep(0.1)
+        sampler.stop()
+    finally:
+        stop.set()
+        worker.join()
+    stacks = sampler.collapsed().splitlines()
+    assert stacks and all(stack.startswith("luminova-worker;") for stack in stacks)
+    assert "test_run_profiler.py:_busy" in sampler.top_functions()["Function"].tolist()
@@ -0,0 +1,74 @@
+# test_session_memory.py
+
+import threading
+
+import pandas as pd
+import pytest
+
+from session_memory import SessionMemory
+
+
+@pytest.fixture
+def memory(tmp_path):
+    session = SessionMemory("test", budget_bytes=100_000, spill_root=str(tmp_path))
+    yield session
+    session.close()
+
+
+def _frame(rows):
+    return pd.DataFrame({"Company": [f"Company {i}" for i in range(rows)], "Score": range(rows)})
+
+
+def test_least_recently_used_objects_spill_over_budget(memory):
+    memory.put("old", _frame(500))
+    memory.put("csv", b"x" * 40_000)
+    memory.get("old") # "csv" is now the least recently used
+    memory.put("new", _frame(500))
+    assert memory.memory_bytes() <= memory.budget_bytes
+    report = memory.report().set_index("Object")
+    assert report.loc["csv", "Location"] == "disk" and report.loc["new", "Location"] == "memory"
+    assert memory.get("csv") == b"x" * 40_000 # Read back from its spill file
+
+
+def test_spilled_frames_read_back_unchanged(memory):
+    frame = _frame(500)
+    memory.put("frame", frame)
+    assert memory.spill_all() > 0
+    assert memory.memory_bytes() == 0 and memory.disk_bytes() > 0
+    pd.testing.assert_frame_equal(memory.get("frame"), frame)
+
+
+def test_an_object_larger_than_the_budget_goes_straight_to_disk(memory):
+    memory.put("huge", b"y" * 200_000)
+    assert memory.memory_bytes() == 0
+    assert memory.get("huge") == b"y" * 200_000
+
+
+def test_totals_are_consistent_under_concurrent_spills(memory):
+    stop, errors = threading.Event(), []
+
+    def writer(prefix):
+        for i in range(200):
+            memory.put(f"{prefix}-{i % 20}", _frame(50))
+            if i % 7 == 0:
+                memory.spill_all()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                memory.memory_bytes(), memory.disk_bytes(), memory.report()
+            except Exception as e: # e.g. "dictionary changed size during iteration"
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    writers = [threading.Thread(target=writer, args=(n,)) for n in range(2)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert errors == []
+    assert memory.memory_bytes() <= memory.budget_bytes
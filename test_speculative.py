@@ -0,0 +1,64 @@
+# test_speculative.py
+
+from concurrent.futures import Future
+
+import pandas as pd
+
+from prioritization import build_lead_plan
+from speculative import SPECULATIVE_WEIGHT, attach_or_submit, cancel_speculation, start_speculation
+
+PLAN = build_lead_plan(pd.DataFrame({
+    "Company Name": [f"Company {i}" for i in range(6)],
+    "Description": ["Cloud AI platform."] * 6,
+}))
+
+
+class _RecordingScheduler:
+    def __init__(self):
+        self.jobs = [] # (lead_id, weight, future)
+
+    def submit(self, user_id, fn, company, description, lead_id, cost_tokens=1, weight=1.0, **kwargs):
+        future = Future()
+        self.jobs.append((lead_id, weight, future))
+        return future
+
+
+def _speculate(state, scheduler, upload_hash="upload", max_rows=3):
+    return start_speculation(state, "user", print, upload_hash, "fast", lambda: PLAN, max_rows, scheduler)
+
+
+def test_analyze_attaches_to_speculative_jobs():
+    state, scheduler = {}, _RecordingScheduler()
+    run = _speculate(state, scheduler)
+    assert [weight for _, weight, _ in scheduler.jobs] == [SPECULATIVE_WEIGHT] * 3
+    assert _speculate(state, scheduler) is run and len(scheduler.jobs) == 3 # Reruns don't resubmit
+
+    lead_futures, reused = attach_or_submit(state, "user", print, "upload", "fast", PLAN, scheduler)
+    assert reused == 3 and len(scheduler.jobs) == 6
+    assert sorted(lead_futures.values()) == list(range(6))
+
+
+def test_analyzed_uploads_are_not_speculated_again():
+    state, scheduler = {}, _RecordingScheduler()
+    attach_or_submit(state, "user", print, "upload", "fast", PLAN, scheduler)
+    assert _speculate(state, scheduler) is None
+    assert len(scheduler.jobs) == 6
+
+
+def test_switching_or_removing_the_upload_cancels_pending_jobs():
+    state, scheduler = {}, _RecordingScheduler()
+    first = _speculate(state, scheduler, "first")
+    list(first.futures)[0].set_running_or_notify_cancel() # Already started: cannot be cancelled
+    _speculate(state, scheduler, "second")
+    assert sum(future.cancelled() for future in first.futures) == 2
+    cancel_speculation(state)
+    assert all(future.cancelled() for _, _, future in scheduler.jobs[3:])
+
+
+def test_cancelled_speculative_jobs_are_resubmitted_on_analyze():
+    state, scheduler = {}, _RecordingScheduler()
+    run = _speculate(state, scheduler)
+    cancel_speculation(state)
+    lead_futures, reused = attach_or_submit(state, "user", print, "upload", "fast", PLAN, scheduler)
+    assert reused == 0 and not any(future in lead_futures for future in run.futures)
+    assert len(lead_futures) == 6
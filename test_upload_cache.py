@@ -0,0 +1,40 @@
+# test_upload_cache.py
+
+import pandas as pd
+import pytest
+
+from upload_cache import PARQUET_AVAILABLE, UploadCache
+
+CSV = b"Company Name,Description,Employees\nAcme,Cloud AI platform,120\nGlobex,,7\n"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return UploadCache(cache_dir=str(tmp_path), memory_max_entries=2)
+
+
+def test_reloads_skip_parsing(cache):
+    first = cache.load("leads.csv", CSV)
+    again = cache.load("leads.csv", CSV)
+    assert (first.source, again.source) == ("parsed", "memory")
+    assert first.is_valid and again.upload_hash == first.upload_hash
+
+
+def test_missing_columns_are_reported(cache):
+    upload = cache.load("leads.csv", b"Company Name,Notes\nAcme,x\n")
+    assert not upload.is_valid and upload.missing_columns == ["Description"]
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="disk tier needs pyarrow")
+def test_every_tier_returns_the_same_frame(tmp_path):
+    parsed = UploadCache(cache_dir=str(tmp_path)).load("leads.csv", CSV)
+    from_disk = UploadCache(cache_dir=str(tmp_path)).load("leads.csv", CSV) # Fresh memory tier, same spill dir
+    assert from_disk.source == "disk"
+    pd.testing.assert_frame_equal(parsed.df, from_disk.df)
+    assert pd.isna(from_disk.df.loc[1, "Description"])
+
+
+def test_memory_tier_is_lru_bounded(cache):
+    for n in range(3):
+        cache.load("leads.csv", CSV + f"Initech {n},Data,1\n".encode())
+    assert len(cache._memory) == 2
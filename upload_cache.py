@@ -0,0 +1,179 @@
+# upload_cache.py
+
+import importlib.util
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from result_store import content_hash
+
+# --- Parsed Upload Cache ---
+# Streamlit reruns app.py on every interaction, which used to re-run pd.read_csv / pd.read_excel each time.
+# Parsed and validated frames are cached process-wide (shared by all sessions) by content hash:
+#   1. in memory, LRU-bounded by entry count and bytes
+#   2. spilled to compact Parquet files on disk, LRU-bounded by total bytes
+# so a rerun with the same file does no parsing work at all.
+# Every tier returns the same frame: object columns are normalized once, on parse, to hold only str or NaN
+# (the app treats cells as text anyway), which is also what Parquet round-trips exactly.
+
+REQUIRED_COLUMNS = ['Company Name', 'Description']
+
+MEMORY_MAX_ENTRIES = int(os.getenv("LUMINOVA_UPLOAD_CACHE_ENTRIES", "8"))
+MEMORY_MAX_BYTES = int(os.getenv("LUMINOVA_UPLOAD_CACHE_MB", "256")) * 1024 * 1024
+DISK_MAX_BYTES = int(os.getenv("LUMINOVA_UPLOAD_DISK_CACHE_MB", "1024")) * 1024 * 1024
+CACHE_DIR = os.getenv("LUMINOVA_UPLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "luminova_upload_cache"))
+
+# Optional faster Excel reader (Rust-based); falls back to openpyxl when not installed
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+@dataclass
+class ParsedUpload:
+    upload_hash: str
+    df: pd.DataFrame         # Shared between sessions - treat as read-only
+    missing_columns: list    # Required columns absent from the file (empty when valid)
+    source: str              # 'memory', 'disk' or 'parsed'
+    parse_seconds: float
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.missing_columns
+
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value
+    return float("nan") if pd.isna(value) else str(value)
+
+
+def _normalize_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Makes every object / string column hold only str or NaN, so all cache tiers return equal frames."""
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].astype(object).map(_as_text).astype(object)
+    return df
+
+
+class UploadCache:
+    """Two-level (memory, then Parquet on disk) LRU cache of parsed uploads, keyed by content hash."""
+    def __init__(self, cache_dir: str = CACHE_DIR, memory_max_entries: int = MEMORY_MAX_ENTRIES,
+                 memory_max_bytes: int = MEMORY_MAX_BYTES, disk_max_bytes: int = DISK_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_max_entries = memory_max_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict() # upload_hash -> (df, size_bytes), least recently used first
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def load(self, file_name: str, data: bytes) -> ParsedUpload:
+        """Returns the parsed, validated frame for `data`, parsing only on a cache miss."""
+        started = time.perf_counter()
+        upload_hash = content_hash(data)
+
+        df, source = self._get_memory(upload_hash), "memory"
+        if df is None:
+            df, source = self._get_disk(upload_hash), "disk"
+        if df is None:
+            df, source = self._parse(file_name, data), "parsed"
+            self._put_disk(upload_hash, df)
+        if source != "memory":
+            self._put_memory(upload_hash, df)
+
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        return ParsedUpload(upload_hash, df, missing, source, time.perf_counter() - started)
+
+    # --- Parsing ---
+    @staticmethod
+    def _parse(file_name: str, data: bytes) -> pd.DataFrame:
+        if file_name.lower().endswith('.csv'):
+            df = pd.read_csv(io.BytesIO(data))
+        else:
+            df = pd.read_excel(io.BytesIO(data), engine=EXCEL_ENGINE)
+        return _normalize_text_columns(df)
+
+    # --- Memory tier ---
+    def _get_memory(self, upload_hash: str):
+        with self._lock:
+            entry = self._memory.get(upload_hash)
+            if entry is None:
+                return None
+            self._memory.move_to_end(upload_hash)
+            return entry[0]
+
+    def _put_memory(self, upload_hash: str, df: pd.DataFrame):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._memory[upload_hash] = (df, size)
+            self._memory.move_to_end(upload_hash)
+            while len(self._memory) > 1 and (
+                len(self._memory) > self.memory_max_entries
+                or sum(s for _, s in self._memory.values()) > self.memory_max_bytes
+            ):
+                self._memory.popitem(last=False)
+
+    # --- Disk tier (Parquet spill) ---
+    def _disk_path(self, upload_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{upload_hash}.parquet")
+
+    def _get_disk(self, upload_hash: str):
+        path = self._disk_path(upload_hash)
+        if not PARQUET_AVAILABLE or not os.path.exists(path):
+            return None
+        try:
+            df = _normalize_text_columns(pd.read_parquet(path)) # Parquet nulls come back as None / pd.NA
+            os.utime(path) # Touch for LRU ordering
+            return df
+        except Exception as e:
+            print(f"Upload cache: discarding unreadable spill file {path}: {e}")
+            self._remove(path)
+            return None
+
+    def _put_disk(self, upload_hash: str, df: pd.DataFrame):
+        if not PARQUET_AVAILABLE:
+            return
+        path = self._disk_path(upload_hash)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False) # Text columns are already str-or-NaN (see _normalize_text_columns)
+            os.replace(tmp_path, path) # Atomic, so concurrent sessions never read a half-written file
+        except Exception as e:
+            print(f"Upload cache: could not spill {upload_hash[:12]} to disk: {e}")
+            self._remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".parquet"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort() # Oldest access first
+        total = sum(size for _, size, _ in entries)
+        while len(entries) > 1 and total > self.disk_max_bytes:
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Shared instance used by app.py (one per process, so every session benefits)
+upload_cache = UploadCache()